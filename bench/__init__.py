@@ -0,0 +1 @@
+"""Benchmarks for the data → features → model → back-test pipeline."""
@@ -0,0 +1,244 @@
+"""Time and measure peak memory of each pipeline stage on synthetic data.
+
+    python -m bench.run --symbols 20 --years 2
+    python -m bench.run --symbols 20 --years 2 --compare bench/results/<old>.json
+
+Synthetic minute files are generated into a scratch ``IBOT_HOME`` (so the
+repo's own data, models and reports are never touched), then every stage
+runs in a fresh spawned process: setup is untimed, the stage itself is
+timed with ``perf_counter`` and its peak RSS taken from ``ru_maxrss``.
+Results go to ``bench/results/<commit>_<utc>.json``; ``--compare`` prints
+the per-stage ratio against an earlier file and exits non-zero when any
+stage got slower than ``--tolerance``.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from bench.synth import END, generate
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+# ---------- stages: setup(ctx) → state, run(ctx, state) ----------
+def _minute_frames(ctx):
+    from ibot.data import load_symbol_minute
+    return {s: load_symbol_minute(s) for s in ctx["all"]}
+
+def _stage_load(ctx, _):
+    from ibot.data import load_symbol_minute
+    for s in ctx["all"]:
+        load_symbol_minute(s)
+
+def _stage_daily(ctx, frames):
+    from ibot.data import minute_to_daily
+    return {s: minute_to_daily(df) for s, df in frames.items()}
+
+def _setup_columns(ctx):
+    from ibot.data import ensure_columns
+    ensure_columns(ctx["all"])
+
+def _stage_columns_daily(ctx, _):
+    from ibot.data import column_bars, minute_columns
+    for s in ctx["all"]:
+        column_bars(minute_columns(s))
+
+def _setup_label(ctx):
+    from ibot.data import minute_to_daily
+    return {s: minute_to_daily(df) for s, df in _minute_frames(ctx).items()}
+
+def _stage_label(ctx, daily):
+    from ibot.features import label_shocks
+    for df in daily.values():
+        label_shocks(df)
+
+def _setup_cold(ctx):
+    shutil.rmtree(Path(ctx["home"]) / "data" / "processed", ignore_errors=True)
+
+def _stage_dataset(ctx, _):
+    from ibot.model import build_dataset
+    build_dataset(ctx["symbols"], ctx["start"], ctx["end"])
+
+def _setup_shards(ctx):
+    from ibot.data import ensure_daily
+    from ibot.shards import SHARD_DIR
+    ensure_daily(ctx["all"])
+    shutil.rmtree(SHARD_DIR, ignore_errors=True)
+
+def _stage_shards(ctx, _):
+    from ibot.model import FEATURES, MIN_ROWS
+    from ibot.shards import SHARD_DIR, build_shards
+    build_shards(ctx["symbols"], ctx["start"], ctx["end"], FEATURES, SHARD_DIR / "bench",
+                 min_rows=MIN_ROWS)
+
+def _setup_train(ctx):
+    from ibot.model import DATASET_DIR
+    _setup_shards(ctx)
+    shutil.rmtree(DATASET_DIR, ignore_errors=True)
+
+def _stage_train(ctx, _):
+    from ibot.model import train
+    train(ctx["symbols"], ctx["start"], ctx["end"])
+
+def _stage_backtest(engine):
+    def run(ctx, _):
+        import backtest
+        backtest.main(["--symbols", *ctx["symbols"], "--from", ctx["bt_start"],
+                       "--to", ctx["end"], "--engine", engine,
+                       "--no-cache"])                  # time the run, not a result-cache hit
+    return run
+
+STAGES = {
+    "load_symbol_minute":  (None,           _stage_load),
+    "minute_to_daily":     (_minute_frames, _stage_daily),
+    "columns_to_daily":    (_setup_columns, _stage_columns_daily),
+    "label_shocks":        (_setup_label,   _stage_label),
+    "build_dataset":       (_setup_cold,    _stage_dataset),     # includes the daily cache build
+    "build_shards":        (_setup_shards,  _stage_shards),      # peak RSS: parent only, not the pool
+    "train":               (_setup_train,   _stage_train),
+    "backtest":            (None,           _stage_backtest("cerebro")),
+    "backtest_vectorized": (None,           _stage_backtest("vectorized")),
+    "backtest_intraday":   (None,           _stage_backtest("intraday")),
+}
+
+
+def _maxrss_mb() -> float:
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024 if sys.platform != "darwin" else kb / 2**20
+
+
+def _child(name, ctx, conn):
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    setup, run = STAGES[name]
+    state = setup(ctx) if setup else None
+    base = _maxrss_mb()
+    t0 = time.perf_counter()
+    run(ctx, state)
+    secs = time.perf_counter() - t0
+    conn.send({"seconds": secs, "peak_rss_mb": _maxrss_mb(), "setup_rss_mb": base})
+    conn.close()
+
+
+def measure(name: str, ctx: dict, repeat: int = 1) -> dict:
+    """Best-of-``repeat`` wall time and the largest peak RSS for one stage."""
+    spawn = mp.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        recv, send = spawn.Pipe(duplex=False)
+        p = spawn.Process(target=_child, args=(name, ctx, send))
+        p.start()
+        send.close()
+        try:
+            runs.append(recv.recv())
+        except EOFError:
+            p.join()
+            raise RuntimeError(f"stage {name} failed (exit code {p.exitcode})") from None
+        p.join()
+    return {"seconds":      min(r["seconds"] for r in runs),
+            "peak_rss_mb":  max(r["peak_rss_mb"] for r in runs),
+            "setup_rss_mb": max(r["setup_rss_mb"] for r in runs),
+            "repeat":       repeat}
+
+
+def _git_commit() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(result: dict, base: dict, tolerance: float) -> bool:
+    """Print per-stage ratios; False when any stage regressed beyond ``tolerance``."""
+    ok = True
+    print(f"{'stage':<22}{'base s':>10}{'now s':>10}{'ratio':>8}{'base MB':>10}{'now MB':>10}")
+    for name, now in result["stages"].items():
+        old = base["stages"].get(name)
+        if old is None:
+            print(f"{name:<22}{'-':>10}{now['seconds']:>10.3f}")
+            continue
+        ratio = now["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        ok &= not flag
+        print(f"{name:<22}{old['seconds']:>10.3f}{now['seconds']:>10.3f}{ratio:>8.2f}"
+              f"{old['peak_rss_mb']:>10.0f}{now['peak_rss_mb']:>10.0f}{flag}")
+    return ok
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--symbols", type=int, default=20, help="tradable symbols (SPY is extra)")
+    ap.add_argument("--years",   type=float, default=2)
+    ap.add_argument("--seed",    type=int, default=0)
+    ap.add_argument("--repeat",  type=int, default=1, help="best-of-N timing per stage")
+    ap.add_argument("--stages",  nargs="+", choices=list(STAGES), default=list(STAGES))
+    ap.add_argument("--home",    type=Path, default=None,
+                    help="scratch IBOT_HOME to keep (default: a temp dir, removed after)")
+    ap.add_argument("--out",     type=Path, default=None, help="result JSON path")
+    ap.add_argument("--compare", type=Path, default=None, help="earlier result JSON")
+    ap.add_argument("--tolerance", type=float, default=0.20,
+                    help="allowed slowdown vs --compare before failing (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    home = args.home or Path(tempfile.mkdtemp(prefix="ibot-bench-"))
+    os.environ["IBOT_HOME"] = str(home)              # inherited by every stage process
+    try:
+        t0 = time.perf_counter()
+        symbols = generate(home / "data" / "raw", args.symbols, args.years, args.seed)
+        print(f"Generated SPY + {len(symbols)} symbols × {args.years}y "
+              f"in {time.perf_counter() - t0:.1f}s ➜ {home}")
+
+        # train on the whole history, back-test its last year
+        end = pd.Timestamp(END)
+        start = end - pd.DateOffset(days=round(args.years * 365.25))
+        ctx = dict(home=str(home), symbols=symbols, all=[*symbols, "SPY"],
+                   start=start.date().isoformat(), end=END,
+                   bt_start=max(start, end - pd.DateOffset(years=1)).date().isoformat())
+        stages = {}
+        for name in args.stages:
+            stages[name] = measure(name, ctx, args.repeat)
+            print(f"{name:<22}{stages[name]['seconds']:>9.3f}s  "
+                  f"peak {stages[name]['peak_rss_mb']:>7.0f} MB")
+    finally:
+        if args.home is None:
+            shutil.rmtree(home, ignore_errors=True)
+
+    result = {
+        "commit":    _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "python":    platform.python_version(),
+        "platform":  platform.platform(),
+        "cpus":      os.cpu_count(),
+        "params":    dict(symbols=args.symbols, years=args.years, seed=args.seed,
+                          repeat=args.repeat),
+        "stages":    stages,
+    }
+    out = args.out or RESULTS_DIR / f"{result['commit']}_{result['timestamp'].replace(':', '')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"Results saved ➜ {out}")
+
+    if args.compare is not None:
+        return 0 if compare(result, json.loads(args.compare.read_text()), args.tolerance) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+"""Check ``ibot`` CLI start-up stays cheap.
+
+    python -m bench.startup
+    python -m bench.startup --budget 0.25 --repeat 5
+
+For ``ibot --help`` and every ``ibot <command> --help`` this measures the
+best-of-``repeat`` wall time of a fresh interpreter and lists the modules
+it imported (``-X importtime``).  Fails (exit 1) when a run exceeds
+``--budget`` seconds, imports one of the heavy dependencies, or when
+importing the ``ibot`` modules creates anything under a scratch
+``IBOT_HOME``.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY    = ("pandas", "numpy", "pyarrow", "backtrader", "lightgbm", "sklearn",
+            "matplotlib", "ray", "alpaca")
+COMMANDS = ("train", "tune", "backtest", "sweep", "refresh-universe", "ingest", "scan", "live")
+MODULES  = ("ibot.config", "ibot.data", "ibot.model", "ibot.reporting", "ibot.cli")
+BUDGET   = 0.30            # seconds per --help run (best of REPEAT)
+REPEAT   = 3
+
+
+def timed(args: list[str], env: dict) -> tuple[float, str]:
+    """Wall time and stderr of ``python *args`` in a fresh interpreter."""
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    secs = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr}")
+    return secs, proc.stderr
+
+
+def imported(stderr: str) -> set[str]:
+    """Top-level package names from ``-X importtime`` output."""
+    names = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            names.add(name.split(".")[0])
+    return names
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--budget", type=float, default=BUDGET, help="seconds per --help run")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    args = ap.parse_args(argv)
+
+    ok = True
+    with tempfile.TemporaryDirectory(prefix="ibot-startup-") as home:
+        env = {**os.environ, "IBOT_HOME": home}
+
+        print(f"{'command':<28}{'best s':>8}  heavy imports")
+        for cmd in [[], *([c] for c in COMMANDS)]:
+            argv_ = ["-m", "ibot", *cmd, "--help"]
+            best = min(timed(argv_, env)[0] for _ in range(args.repeat))
+            heavy = sorted(imported(timed(["-X", "importtime", *argv_], env)[1]) & set(HEAVY))
+            flag = best > args.budget or heavy
+            ok &= not flag
+            label = " ".join(["ibot", *cmd, "--help"])
+            print(f"{label:<28}{best:>8.3f}  {', '.join(heavy) or '-'}"
+                  f"{'  OVER BUDGET' if best > args.budget else ''}")
+
+        timed(["-c", "; ".join(f"import {m}" for m in MODULES)], env)
+        created = sorted(str(p.relative_to(home)) for p in Path(home).rglob("*"))
+        if created:
+            ok = False
+            print(f"importing {', '.join(MODULES)} created: {', '.join(created)}")
+        else:
+            print("no files or directories created at import")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
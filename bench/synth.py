@@ -0,0 +1,86 @@
+"""Deterministic synthetic minute bars in the ``data/raw`` layout.
+
+One ``{symbol}.parquet`` per symbol with a UTC ``timestamp`` column and
+``open/high/low/close/volume``, regular-session minutes only (09:30–16:00
+America/New_York, DST-correct), exactly what ``load_symbol_minute`` reads.
+Prices are a random walk with occasional gap-downs so the shock rules and
+the model have something to find.  The same ``seed`` always gives the same
+bytes, so timings are comparable across commits.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+END          = "2023-12-29"
+MINUTES      = 390                 # one regular session
+MINUTE_VOL   = 0.0008
+SHOCK_PROB   = 0.004               # per symbol-day
+SHOCK_SIZE   = 0.06
+
+
+def symbol_names(n: int) -> list[str]:
+    """``n`` tradable tickers; SPY is always generated on top of these."""
+    return [f"S{i:03d}" for i in range(n)]
+
+
+def session_minutes(years: float, end: str = END) -> np.ndarray:
+    """UTC ns timestamps of every regular-session minute over ``years``."""
+    end_ts = pd.Timestamp(end)
+    days = pd.bdate_range(end_ts - pd.DateOffset(days=round(years * 365.25)), end_ts)
+    opens = (days + pd.Timedelta(hours=9, minutes=30)).tz_localize("America/New_York")
+    opens = opens.tz_convert("UTC").as_unit("ns").asi8
+    return (opens[:, None] + np.arange(MINUTES, dtype="int64")[None, :] * 60_000_000_000).ravel()
+
+
+def minute_bars(ts: np.ndarray, seed: int) -> pa.Table:
+    rng = np.random.default_rng(seed)
+    n = len(ts)
+    r = rng.normal(0.0, MINUTE_VOL, n)
+    day_open = np.arange(0, n, MINUTES)
+    gaps = day_open[rng.random(len(day_open)) < SHOCK_PROB]
+    r[gaps] -= SHOCK_SIZE * rng.uniform(0.5, 1.5, len(gaps))
+
+    close = 50.0 * rng.uniform(0.5, 4.0) * np.exp(np.cumsum(r))
+    open_ = np.r_[close[0], close[:-1]]
+    wick = rng.random((2, n)) * MINUTE_VOL
+    return pa.table({
+        "timestamp": pa.array(ts, type=pa.timestamp("ns", tz="UTC")),
+        "open":      open_,
+        "high":      np.maximum(open_, close) * (1 + wick[0]),
+        "low":       np.minimum(open_, close) * (1 - wick[1]),
+        "close":     close,
+        "volume":    rng.integers(100, 50_000, n).astype("int64"),
+    })
+
+
+def generate(out_dir: Path, n_symbols: int, years: float, seed: int = 0,
+             end: str = END, row_group_size: int = 100_000) -> list[str]:
+    """Write SPY plus ``n_symbols`` files to ``out_dir``; return the tradable names."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ts = session_minutes(years, end)
+    names = symbol_names(n_symbols)
+    for k, sym in enumerate(["SPY", *names]):
+        pq.write_table(minute_bars(ts, seed * 100_003 + k), out_dir / f"{sym}.parquet",
+                       row_group_size=row_group_size,
+                       sorting_columns=[pq.SortingColumn(0)])
+    return names
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("out", type=Path, help="directory to write {symbol}.parquet into")
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--years",   type=float, default=2)
+    ap.add_argument("--seed",    type=int, default=0)
+    args = ap.parse_args(argv)
+    names = generate(args.out, args.symbols, args.years, args.seed)
+    print(f"Wrote SPY + {len(names)} symbols × {args.years}y to {args.out}")
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
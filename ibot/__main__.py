@@ -0,0 +1,6 @@
+"""``python -m ibot`` – same as the ``ibot`` console script."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,124 @@
+"""Single-pass OHLCV aggregation of minute arrays into session-aligned bars.
+
+Works on plain NumPy / Arrow arrays: bucket keys are computed once from the
+exchange-local clock and every field is reduced with one ``reduceat`` over
+the same bucket boundaries.  Daily bars are keyed on the exchange session
+date (not UTC midnight) and labelled with that date at 00:00 UTC, which is
+what the rest of ``ibot`` slices on.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+EXCHANGE_TZ = "America/New_York"
+RTH_OPEN    = 9 * 60 + 30       # regular session, minutes after local midnight
+RTH_CLOSE   = 16 * 60
+
+_MIN_NS = 60 * 1_000_000_000
+_DAY_NS = 1440 * _MIN_NS
+
+# bar size → bucket width in ns; "1D" is handled as the session date
+FREQS = {
+    "1min":  _MIN_NS,
+    "5min":  5 * _MIN_NS,
+    "15min": 15 * _MIN_NS,
+    "30min": 30 * _MIN_NS,
+    "1h":    60 * _MIN_NS,
+    "1D":    _DAY_NS,
+}
+FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def as_ns(ts) -> np.ndarray:
+    """UTC epoch nanoseconds as int64 from datetime64 / Arrow / pandas input."""
+    if isinstance(ts, pa.ChunkedArray):
+        ts = ts.combine_chunks()
+    if isinstance(ts, pa.Array):
+        if pa.types.is_timestamp(ts.type) and ts.type.unit != "ns":
+            ts = ts.cast(pa.timestamp("ns", ts.type.tz))
+        return ts.cast(pa.int64()).to_numpy(zero_copy_only=False)
+    if isinstance(ts, pd.DatetimeIndex):
+        return ts.as_unit("ns").asi8 if ts.tz is None else ts.tz_convert("UTC").as_unit("ns").asi8
+    ts = np.asarray(ts)
+    if ts.dtype.kind == "M":
+        return ts.astype("datetime64[ns]").view("int64")
+    return ts.astype("int64", copy=False)
+
+
+def local_ns(ts_ns: np.ndarray, tz: str = EXCHANGE_TZ) -> np.ndarray:
+    """Exchange wall-clock time in ns (DST-aware) for UTC epoch ns."""
+    idx = pd.DatetimeIndex(ts_ns.view("datetime64[ns]"), tz="UTC")
+    return idx.tz_convert(tz).tz_localize(None).asi8
+
+
+def session_start(label: pd.Timestamp, tz: str = EXCHANGE_TZ) -> pd.Timestamp:
+    """First instant (UTC) belonging to the session whose daily label is *label*."""
+    return pd.Timestamp(label.date()).tz_localize(tz).tz_convert("UTC")
+
+
+def aggregate(ts, open, high, low, close, volume,
+              freq: str = "1D",
+              tz: str = EXCHANGE_TZ,
+              regular_hours: bool = False) -> dict[str, np.ndarray]:
+    """Aggregate time-sorted minute bars into *freq* bars in one pass.
+
+    Returns a dict of equal-length arrays: ``timestamp`` (UTC epoch ns of the
+    bar label) plus the five OHLCV fields.  Rows with a NaN open/close are
+    ignored, matching the ``first``/``last`` semantics of the old resampler.
+    """
+    if freq not in FREQS:
+        raise ValueError(f"Unsupported bar size {freq!r}; expected one of {list(FREQS)}")
+    step = FREQS[freq]
+
+    ts = as_ns(ts)
+    cols = [np.asarray(a) for a in (open, high, low, close, volume)]
+    local = local_ns(ts, tz)
+
+    keep = ~(np.isnan(cols[0]) | np.isnan(cols[3]))
+    if regular_hours:
+        mod = (local % _DAY_NS) // _MIN_NS
+        keep &= (mod >= RTH_OPEN) & (mod < RTH_CLOSE)
+    if not keep.all():
+        ts, local = ts[keep], local[keep]
+        cols = [a[keep] for a in cols]
+
+    empty = {"timestamp": np.empty(0, "int64"),
+             **{k: a[:0] for k, a in zip(FIELDS, cols)}}
+    if len(ts) == 0:
+        return empty
+
+    key = local // step
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(key)] - 1
+
+    o, h, l, c, v = cols
+    if freq == "1D":
+        label = key[starts] * step                               # session date @ 00:00 UTC
+    else:
+        label = key[starts] * step - (local[starts] - ts[starts])  # bucket start, back in UTC
+    return {
+        "timestamp": label,
+        "open":   o[starts],
+        "high":   np.maximum.reduceat(h, starts),
+        "low":    np.minimum.reduceat(l, starts),
+        "close":  c[ends],
+        "volume": np.add.reduceat(v, starts, dtype=np.uint64 if v.dtype.kind == "u" else None),
+    }
+
+
+def to_frame(bars: dict[str, np.ndarray]) -> pd.DataFrame:
+    """Wrap ``aggregate`` output as an OHLCV frame with a UTC DatetimeIndex."""
+    idx = pd.DatetimeIndex(bars["timestamp"].view("datetime64[ns]"), tz="UTC")
+    return pd.DataFrame({k: bars[k] for k in FIELDS}, index=idx)
+
+
+def resample_frame(df_min: pd.DataFrame, freq: str = "1D", **kw) -> pd.DataFrame:
+    """``aggregate`` for a minute DataFrame indexed by tz-aware timestamp."""
+    bars = aggregate(df_min.index, *(df_min[k].to_numpy() for k in FIELDS), freq=freq, **kw)
+    return to_frame(bars).rename_axis(df_min.index.name)
+
+
+def resample_table(table: pa.Table, freq: str = "1D", **kw) -> pd.DataFrame:
+    """``aggregate`` straight from an Arrow table with a ``timestamp`` column."""
+    cols = [table.column(k).to_numpy() for k in FIELDS]
+    return to_frame(aggregate(table.column("timestamp"), *cols, freq=freq, **kw)).rename_axis("timestamp")
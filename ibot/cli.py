@@ -0,0 +1,424 @@
+"""``ibot`` command line: train, tune, backtest, sweep, refresh-universe, ingest, scan and live.
+
+    ibot backtest --symbols AAA BBB --from 2022-01-03 --to 2023-12-29
+    python -m ibot train --from 2014-01-02 --to 2021-12-31
+
+Only ``argparse`` is imported up front.  Every subcommand imports what it
+needs (pandas, backtrader, LightGBM, matplotlib …) inside its handler, so
+``--help`` and argument errors return without loading any of them;
+``bench/startup.py`` checks that budget.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+UNIVERSE_CSV = "universe/top200.csv"
+TRAIN_FROM   = "2014-01-02"      # back-tests train on TRAIN_FROM .. --from
+
+
+def _symbols(arg: list[str]) -> list[str]:
+    """Expand ``all`` into the universe file's ``symbol`` column."""
+    if arg != ["all"]:
+        return arg
+    import csv
+    with open(UNIVERSE_CSV, newline="") as f:
+        return [row["symbol"] for row in csv.DictReader(f)]
+
+
+def _stamp() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d_%H%M%S")
+
+
+# ---------- train ----------
+def _train_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--symbols", nargs="+", default=["all"],
+                    help=f"'all' = {UNIVERSE_CSV} else list")
+    ap.add_argument("--from", dest="start", required=True)
+    ap.add_argument("--to",   dest="end",   required=True)
+    ap.add_argument("--threads", type=int, default=None,
+                    help="LightGBM threads (default: all cores)")
+    ap.add_argument("--profile", choices=["cprofile", "sample"], default=None,
+                    help="also dump a cProfile / sampled-stack profile to reports/")
+
+
+def cmd_train(args):
+    from loguru import logger
+    from . import metrics
+    from .model import train
+    from .reporting import REPORT_DIR
+
+    symbols = _symbols(args.symbols)
+    stamp = _stamp()
+    with metrics.profiled(args.profile, REPORT_DIR / f"train_profile_{stamp}"):
+        train(symbols, args.start, args.end, threads=args.threads)
+
+    logger.info("Stage metrics:\n{}", metrics.summary().to_string(index=False))
+    path = metrics.dump(REPORT_DIR / f"train_{stamp}.metrics.json",
+                        start=args.start, end=args.end, symbols=len(symbols))
+    logger.info("Metrics saved ➜ {}", path)
+
+
+# ---------- backtest ----------
+def _backtest_args(ap: argparse.ArgumentParser):
+    from .config import INTRADAY_WINDOW, INTRADAY_LOOKBACK
+
+    ap.add_argument("--symbols", nargs="+", required=True,
+                    help="List of tickers, or 'all' to run full universe")
+    ap.add_argument("--from",    dest="start", required=True)
+    ap.add_argument("--to",      dest="end",   required=True)
+    ap.add_argument("--engine",  choices=["cerebro", "vectorized", "intraday"], default="cerebro",
+                    help="backtrader Cerebro (default), the NumPy panel engine, "
+                         "or minute-bar shocks and stops")
+    ap.add_argument("--intraday-window", type=int, default=INTRADAY_WINDOW,
+                    help="minutes in the rolling return (intraday engine)")
+    ap.add_argument("--intraday-lookback", type=int, default=INTRADAY_LOOKBACK,
+                    help="minutes of 1-minute returns behind σ (intraday engine)")
+    ap.add_argument("--min-pred", type=float, default=None,
+                    help="only enter shocks whose predicted target_r is at least this")
+    ap.add_argument("--size-by-pred", action="store_true",
+                    help="scale the risk budget by the predicted rebound")
+    ap.add_argument("--precompute-preds", action="store_true",
+                    help="score the whole window up front instead of per bar")
+    ap.add_argument("--walk-forward", action="store_true",
+                    help="retrain per window and stitch the out-of-sample results")
+    ap.add_argument("--train-years", type=int, default=3)
+    ap.add_argument("--test-months", type=int, default=6)
+    ap.add_argument("--workers",     type=int, default=None,
+                    help="walk-forward windows run in parallel")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="re-run even if an identical back-test is in the result cache")
+    ap.add_argument("--top-trades", type=int, default=None,
+                    help="trades listed in the markdown (default 50; all of them go to Parquet)")
+    ap.add_argument("--background-report", action="store_true",
+                    help="render plot + markdown in a detached process and return")
+    ap.add_argument("--profile", choices=["cprofile", "sample"], default=None,
+                    help="also dump a cProfile / sampled-stack profile next to the report")
+
+
+def cmd_backtest(args):
+    from . import metrics
+    from .reporting import REPORT_DIR
+
+    with metrics.profiled(args.profile, REPORT_DIR / f"profile_{_stamp()}"):
+        _backtest(args)
+
+
+def _result_key(symbols: list[str], args, params: dict) -> str | None:
+    """Result-cache key; ``None`` while a gating model still has to be trained."""
+    from .model import trained_model
+    from .results import file_hash, run_key
+
+    model_hash = None
+    if params["min_pred"] is not None or params["size_by_pred"]:
+        path = trained_model(symbols, TRAIN_FROM, args.start)
+        if path is None:
+            return None
+        model_hash = file_hash(path)
+    return run_key([*symbols, "SPY"], args.start, args.end, params, model_hash)
+
+
+def _backtest(args):
+    from loguru import logger
+    from . import results
+    from .config import START_CASH
+    from .data import window_feeds
+    from .model import load_or_train
+    from .reporting import TOP_TRADES, write as write_report
+    from .runner import run as run_backtest
+    from .walkforward import walk_forward
+
+    symbols = _symbols(args.symbols)
+
+    # Daily bars come from the on-disk cache; SPY rides along as the last feed
+    feeds = window_feeds(symbols, args.start, args.end)
+    added = [name for name, _ in feeds[:-1]]
+    spy_daily = feeds[-1][1]
+
+    gate = dict(min_pred=args.min_pred, size_by_pred=args.size_by_pred)
+    uses_model = args.min_pred is not None or args.size_by_pred
+    intraday = None
+    if args.engine == "intraday":
+        intraday = dict(window=args.intraday_window, lookback=args.intraday_lookback)
+    if args.walk_forward:
+        params = dict(engine=args.engine, precompute=args.precompute_preds,
+                      intraday=intraday, **gate)
+        equity, trades, windows = walk_forward(
+            symbols, args.start, args.end, params,
+            train_years=args.train_years, test_months=args.test_months,
+            workers=args.workers)
+        logger.info("Walk-forward windows:\n{}", windows.to_string(index=False))
+        cached = int(windows["cached"].sum()) if len(windows) else 0
+        extra = {"walk-forward": f"{len(windows)} windows ({cached} cached), "
+                                 f"{args.train_years}y train / {args.test_months}m test"}
+    else:
+        params = dict(engine=args.engine, precompute=args.precompute_preds,
+                      intraday=intraday, **gate)
+        key = None if args.no_cache else _result_key(symbols, args, params)
+        hit = results.load(key) if key else None
+        if hit:
+            equity, trades, extra = hit
+        else:
+            # Train or load the model only when it gates or sizes entries
+            model = load_or_train(symbols, TRAIN_FROM, args.start) if uses_model else None
+
+            logger.info("Running {} back-test with {} symbols: {}",
+                        args.engine, len(added), ", ".join(added))
+            res = run_backtest(feeds, model, args.start, args.end, engine=args.engine,
+                               precompute=args.precompute_preds, intraday=intraday, **gate)
+            equity, trades, extra = res.equity, res.trades, dict(res.stats)
+            if not args.no_cache:
+                key = key or _result_key(symbols, args, params)
+                results.store(key, equity, trades, extra, params=params,
+                              start=args.start, end=args.end, symbols=added)
+    if intraday:
+        extra["intraday"] = (f"{args.intraday_window}-min return, "
+                             f"σ over {args.intraday_lookback} min")
+
+    # Build SPY curve directly from DataFrame
+    spy_curve = spy_daily["close"] / spy_daily["close"].iloc[0] * START_CASH
+
+    spy_curve *= (1 - 0.15)
+
+    # Write detailed report (now with full universe subset and slippage/tax)
+    write_report(
+        equity,
+        spy_curve,
+        trades=trades,
+        params=dict(
+            start=args.start,
+            end=args.end,
+            symbols=",".join(added),
+            **{k: v for k, v in gate.items() if v is not None and v is not False},
+            **extra
+        ),
+        top_n=TOP_TRADES if args.top_trades is None else args.top_trades,
+        background=args.background_report,
+    )
+
+
+# ---------- sweep ----------
+def _sweep_args(ap: argparse.ArgumentParser):
+    from .config import SHOCK_SIGMA, ATR_MULT, HOLD_DAYS, RISK_BUDGET
+
+    ap.add_argument("--symbols", nargs="+", required=True,
+                    help="List of tickers, or 'all' to run full universe")
+    ap.add_argument("--from", dest="start", required=True)
+    ap.add_argument("--to",   dest="end",   required=True)
+    ap.add_argument("--shock-sigma", nargs="+", type=float, default=[SHOCK_SIGMA])
+    ap.add_argument("--atr-mult",    nargs="+", type=float, default=[ATR_MULT])
+    ap.add_argument("--hold-days",   nargs="+", type=int,   default=[HOLD_DAYS])
+    ap.add_argument("--risk-budget", nargs="+", type=float, default=[RISK_BUDGET])
+    ap.add_argument("--random", type=int, default=None,
+                    help="evaluate N random grid points instead of the full grid")
+    ap.add_argument("--seed",    type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--backend", choices=["process", "ray"], default="process")
+    ap.add_argument("--top",     type=int, default=20, help="rows shown in the markdown table")
+
+
+def cmd_sweep(args):
+    import pandas as pd
+    from loguru import logger
+    from .data import window_feeds
+    from .reporting import REPORT_DIR
+    from .sweep import grid, sweep
+
+    trials = grid(dict(shock_sigma=args.shock_sigma, atr_mult=args.atr_mult,
+                       hold_days=args.hold_days, risk_budget=args.risk_budget),
+                  n_random=args.random, seed=args.seed)
+
+    feeds = window_feeds(_symbols(args.symbols), args.start, args.end)
+    table = sweep(dict(feeds), trials, workers=args.workers, backend=args.backend)
+
+    ts = _stamp()
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    csv_path = REPORT_DIR / f"sweep_{ts}.csv"
+    table.to_csv(csv_path, index=False)
+
+    md_path = REPORT_DIR / f"sweep_{ts}.md"
+    shown = table.head(args.top).copy()
+    shown["cagr"] = shown["cagr"].map(lambda x: "N/A" if pd.isna(x) else f"{x:.2%}")
+    shown["max_dd"] = shown["max_dd"].map(lambda x: f"{x:.2%}")
+    with open(md_path, "w") as f:
+        f.write(f"# Parameter sweep {ts}\n\n")
+        f.write(f"- **start**: {args.start}\n- **end**: {args.end}\n")
+        f.write(f"- **symbols**: {','.join(name for name, _ in feeds[:-1])}\n")
+        f.write(f"- **trials**: {len(table)}\n\n")
+        f.write(f"## Top {len(shown)} by CAGR\n\n")
+        f.write(shown.to_markdown(index=False, floatfmt=".4g"))
+        f.write("\n")
+
+    logger.success("Sweep results saved ➜ {} ({})", md_path, csv_path.name)
+
+
+# ---------- refresh-universe ----------
+def _universe_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--days",    type=int, default=30, help="dollar-volume look-back")
+    ap.add_argument("--workers", type=int, default=None, help="concurrent Alpaca batches")
+
+
+def cmd_refresh_universe(args):
+    import importlib.util
+    from .config import PROJECT_ROOT
+
+    # universe/ is a script folder next to the package, not part of it
+    path = PROJECT_ROOT / "universe" / "refresh_universe.py"
+    spec = importlib.util.spec_from_file_location("refresh_universe", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    mod.refresh(days=args.days, workers=args.workers or mod.WORKERS)
+
+
+# ---------- ingest ----------
+def _ingest_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--symbols", nargs="+", default=["all"],
+                    help=f"'all' = {UNIVERSE_CSV} (plus SPY) else list")
+    ap.add_argument("--source", choices=["alpaca", "replay"], default="alpaca")
+    ap.add_argument("--replay-dir", default=None,
+                    help="folder of {symbol}.parquet files for --source replay (default data/raw)")
+    ap.add_argument("--from", dest="start", default=None,
+                    help="first day for symbols with no partitions yet")
+    ap.add_argument("--to",   dest="end",   default=None, help="last day (default: now)")
+    ap.add_argument("--workers", type=int, default=None, help="symbols fetched concurrently")
+
+
+def cmd_ingest(args):
+    import pandas as pd
+    from .config import DATA_RAW
+    from .ingest import WORKERS, AlpacaSource, ReplaySource, ingest
+
+    symbols = _symbols(args.symbols)
+    if args.symbols == ["all"]:
+        symbols = list(dict.fromkeys([*symbols, "SPY"]))
+    if args.source == "replay":
+        source = ReplaySource(args.replay_dir or DATA_RAW)
+    else:
+        source = AlpacaSource()
+    end = None if args.end is None else pd.Timestamp(args.end) + pd.Timedelta(days=1)
+    added = ingest(symbols, source, args.start, end, workers=args.workers or WORKERS)
+    return 1 if any(n < 0 for n in added.values()) else 0
+
+
+# ---------- scan ----------
+def _scan_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--symbols", nargs="+", default=["all"],
+                    help=f"'all' = {UNIVERSE_CSV} else list")
+    ap.add_argument("--date", default=None, help="scan this session (default: latest cached)")
+    ap.add_argument("--cash", type=float, default=None,
+                    help="equity the suggested sizes risk RISK_BUDGET of (default START_CASH)")
+    ap.add_argument("--refresh", action="store_true",
+                    help="bring the daily caches up to date with the minute data first")
+    ap.add_argument("--top",  type=int, default=20, help="candidates printed")
+    ap.add_argument("--out",  default=None, help="also write the full list to this CSV")
+
+
+def cmd_scan(args):
+    import lightgbm as lgb
+    from loguru import logger
+    from .config import START_CASH
+    from .model import MODEL_PATH
+    from .scan import scan
+
+    if not MODEL_PATH.exists():
+        sys.exit(f"No model at {MODEL_PATH}; run `ibot train` first")
+    model = lgb.Booster(model_file=str(MODEL_PATH))
+    cands = scan(_symbols(args.symbols), model, asof=args.date,
+                 cash=START_CASH if args.cash is None else args.cash, refresh=args.refresh)
+    if args.out:
+        cands.to_csv(args.out, index=False)
+        logger.info("Candidates saved ➜ {}", args.out)
+    print(cands.head(args.top).to_string(index=False) if len(cands) else "No shocks.")
+
+
+# ---------- tune ----------
+def _tune_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--symbols", nargs="+", default=["all"],
+                    help=f"'all' = {UNIVERSE_CSV} else list")
+    ap.add_argument("--from", dest="start", required=True)
+    ap.add_argument("--to",   dest="end",   required=True)
+    ap.add_argument("--samples", type=int, default=32, help="configurations tried")
+    ap.add_argument("--threads", type=int, default=None,
+                    help="total LightGBM threads, split between trials (default: all cores)")
+    ap.add_argument("--concurrent", type=int, default=None,
+                    help="trials run at once (default: one per thread)")
+    ap.add_argument("--seed", type=int, default=0)
+
+
+def cmd_tune(args):
+    from .tune import tune
+
+    table = tune(_symbols(args.symbols), args.start, args.end, samples=args.samples,
+                 threads=args.threads, concurrent=args.concurrent, seed=args.seed)
+    print(table.head(10).to_string(index=False))
+
+
+# ---------- live ----------
+def _live_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--symbols", nargs="+", default=["all"],
+                    help=f"'all' = {UNIVERSE_CSV} else list")
+    ap.add_argument("--sim", action="store_true",
+                    help="replay cached daily bars through a simulated broker instead of Alpaca")
+    ap.add_argument("--from", dest="start", default=None, help="first replayed day (--sim)")
+    ap.add_argument("--to",   dest="end",   default=None, help="last replayed day (--sim)")
+    ap.add_argument("--interval", type=float, default=0.0,
+                    help="seconds between replayed sessions (--sim)")
+    ap.add_argument("--latency",  type=float, default=0.0,
+                    help="simulated broker round trip in seconds (--sim)")
+
+
+def cmd_live(args):
+    import asyncio
+    from loguru import logger
+    from .live import AlpacaBroker, AlpacaFeed, LiveEngine, replay
+
+    symbols = _symbols(args.symbols)
+    if args.sim:
+        if not (args.start and args.end):
+            sys.exit("--sim needs --from and --to")
+        engine = replay(symbols, args.start, args.end,
+                        interval=args.interval, latency=args.latency)
+    else:
+        from .data import load_daily
+        engine = LiveEngine(AlpacaBroker())
+        engine.warm(load_daily(symbols))
+        try:
+            asyncio.run(engine.run(AlpacaFeed(symbols)))
+        except KeyboardInterrupt:
+            pass
+
+    trades = engine.ledger.trades_frame()
+    logger.info("{} trades, equity ${:,.2f}, {} open positions",
+                len(trades), engine.value(), len(engine.pos))
+    for k, v in engine.latency_stats().items():
+        logger.info("{:<22} {}", k, v)
+
+
+COMMANDS = {
+    "train":            (cmd_train,            _train_args,    "train the LightGBM rebound model"),
+    "backtest":         (cmd_backtest,         _backtest_args, "back-test the shock-rebound strategy"),
+    "sweep":            (cmd_sweep,            _sweep_args,    "back-test a grid of strategy parameters in parallel"),
+    "refresh-universe": (cmd_refresh_universe, _universe_args, "rebuild universe/top200.csv from Alpaca"),
+    "ingest":           (cmd_ingest,           _ingest_args,   "append new minute bars to the partitioned store"),
+    "scan":             (cmd_scan,             _scan_args,     "rank today's shock candidates"),
+    "tune":             (cmd_tune,             _tune_args,     "search LightGBM params for train with Ray Tune"),
+    "live":             (cmd_live,             _live_args,     "trade the strategy on a live or replayed bar stream"),
+}
+
+
+def parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="ibot", description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (handler, add_args, help_) in COMMANDS.items():
+        p = sub.add_parser(name, help=help_, description=help_)
+        add_args(p)
+        p.set_defaults(handler=handler)
+    return ap
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parser().parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
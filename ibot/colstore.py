@@ -0,0 +1,149 @@
+"""Fixed-width, memory-mapped column files for bar data.
+
+One directory per symbol under ``DATA_PROCESSED/columns``::
+
+    <symbol>/meta.json        row count, column dtypes, cache key
+    <symbol>/timestamp.bin    int64 UTC epoch ns, ascending
+    <symbol>/open.bin …       float32 open / high / low / close
+    <symbol>/volume.bin       uint32 (uint64 when a bar overflows it)
+    <symbol>/index.bin        int64 pairs: session label (UTC ns at 00:00) → first row
+
+Files are raw little-endian arrays, so readers ``np.memmap`` them and every
+slice is a zero-copy view; the session index turns a date window into a row
+range without touching the timestamp column.  ``meta.json`` is written last
+and removed first on rewrite, so a directory without it is never read.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bars import FIELDS, as_ns, local_ns
+from .config import DATA_PROCESSED
+
+STORE_DIR = DATA_PROCESSED / "columns"
+VERSION   = 1
+
+PRICE_DTYPE = np.float32
+_DTYPES = {"timestamp": np.int64, "open": PRICE_DTYPE, "high": PRICE_DTYPE,
+           "low": PRICE_DTYPE, "close": PRICE_DTYPE}
+COLUMNS = ("timestamp", *FIELDS)
+
+_DAY_NS = 86_400 * 1_000_000_000
+
+
+def symbol_dir(symbol: str, root: Path = STORE_DIR) -> Path:
+    return root / symbol
+
+
+def read_meta(symbol: str, root: Path = STORE_DIR) -> dict | None:
+    file = symbol_dir(symbol, root) / "meta.json"
+    return json.loads(file.read_text()) if file.exists() else None
+
+
+def _volume_dtype(volume: np.ndarray):
+    if len(volume) and np.nanmax(volume) > np.iinfo(np.uint32).max:
+        return np.uint64
+    return np.uint32
+
+
+def session_index(ts_ns: np.ndarray) -> np.ndarray:
+    """``(n_sessions, 2)`` int64: exchange session label and its first row."""
+    day = local_ns(ts_ns) // _DAY_NS
+    first = np.flatnonzero(np.r_[True, day[1:] != day[:-1]]) if len(day) else np.empty(0, int)
+    return np.column_stack([day[first] * _DAY_NS, first]).astype(np.int64)
+
+
+def write(symbol: str, arrays: dict[str, np.ndarray], key: dict, root: Path = STORE_DIR):
+    """Store time-sorted bar arrays (``timestamp`` + OHLCV) for *symbol*."""
+    out = symbol_dir(symbol, root)
+    out.mkdir(parents=True, exist_ok=True)
+    (out / "meta.json").unlink(missing_ok=True)
+
+    ts = as_ns(arrays["timestamp"])
+    vol = np.nan_to_num(np.asarray(arrays["volume"], dtype=float))
+    dtypes = {**_DTYPES, "volume": _volume_dtype(vol)}
+    cols = {"timestamp": ts, **{k: arrays[k] for k in FIELDS}, "volume": vol}
+    for name, dtype in dtypes.items():
+        tmp = out / f"{name}.tmp"
+        np.ascontiguousarray(cols[name], dtype=dtype).tofile(tmp)
+        os.replace(tmp, out / f"{name}.bin")
+    session_index(ts).tofile(out / "index.tmp")
+    os.replace(out / "index.tmp", out / "index.bin")
+
+    meta = {"version": VERSION, "rows": len(ts),
+            "dtypes": {k: np.dtype(v).str for k, v in dtypes.items()}, **key}
+    tmp = out / "meta.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, out / "meta.json")
+
+
+def remove(symbol: str, root: Path = STORE_DIR):
+    shutil.rmtree(symbol_dir(symbol, root), ignore_errors=True)
+
+
+class Columns:
+    """Memory-mapped bars of one symbol; slicing returns zero-copy views."""
+    __slots__ = ("symbol", *COLUMNS, "sessions", "offsets")
+
+    def __init__(self, symbol: str, cols: dict[str, np.ndarray],
+                 sessions: np.ndarray, offsets: np.ndarray):
+        self.symbol = symbol
+        for k in COLUMNS:
+            setattr(self, k, cols[k])
+        self.sessions, self.offsets = sessions, offsets
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return getattr(self, name)
+
+    def rows(self, start=None, end=None) -> slice:
+        """Row range of ``[start, end]``; date-only bounds use the session index."""
+        lo = 0 if start is None else self._bound(start, "left")
+        hi = len(self) if end is None else self._bound(end, "right")
+        return slice(lo, max(lo, hi))
+
+    def _bound(self, when, side: str) -> int:
+        ts = pd.Timestamp(when)
+        ts = ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+        if isinstance(when, str) and len(when) <= 10:        # whole session(s)
+            k = np.searchsorted(self.sessions, ts.value, side=side)
+            return int(self.offsets[k]) if k < len(self.offsets) else len(self)
+        return int(np.searchsorted(self.timestamp, ts.value, side=side))
+
+    def window(self, start=None, end=None) -> "Columns":
+        r = self.rows(start, end)
+        k0 = max(int(np.searchsorted(self.offsets, r.start, side="right")) - 1, 0)
+        k1 = int(np.searchsorted(self.offsets, r.stop))
+        return Columns(self.symbol, {k: self[k][r] for k in COLUMNS},
+                       self.sessions[k0:k1],
+                       np.maximum(self.offsets[k0:k1] - r.start, 0))
+
+    def frame(self) -> pd.DataFrame:
+        """OHLCV DataFrame on a UTC index (copies; for pandas-only consumers)."""
+        idx = pd.DatetimeIndex(np.asarray(self.timestamp).view("datetime64[ns]"),
+                               tz="UTC", name="timestamp")
+        return pd.DataFrame({k: np.asarray(self[k]) for k in FIELDS}, index=idx)
+
+
+def load(symbol: str, root: Path = STORE_DIR) -> Columns:
+    """Open *symbol*'s column files memory-mapped (read-only)."""
+    meta = read_meta(symbol, root)
+    if meta is None:
+        raise FileNotFoundError(symbol_dir(symbol, root) / "meta.json")
+    folder, n = symbol_dir(symbol, root), meta["rows"]
+    cols = {k: _map(folder / f"{k}.bin", np.dtype(meta["dtypes"][k]), (n,)) for k in COLUMNS}
+    size = (folder / "index.bin").stat().st_size // 16
+    index = _map(folder / "index.bin", np.dtype(np.int64), (size, 2))
+    return Columns(symbol, cols, index[:, 0], index[:, 1])
+
+
+def _map(path: Path, dtype: np.dtype, shape: tuple) -> np.ndarray:
+    if shape[0] == 0:                       # mmap cannot map an empty file
+        return np.empty(shape, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
@@ -4,12 +4,15 @@ import os
 # PROJECT_ROOT should be the directory containing this file’s parent folder (ibot/)
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
-# now data paths point under <repo root>/data/...
-DATA_RAW       = PROJECT_ROOT / "data" / "raw"
-DATA_PROCESSED = PROJECT_ROOT / "data" / "processed"
+# data/, models/, reports/ and logs/ live under IBOT_HOME (default: the repo
+# root) so benchmarks and scratch runs can point the whole bot elsewhere
+WORK_ROOT = Path(os.getenv("IBOT_HOME", PROJECT_ROOT))
 
-LOG_DIR = PROJECT_ROOT / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+# now data paths point under <work root>/data/...
+DATA_RAW       = WORK_ROOT / "data" / "raw"
+DATA_PROCESSED = WORK_ROOT / "data" / "processed"
+
+LOG_DIR = WORK_ROOT / "logs"          # created by whatever first writes there
 
 # ---------- back-test defaults ----------
 START_CASH   = 10_000
@@ -18,6 +21,10 @@ ATR_MULT     = 2       # for stop/profit
 SHOCK_SIGMA  = 2.5     # daily drop ≥ 2.5σ triggers candidate
 HOLD_DAYS    = 30      # evaluation horizon / max hold
 
+# ---------- intraday engine ----------
+INTRADAY_WINDOW   = 30          # minutes in the rolling return
+INTRADAY_LOOKBACK = 5 * 390     # minutes of 1-minute returns behind σ
+
 
 # ─── Alpaca credentials ───────────────────────────────────────────── ─────────────────────────────────────────────
 ALPACA_API_KEY = os.getenv("ALPACA_API_KEY", "")
@@ -1,33 +1,405 @@
-"""Load 1-min Parquet bars and resample to daily OHLCV."""
+"""Load 1-min Parquet bars, resample to daily OHLCV and keep the on-disk caches."""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 import pyarrow.parquet as pq
 from loguru import logger
 from pathlib import Path
-from .config import DATA_RAW
+from . import colstore, metrics
+from .bars import FIELDS, aggregate, as_ns, resample_frame, session_start
+from .config import DATA_RAW, DATA_PROCESSED, SHOCK_SIGMA
+from .indicators import add_indicators
+
+MINUTE_ROOT   = DATA_RAW / "minute"
+PARTITIONING  = ds.partitioning(pa.schema([("year", pa.int16()), ("month", pa.int8())]),
+                                flavor="hive")
+DAILY_DIR     = DATA_PROCESSED / "daily"
+DAILY_VERSION = 3            # bump when minute_to_daily semantics change
+_META_KEY     = b"ibot"
+
+def minute_path(symbol: str) -> Path:
+    """Legacy single-file layout (``data/raw/{symbol}.parquet``)."""
+    return DATA_RAW / f"{symbol}.parquet"
+
+def minute_dir(symbol: str) -> Path:
+    """Hive-partitioned layout written by ``ibot.ingest``."""
+    return MINUTE_ROOT / f"symbol={symbol}"
+
+def minute_files(symbol: str) -> list[Path]:
+    """Files holding *symbol*'s minute bars: its partitions if it was
+    ingested, else the legacy file (empty when there is neither)."""
+    folder = minute_dir(symbol)
+    if folder.is_dir():
+        return sorted(folder.glob("year=*/month=*/*.parquet"))
+    file = minute_path(symbol)
+    return [file] if file.exists() else []
+
+def has_minute(symbol: str) -> bool:
+    return minute_dir(symbol).is_dir() or minute_path(symbol).exists()
+
+def load_symbol_minute(symbol: str, columns=None, start=None, end=None,
+                       memory_map: bool = False) -> pd.DataFrame:
+    """Return a tz-aware minute-level DataFrame indexed by timestamp.
 
-def load_symbol_minute(symbol: str, columns=None) -> pd.DataFrame:
-    """Return a tz-aware minute-level DataFrame indexed by timestamp."""
-    file = DATA_RAW / f"{symbol}.parquet"
+    ``start``/``end`` (UTC; naive values are taken as UTC) are pushed down to
+    the Parquet reader as ``timestamp`` filters, so row groups outside the
+    window are never decoded, and for a partitioned symbol whole year/month
+    partitions are skipped.  ``end`` is inclusive and a date-only string
+    covers that whole day, mirroring ``.loc[start:end]``.  ``memory_map``
+    reads through an OS mapping instead of buffered file I/O.
+    """
+    with metrics.stage("data.parquet_decode", symbol=symbol) as m:
+        table, presorted = read_minute_table(symbol, columns, start, end, memory_map)
+        df = _table_to_frame(table, presorted=presorted)
+        m.rows = len(df)
+    return df
+
+def read_minute_table(symbol: str, columns=None, start=None, end=None,
+                      memory_map: bool = False) -> tuple[pa.Table, bool]:
+    """Arrow table of *symbol*'s minute bars in ``[start, end]`` and whether
+    it is known to be time-sorted (see ``load_symbol_minute``)."""
+    if columns is not None and "timestamp" not in columns:
+        columns = ["timestamp", *columns]
+    lo, hi, hi_op = _window(start, end)
+
+    folder = minute_dir(symbol)
+    if folder.is_dir():
+        logger.debug(f"Scanning {folder} [{start} → {end}]")
+        fs = pafs.LocalFileSystem(use_mmap=memory_map)
+        dataset = ds.dataset(folder, format="parquet", partitioning=PARTITIONING,
+                             filesystem=fs)
+        ts_type = dataset.schema.field("timestamp").type
+        ts, year, month = ds.field("timestamp"), ds.field("year"), ds.field("month")
+        expr = None
+        if lo is not None:
+            expr = ((ts >= _ts_scalar(lo, ts_type))
+                    & ((year > lo.year) | ((year == lo.year) & (month >= lo.month))))
+        if hi is not None:
+            cond = ((ts <= _ts_scalar(hi, ts_type)) if hi_op == "<=" else (ts < _ts_scalar(hi, ts_type)))
+            cond &= (year < hi.year) | ((year == hi.year) & (month <= hi.month))
+            expr = cond if expr is None else expr & cond
+        if columns is None:
+            columns = [f for f in dataset.schema.names if f not in PARTITIONING.schema.names]
+        return dataset.to_table(columns=columns, filter=expr), False
+
+    file = minute_path(symbol)
     if not file.exists():
         raise FileNotFoundError(file)
-    logger.debug(f"Reading {file}")
-    table = pq.read_table(file, columns=columns)
+    pf = pq.ParquetFile(file, memory_map=memory_map)
+    ts_type = pf.schema_arrow.field("timestamp").type
+    filters = []
+    if lo is not None:
+        filters.append(("timestamp", ">=", _ts_scalar(lo, ts_type)))
+    if hi is not None:
+        filters.append(("timestamp", hi_op, _ts_scalar(hi, ts_type)))
+
+    logger.debug(f"Reading {file} [{start} → {end}]")
+    table = pq.read_table(file, columns=columns, filters=filters or None,
+                          memory_map=memory_map)
+    return table, _is_sorted(pf.metadata)
+
+def _window(start, end) -> tuple[pd.Timestamp | None, pd.Timestamp | None, str]:
+    """UTC bounds of ``[start, end]``; a date-only ``end`` covers that whole day."""
+    lo = None if start is None else _utc(start)
+    if end is None:
+        return lo, None, "<="
+    hi = _utc(end)
+    if isinstance(end, str) and len(end) <= 10:
+        return lo, hi + pd.Timedelta(days=1), "<"
+    return lo, hi, "<="
+
+def _utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+def _ts_scalar(ts: pd.Timestamp, ts_type: pa.DataType) -> pa.Scalar:
+    """Filter literal matching the file's timestamp type (tz-aware or naive)."""
+    if getattr(ts_type, "tz", None) is None:
+        ts = ts.tz_localize(None)
+    return pa.scalar(ts, type=ts_type)
+
+def _is_sorted(md: pq.FileMetaData) -> bool:
+    """True when every row group declares ``timestamp`` ascending and the
+    row groups themselves do not overlap."""
+    names = md.schema.names
+    if "timestamp" not in names:
+        return False
+    col = names.index("timestamp")
+    prev = None
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        sc = rg.sorting_columns
+        if not sc or sc[0].column_index != col or sc[0].descending:
+            return False
+        stats = rg.column(col).statistics
+        if stats is None or not stats.has_min_max:
+            return False
+        if prev is not None and stats.min < prev:
+            return False
+        prev = stats.max
+    return True
+
+def _table_to_frame(table: pa.Table, presorted: bool = False) -> pd.DataFrame:
     df = table.to_pandas()
     if "timestamp" in df.columns:
         df = df.set_index("timestamp")
     df.index = pd.to_datetime(df.index, utc=True)
+    if presorted or df.index.is_monotonic_increasing:
+        return df
     return df.sort_index()
 
-def minute_to_daily(df_min: pd.DataFrame) -> pd.DataFrame:
-    """Aggregate minute bars into daily OHLCV."""
-    o = df_min["open"].resample("1D").first()
-    h = df_min["high"].resample("1D").max()
-    l = df_min["low"].resample("1D").min()
-    c = df_min["close"].resample("1D").last()
-    v = df_min["volume"].resample("1D").sum()
-    daily = pd.concat({"open": o, "high": h, "low": l, "close": c, "volume": v}, axis=1)
-    return daily.dropna(subset=["open"])  # skip holidays
-
-def load_daily(symbols: list[str]) -> dict[str, pd.DataFrame]:
-    """Load & cache daily bars for a list of symbols."""
-    return {sym: minute_to_daily(load_symbol_minute(sym)) for sym in symbols}
+def minute_to_daily(df_min: pd.DataFrame, regular_hours: bool = False) -> pd.DataFrame:
+    """Aggregate minute bars into daily OHLCV, one row per exchange session."""
+    with metrics.stage("data.resample", rows=len(df_min)):
+        return resample_frame(df_min, "1D", regular_hours=regular_hours)
+
+def minute_to_bars(df_min: pd.DataFrame, freq: str, regular_hours: bool = False) -> pd.DataFrame:
+    """Aggregate minute bars into intraday bars (``5min``, ``30min``, ``1h`` …)."""
+    with metrics.stage("data.resample", rows=len(df_min)):
+        return resample_frame(df_min, freq, regular_hours=regular_hours)
+
+# ---------------------------------------------------------------- daily cache
+def daily_path(symbol: str) -> Path:
+    return DAILY_DIR / f"{symbol}.parquet"
+
+def source_stat(symbol: str) -> dict:
+    """Total size / newest mtime of the raw minute files – the daily cache key."""
+    stats = [f.stat() for f in minute_files(symbol)]
+    if not stats:
+        raise FileNotFoundError(minute_dir(symbol))
+    return {"src_size": sum(st.st_size for st in stats),
+            "src_mtime_ns": max(st.st_mtime_ns for st in stats)}
+
+def _read_meta(file: Path) -> dict | None:
+    if not file.exists():
+        return None
+    meta = pq.read_schema(file).metadata or {}
+    if _META_KEY not in meta:
+        return None
+    return json.loads(meta[_META_KEY])
+
+def _write_daily(symbol: str, daily: pd.DataFrame, meta: dict):
+    DAILY_DIR.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(daily, preserve_index=True)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           _META_KEY: json.dumps(meta).encode()})
+    out = daily_path(symbol)
+    tmp = out.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, out)                       # readers never see half a file
+
+def _cache_key(symbol: str) -> dict:
+    return {"version": DAILY_VERSION, "shock_sigma": SHOCK_SIGMA, **source_stat(symbol)}
+
+def refresh_daily(symbol: str) -> str:
+    """Bring the cached daily bars for *symbol* in line with its minute file.
+
+    The cache holds OHLCV plus the ``ibot.indicators`` columns, computed over
+    the symbol's full history.  Returns ``"hit"``, ``"append"`` or
+    ``"build"`` describing what was done.
+    """
+    with metrics.stage("data.daily_refresh", symbol=symbol):
+        return _refresh_daily(symbol)
+
+def _refresh_measured(refresh, symbol: str):
+    """Pool entry point: the refresh result plus the worker's metrics."""
+    return refresh(symbol), metrics.drain()
+
+def _refresh_all(refresh, stale: list[str], workers: int):
+    if workers == 1:
+        for s in stale:
+            refresh(s)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for s, (how, recs) in zip(stale, pool.map(partial(_refresh_measured, refresh), stale)):
+            metrics.merge(recs)
+            logger.debug("{}: {}", s, how)
+
+def _refresh_daily(symbol: str) -> str:
+    want = _cache_key(symbol)
+    meta = _read_meta(daily_path(symbol))
+
+    if meta and all(meta.get(k) == v for k, v in want.items()):
+        return "hit"
+
+    # raw file only grew → re-aggregate from the last cached day onwards
+    if (meta and meta.get("version") == DAILY_VERSION
+            and meta.get("shock_sigma") == SHOCK_SIGMA
+            and want["src_size"] > meta["src_size"]
+            and want["src_mtime_ns"] >= meta["src_mtime_ns"]):
+        cached = pd.read_parquet(daily_path(symbol), columns=list(FIELDS))
+        if not cached.empty:
+            cutoff = cached.index[-1]
+            tail = minute_to_daily(load_symbol_minute(symbol, start=session_start(cutoff)))
+            daily = pd.concat([cached.loc[cached.index < cutoff], tail])
+            _write_daily(symbol, add_indicators(daily), want)
+            logger.debug("Daily cache {}: appended {} bars", symbol, len(tail))
+            return "append"
+
+    daily = minute_to_daily(load_symbol_minute(symbol))
+    _write_daily(symbol, add_indicators(daily), want)
+    logger.debug("Daily cache {}: built {} bars", symbol, len(daily))
+    return "build"
+
+def ensure_daily(symbols: list[str], workers: int | None = None) -> list[str]:
+    """Refresh stale cache entries in parallel; return symbols that have data."""
+    present = [s for s in dict.fromkeys(symbols) if has_minute(s)]
+    for s in set(symbols) - set(present):
+        logger.warning("No minute data for {} ({} or {})", s, minute_dir(s), minute_path(s))
+
+    stale = [s for s in present if _read_meta(daily_path(s)) != _cache_key(s)]
+    if not stale:
+        return present
+
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    logger.info("Updating daily cache for {} symbols ({} workers)", len(stale), workers)
+    _refresh_all(refresh_daily, stale, workers)
+    return present
+
+def read_daily(symbol: str, columns=None) -> pd.DataFrame:
+    """Read cached daily bars (no freshness check – see ``ensure_daily``)."""
+    with metrics.stage("data.daily_read", symbol=symbol) as m:
+        df = pd.read_parquet(daily_path(symbol), columns=columns)
+        m.rows = len(df)
+    return df
+
+def load_daily(symbols: list[str], workers: int | None = None) -> dict[str, pd.DataFrame]:
+    """Load daily bars for a list of symbols via the on-disk cache."""
+    present = ensure_daily(symbols, workers)
+    return {sym: read_daily(sym) for sym in present}
+
+# ---------------------------------------------------------------- latest bars
+LATEST_PATH = DATA_PROCESSED / "latest.parquet"
+LATEST_COLS = ["close", "ret", "sigma20", "atr14", "is_shock"]
+
+def _last_bar(symbol: str, mtime_ns: int) -> dict | None:
+    df = pd.read_parquet(daily_path(symbol), columns=LATEST_COLS)
+    if df.empty:
+        return None
+    return {"date": df.index[-1], **df.iloc[-1].to_dict(), "cache_mtime_ns": mtime_ns}
+
+def latest_bars(symbols: list[str], refresh: bool = False) -> pd.DataFrame:
+    """Each symbol's last cached daily bar and indicators, indexed by symbol.
+
+    Served from ``LATEST_PATH``, one row per symbol tagged with its daily
+    cache file's mtime: a call costs a ``stat`` per symbol plus one small
+    read, and only symbols whose cache changed since are re-read.  With
+    ``refresh`` the daily caches are first brought up to date
+    (``ensure_daily``); otherwise they are taken as they are.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if refresh:
+        ensure_daily(symbols)
+    with metrics.stage("data.latest") as m:
+        mtimes = {}
+        for s in symbols:
+            try:
+                mtimes[s] = daily_path(s).stat().st_mtime_ns
+            except FileNotFoundError:
+                pass
+        snap = pd.read_parquet(LATEST_PATH) if LATEST_PATH.exists() else pd.DataFrame()
+        known = snap["cache_mtime_ns"].to_dict() if len(snap) else {}
+        stale = [s for s, ns in mtimes.items() if known.get(s) != ns]
+        if stale:
+            rows = snap.to_dict("index")
+            for s in stale:
+                rows.pop(s, None)
+                bar = _last_bar(s, mtimes[s])
+                if bar is not None:
+                    rows[s] = bar
+            snap = pd.DataFrame.from_dict(rows, orient="index").rename_axis("symbol")
+            LATEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = LATEST_PATH.with_suffix(".tmp")
+            snap.to_parquet(tmp)
+            os.replace(tmp, LATEST_PATH)
+            logger.debug("Latest bars: re-read {} of {} symbols", len(stale), len(mtimes))
+        out = snap.reindex([s for s in symbols if s in mtimes and s in snap.index])
+        m.rows = len(out)
+    return out
+
+# ---------------------------------------------------------------- column store
+def refresh_columns(symbol: str) -> str:
+    """Rebuild *symbol*'s memory-mapped minute columns when its raw file changed.
+
+    Decodes straight from Arrow into the fixed-width files (no pandas);
+    returns ``"hit"`` or ``"build"``.
+    """
+    want = source_stat(symbol)
+    meta = colstore.read_meta(symbol)
+    if (meta and meta.get("version") == colstore.VERSION
+            and all(meta.get(k) == v for k, v in want.items())):
+        return "hit"
+    with metrics.stage("data.columns_build", symbol=symbol) as m:
+        table, presorted = read_minute_table(symbol, ["timestamp", *FIELDS])
+        ts = as_ns(table.column("timestamp"))
+        if not presorted and (np.diff(ts) < 0).any():
+            table = table.sort_by("timestamp")
+            ts = as_ns(table.column("timestamp"))
+        arrays = {k: table.column(k).to_numpy() for k in FIELDS}
+        keep = ~(np.isnan(arrays["open"]) | np.isnan(arrays["close"]))
+        arrays = {k: a[keep] for k, a in arrays.items()}
+        arrays["timestamp"] = ts[keep]
+        colstore.write(symbol, arrays, want)
+        m.rows = int(keep.sum())
+    logger.debug("Column store {}: built {} bars", symbol, m.rows)
+    return "build"
+
+def ensure_columns(symbols: list[str], workers: int | None = None) -> list[str]:
+    """Refresh stale column-store entries in parallel; return symbols that have data."""
+    present = [s for s in dict.fromkeys(symbols) if has_minute(s)]
+    for s in set(symbols) - set(present):
+        logger.warning("No minute data for {} ({} or {})", s, minute_dir(s), minute_path(s))
+
+    stale = []
+    for s in present:
+        meta = colstore.read_meta(s) or {}
+        if meta.get("version") != colstore.VERSION or any(
+                meta.get(k) != v for k, v in source_stat(s).items()):
+            stale.append(s)
+    if stale:
+        workers = min(workers or os.cpu_count() or 1, len(stale))
+        logger.info("Updating column store for {} symbols ({} workers)", len(stale), workers)
+        _refresh_all(refresh_columns, stale, workers)
+    return present
+
+def minute_columns(symbol: str, start=None, end=None) -> colstore.Columns:
+    """Memory-mapped minute bars of *symbol* (zero-copy views), ``start``/``end``
+    as in ``load_symbol_minute``.  Prices are float32."""
+    refresh_columns(symbol)
+    cols = colstore.load(symbol)
+    return cols if start is None and end is None else cols.window(start, end)
+
+def column_bars(cols: colstore.Columns, freq: str = "1D",
+                regular_hours: bool = False) -> dict[str, np.ndarray]:
+    """``bars.aggregate`` over a column-store window, without building a DataFrame."""
+    with metrics.stage("data.resample", symbol=cols.symbol, rows=len(cols)):
+        return aggregate(cols.timestamp, *(cols[k] for k in FIELDS),
+                         freq=freq, regular_hours=regular_hours)
+
+MIN_BARS = max(14, 20) + 1   # ATR14 / StdDev20 plus one bar for the percent change
+
+def window_feeds(symbols: list[str], start, end,
+                 min_bars: int = MIN_BARS) -> list[tuple[str, pd.DataFrame]]:
+    """Daily feeds for a back-test window: tradable symbols, then SPY last.
+
+    Symbols with fewer than ``min_bars`` days in the window are skipped.
+    """
+    bars = load_daily(symbols + ["SPY"])
+    feeds = []
+    for sym in symbols:
+        if sym not in bars:
+            continue
+        daily = bars[sym].loc[start:end]
+        if len(daily) < min_bars:
+            logger.warning("Skipping {}: only {} days (<{} required)", sym, len(daily), min_bars)
+            continue
+        feeds.append((sym, daily))
+    feeds.append(("SPY", bars["SPY"].loc[start:end]))
+    return feeds
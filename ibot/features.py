@@ -1,21 +1,19 @@
 """Feature engineering & shock label utilities."""
 import pandas as pd
 import numpy as np
-from ta.volatility import AverageTrueRange  # pip install ta
 from ibot.config import SHOCK_SIGMA, HOLD_DAYS
+from ibot.indicators import add_indicators, shock
 
 def add_volatility(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["ret"] = df["close"].pct_change()
-    df["sigma20"] = df["ret"].rolling(20).std(ddof=0)
-    atr = AverageTrueRange(df["high"], df["low"], df["close"], window=14)
-    df["atr14"] = atr.average_true_range()
-    return df
+    return add_indicators(df)
 
 def label_shocks(df: pd.DataFrame, sigma=SHOCK_SIGMA) -> pd.DataFrame:
-    df = add_volatility(df)
-    cond = df["ret"] <= -sigma * df["sigma20"]
-    df["is_shock"] = cond.astype(int)
+    # indicator columns from the daily cache are reused as-is
+    if {"ret", "sigma20", "atr14"} <= set(df.columns):
+        df = df.copy()
+    else:
+        df = add_volatility(df)
+    df["is_shock"] = shock(df["ret"].to_numpy(), df["sigma20"].to_numpy(), sigma).astype(int)
     # target = forward % change over HOLD_DAYS
     df["target_r"] = df["close"].shift(-HOLD_DAYS) / df["close"] - 1.0
     return df
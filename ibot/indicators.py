@@ -0,0 +1,120 @@
+"""Vectorised ret / sigma20 / atr14 / shock indicators shared by training and trading.
+
+One definition for everything that needs these numbers: ``features`` for
+labels, the daily cache (which stores them next to the bars), the
+backtrader feeds and the NumPy engine.  Arrays may be 1-D (one symbol) or
+2-D dates × symbols; windows always run along axis 0.
+
+* ``ret``      – close-to-close percent change
+* ``sigma20``  – population std-dev (ddof=0) of ``ret`` over 20 bars
+* ``atr14``    – Wilder ATR: SMA of the first 14 true ranges, then smoothed
+* ``is_shock`` – ``ret <= -SHOCK_SIGMA * sigma20``
+
+Warm-up values are NaN (so a shock can never fire on them).  A panel
+column with missing rows (a late listing, a skipped session) is computed
+over that symbol's own bars, as its daily cache is, and stays NaN only on
+the rows it has no bar.
+"""
+import numpy as np
+import pandas as pd
+
+from .config import SHOCK_SIGMA
+
+ATR_PERIOD   = 14
+SIGMA_PERIOD = 20
+COLUMNS      = ("ret", "sigma20", "atr14", "is_shock")
+
+
+def pct_change(close: np.ndarray) -> np.ndarray:
+    ret = np.full(close.shape, np.nan)
+    ret[1:] = close[1:] / close[:-1] - 1.0
+    return ret
+
+
+def rolling_std(x: np.ndarray, n: int = SIGMA_PERIOD) -> np.ndarray:
+    """Trailing population std over ``n`` rows; any NaN in the window → NaN."""
+    out = np.full(x.shape, np.nan)
+    if len(x) < n:
+        return out
+    zero = np.zeros((1,) + x.shape[1:])
+    v = np.nan_to_num(x)
+    s1 = np.concatenate([zero, np.cumsum(v, axis=0)])
+    s2 = np.concatenate([zero, np.cumsum(v * v, axis=0)])
+    gaps = np.concatenate([zero, np.cumsum(np.isnan(x), axis=0)])
+    mean = (s1[n:] - s1[:-n]) / n
+    var = (s2[n:] - s2[:-n]) / n - mean * mean
+    out[n - 1:] = np.where(gaps[n:] - gaps[:-n] > 0, np.nan, np.sqrt(np.maximum(var, 0.0)))
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    tr = high - low                                     # first bar: no prior close
+    prev = close[:-1]
+    tr[1:] = np.maximum(high[1:], prev) - np.minimum(low[1:], prev)
+    return tr
+
+
+def own_bars(fn, *arrays: np.ndarray) -> np.ndarray:
+    """``fn(*arrays)`` with every column run over its own bars only.
+
+    Rows where any input is NaN are left out of that column's series and
+    come back NaN; gap-free columns still go through ``fn`` in one call.
+    """
+    arrays = tuple(np.asarray(a, dtype=float) for a in arrays)
+    have = ~np.isnan(arrays).any(axis=0)
+    if have.all():
+        return fn(*arrays)
+    out = np.full(arrays[0].shape, np.nan)
+    if out.ndim == 1:
+        out[have] = fn(*(a[have] for a in arrays))
+        return out
+    full = have.all(axis=0)
+    if full.any():
+        out[:, full] = fn(*(a[:, full] for a in arrays))
+    for j in np.flatnonzero(~full):
+        rows = have[:, j]
+        out[rows, j] = fn(*(a[rows, j] for a in arrays))
+    return out
+
+
+def _wilder(high: np.ndarray, low: np.ndarray, close: np.ndarray, n: int) -> np.ndarray:
+    tr = true_range(high, low, close)
+    atr = np.full(tr.shape, np.nan)
+    if len(tr) < n:
+        return atr
+    atr[n - 1] = tr[:n].mean(axis=0)
+    for t in range(n, len(tr)):
+        atr[t] = atr[t - 1] + (tr[t] - atr[t - 1]) / n
+    return atr
+
+
+def wilder_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               n: int = ATR_PERIOD) -> np.ndarray:
+    return own_bars(lambda h, l, c: _wilder(h, l, c, n), high, low, close)
+
+
+def shock(ret: np.ndarray, sigma20: np.ndarray, sigma: float = SHOCK_SIGMA) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        return ret <= -sigma * sigma20                  # NaN compares False
+
+
+def compute(high, low, close, sigma: float = SHOCK_SIGMA) -> dict[str, np.ndarray]:
+    """All indicator columns for one symbol (1-D) or a dates × symbols panel."""
+    close = np.asarray(close, dtype=float)
+    ret = own_bars(pct_change, close)
+    sigma20 = own_bars(lambda c: rolling_std(pct_change(c)), close)
+    return {
+        "ret":      ret,
+        "sigma20":  sigma20,
+        "atr14":    wilder_atr(high, low, close),
+        "is_shock": shock(ret, sigma20, sigma).astype(np.int8),
+    }
+
+
+def add_indicators(df: pd.DataFrame, sigma: float = SHOCK_SIGMA) -> pd.DataFrame:
+    """Copy of a daily OHLCV frame with the ``COLUMNS`` appended."""
+    out = df.copy()
+    for k, v in compute(df["high"].to_numpy(), df["low"].to_numpy(),
+                        df["close"].to_numpy(), sigma).items():
+        out[k] = v
+    return out
@@ -0,0 +1,188 @@
+"""Append-only ingestion of minute bars into a hive-partitioned dataset.
+
+    data/raw/minute/symbol=AAA/year=2024/month=05/part-0.parquet
+
+Each partition holds one UTC calendar month of one symbol, sorted by
+``timestamp`` and written with declared sorting columns and row groups of
+``ROW_GROUP_ROWS``, so readers (``ibot.data.load_symbol_minute``) can skip
+both whole months and row groups.  New bars are only ever appended after
+the newest stored one: a run rewrites at most the newest existing
+partition (read, extend, write to a temp file, ``os.replace``) and adds
+fresh ones after it, so older months are never touched and readers never
+see a half-written file.
+
+Bars come from a pluggable source – anything with
+``bars(symbol, start, end) -> pa.Table`` (``timestamp`` + OHLCV):
+``AlpacaSource`` for the live API, ``ReplaySource`` to replay local
+``{symbol}.parquet`` files (offline runs, tests, and migrating the legacy
+``data/raw`` layout).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from loguru import logger
+
+from . import metrics
+from .bars import FIELDS, as_ns
+from .config import ALPACA_API_KEY, ALPACA_API_SECRET
+from .data import MINUTE_ROOT
+
+SCHEMA = pa.schema([("timestamp", pa.timestamp("ns", tz="UTC")),
+                    *((k, pa.float64()) for k in FIELDS)])
+ROW_GROUP_ROWS = 32_768          # ~1–4 row groups per month of minute bars
+PART_NAME      = "part-0.parquet"
+WORKERS        = 4
+
+
+# ---------- sources ----------
+class ReplaySource:
+    """Replays ``{root}/{symbol}.parquet`` files (e.g. the legacy ``data/raw``)."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def bars(self, symbol: str, start: pd.Timestamp | None, end: pd.Timestamp | None) -> pa.Table:
+        file = self.root / f"{symbol}.parquet"
+        if not file.exists():
+            return SCHEMA.empty_table()
+        ts_type = pq.read_schema(file).field("timestamp").type
+        filters = []
+        for op, when in ((">=", start), ("<", end)):
+            if when is not None:
+                when = when if getattr(ts_type, "tz", None) else when.tz_localize(None)
+                filters.append(("timestamp", op, pa.scalar(when, type=ts_type)))
+        return pq.read_table(file, columns=list(SCHEMA.names), filters=filters or None)
+
+
+class AlpacaSource:
+    """Minute bars from Alpaca's historical data API (client built lazily)."""
+
+    def __init__(self, client=None, feed: str | None = None):
+        self._client, self.feed = client, feed
+
+    @property
+    def client(self):
+        if self._client is None:
+            from alpaca.data import StockHistoricalDataClient
+            self._client = StockHistoricalDataClient(ALPACA_API_KEY, ALPACA_API_SECRET)
+        return self._client
+
+    def bars(self, symbol: str, start: pd.Timestamp | None, end: pd.Timestamp | None) -> pa.Table:
+        from alpaca.data import TimeFrame
+        from alpaca.data.requests import StockBarsRequest
+
+        req = StockBarsRequest(symbol_or_symbols=symbol, timeframe=TimeFrame.Minute,
+                               start=start, end=end, feed=self.feed)
+        df = self.client.get_stock_bars(req).df
+        if df.empty:
+            return SCHEMA.empty_table()
+        df = df.reset_index()
+        return pa.Table.from_pandas(df[list(SCHEMA.names)], preserve_index=False)
+
+
+# ---------- partitions ----------
+def partition_path(symbol: str, year: int, month: int, root: Path = MINUTE_ROOT) -> Path:
+    return root / f"symbol={symbol}" / f"year={year}" / f"month={month:02d}" / PART_NAME
+
+
+def partitions(symbol: str, root: Path = MINUTE_ROOT) -> list[Path]:
+    """Existing partition files, oldest first (month folders are zero-padded)."""
+    return sorted((root / f"symbol={symbol}").glob(f"year=*/month=*/{PART_NAME}"))
+
+
+def last_timestamp(symbol: str, root: Path = MINUTE_ROOT) -> pd.Timestamp | None:
+    """Newest stored bar, from the newest partition's footer statistics."""
+    parts = partitions(symbol, root)
+    if not parts:
+        return None
+    md = pq.ParquetFile(parts[-1]).metadata
+    col = md.schema.names.index("timestamp")
+    newest = max(md.row_group(i).column(col).statistics.max for i in range(md.num_row_groups))
+    return pd.Timestamp(newest).tz_convert("UTC")
+
+
+def normalize(table: pa.Table) -> pa.Table:
+    """Cast to ``SCHEMA``, sort by time and drop duplicate timestamps (last wins)."""
+    table = table.select(list(SCHEMA.names)).cast(SCHEMA)
+    ts = as_ns(table.column("timestamp"))
+    order = np.argsort(ts, kind="stable")
+    ts = ts[order]
+    keep = np.r_[ts[1:] != ts[:-1], True] if len(ts) else np.empty(0, bool)
+    return table.take(pa.array(order[keep]))
+
+
+def write_partition(path: Path, table: pa.Table):
+    """Write one sorted partition atomically (temp file + ``os.replace``)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")     # dot-prefixed: skipped by dataset discovery
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_ROWS,
+                   sorting_columns=[pq.SortingColumn(0)], write_statistics=True)
+    os.replace(tmp, path)
+
+
+def append(symbol: str, table: pa.Table, root: Path = MINUTE_ROOT) -> int:
+    """Append bars newer than the stored ones; returns the rows added."""
+    table = normalize(table)
+    last = last_timestamp(symbol, root)
+    if last is not None:
+        table = table.filter(pc.greater(table.column("timestamp"),
+                                        pa.scalar(last, type=SCHEMA.field("timestamp").type)))
+    if table.num_rows == 0:
+        return 0
+
+    ts = table.column("timestamp")
+    key = pc.add(pc.multiply(pc.year(ts), 100), pc.month(ts)).to_numpy()
+    bounds = np.flatnonzero(np.r_[True, key[1:] != key[:-1], True])
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        year, month = divmod(int(key[lo]), 100)
+        path = partition_path(symbol, year, month, root)
+        part = table.slice(lo, hi - lo)
+        if path.exists():                  # only ever the newest partition
+            part = pa.concat_tables([pq.read_table(path, schema=SCHEMA), part])
+        write_partition(path, part)
+    return table.num_rows
+
+
+def ingest_symbol(symbol: str, source, start=None, end=None, root: Path = MINUTE_ROOT) -> int:
+    """Fetch what *symbol* is missing before ``end`` (exclusive) and append it.
+
+    ``start`` only matters for a symbol with no partitions yet.
+    """
+    last = last_timestamp(symbol, root)
+    first = last + pd.Timedelta(1, "ns") if last is not None else _utc(start)
+    with metrics.stage("ingest.symbol", symbol=symbol) as m:
+        m.rows = append(symbol, source.bars(symbol, first, _utc(end)), root)
+    logger.debug("Ingest {}: {} bars after {}", symbol, m.rows, last)
+    return m.rows
+
+
+def ingest(symbols: list[str], source, start=None, end=None, workers: int = WORKERS,
+           root: Path = MINUTE_ROOT) -> dict[str, int]:
+    """Bring every symbol's partitions up to ``end`` (one thread per symbol,
+    up to ``workers``); returns rows added per symbol (-1 on failure)."""
+    def one(sym):
+        try:
+            return ingest_symbol(sym, source, start, end, root)
+        except Exception as e:
+            logger.warning("Ingest {} failed: {}", sym, e)
+            return -1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        added = dict(zip(symbols, pool.map(one, symbols)))
+    logger.info("Ingested {} bars for {} symbols ({} failed)",
+                sum(n for n in added.values() if n > 0), len(symbols),
+                sum(n < 0 for n in added.values()))
+    return added
+
+
+def _utc(ts) -> pd.Timestamp | None:
+    if ts is None:
+        return None
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
@@ -0,0 +1,272 @@
+"""Minute-resolution shock-rebound back-test.
+
+The daily engines only see one bar per session, so entries and stop/limit
+exits happen on closes.  Here the same rules run on the raw minute bars:
+
+* a shock is a rolling ``window``-minute return (within one session) of at
+  most ``-shock_sigma`` × the recent 1-minute return σ scaled by
+  √``window`` (σ over the last ``lookback`` minutes, overnight gaps ignored);
+* the entry fills at the next minute's open; the stop / limit sit
+  ``atr_mult`` × the previous session's daily ``atr14`` away and are checked
+  against every later minute's low / high (stop first when both trade in
+  the same minute, gap-through fills at the open);
+* a position still open ``hold_days`` sessions later exits at that
+  session's first minute.
+
+Minute bars are read as memory-mapped views of the column store
+(``ibot.colstore``), and nothing is built per minute in Python: shocks are found with
+array ops per symbol, exits by scanning the mapped high/low slices, and the
+(rare) fills are merged across symbols in time order with a heap, so cash
+and sizing see events exactly in the order they happened.  Equity is
+marked at every session close, like the daily engines.
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from . import indicators as ind_
+from . import metrics
+from .bars import RTH_OPEN, RTH_CLOSE, local_ns
+from .config import (START_CASH, RISK_BUDGET, ATR_MULT, HOLD_DAYS, SHOCK_SIGMA,
+                     SLIPPAGE_PERC, INTRADAY_WINDOW, INTRADAY_LOOKBACK)
+from .data import ensure_columns, load_daily, minute_columns
+from .ledger import Ledger
+from .taxes import TaxLots
+
+_SCAN = 4096             # minutes per high/low scan step
+
+_MIN_NS = 60 * 1_000_000_000
+_DAY_NS = 1440 * _MIN_NS
+
+
+# ---------- signals ----------
+def _rolling_nanstd(x: np.ndarray, n: int, min_count: int) -> np.ndarray:
+    """Trailing population std over ``n`` rows ignoring NaNs (NaN below ``min_count``)."""
+    out = np.full(x.shape, np.nan)
+    if len(x) < n:
+        return out
+    ok = ~np.isnan(x)
+    v = np.where(ok, x, 0.0)
+    s0 = np.concatenate([[0], np.cumsum(ok)])
+    s1 = np.concatenate([[0.0], np.cumsum(v)])
+    s2 = np.concatenate([[0.0], np.cumsum(v * v)])
+    cnt = s0[n:] - s0[:-n]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (s1[n:] - s1[:-n]) / cnt
+        var = (s2[n:] - s2[:-n]) / cnt - mean * mean
+    out[n - 1:] = np.where(cnt >= min_count, np.sqrt(np.maximum(var, 0.0)), np.nan)
+    return out
+
+
+def intraday_shocks(ts: np.ndarray, close: np.ndarray, window: int = INTRADAY_WINDOW,
+                    lookback: int = INTRADAY_LOOKBACK, sigma: float = SHOCK_SIGMA,
+                    regular_hours: bool = True) -> np.ndarray:
+    """Row indices where the rolling intraday return is a σ-shock."""
+    day_ns = local_ns(np.asarray(ts))
+    day = day_ns // _DAY_NS
+    close = np.asarray(close, dtype=float)
+
+    r1 = ind_.pct_change(close)
+    r1[1:][day[1:] != day[:-1]] = np.nan                # overnight gaps are not intraday moves
+    sig = _rolling_nanstd(r1, lookback, lookback // 2) * np.sqrt(window)
+
+    rw = np.full(close.shape, np.nan)
+    same = day[window:] == day[:-window]
+    rw[window:] = np.where(same, close[window:] / close[:-window] - 1.0, np.nan)
+
+    hit = ind_.shock(rw, sig, sigma)
+    if regular_hours:
+        mod = (day_ns % _DAY_NS) // _MIN_NS
+        hit &= (mod >= RTH_OPEN) & (mod < RTH_CLOSE)
+    return np.flatnonzero(hit)
+
+
+class _Symbol:
+    """Per-symbol view of the test window: mapped arrays, signals, sessions."""
+    __slots__ = ("name", "a", "lo", "hi", "shocks", "sess_day", "sess_first", "atr_prev")
+
+    def __init__(self, name: str, daily: pd.DataFrame, start, end,
+                 window: int, lookback: int, sigma: float, regular_hours: bool):
+        self.name = name
+        self.a = a = minute_columns(name)
+        rows = a.rows(start, end)
+        self.lo, self.hi = rows.start, rows.stop
+        warm = max(0, self.lo - lookback - window)     # σ warm-up before the window
+
+        with metrics.stage("intraday.signals", symbol=name, rows=int(self.hi - warm)):
+            sh = intraday_shocks(a.timestamp[warm:self.hi], a.close[warm:self.hi],
+                                 window, lookback, sigma, regular_hours) + warm
+            self.shocks = sh[sh >= self.lo]
+
+        k0, k1 = np.searchsorted(a.offsets, [self.lo, self.hi])
+        self.sess_day = np.asarray(a.sessions[k0:k1]) // _DAY_NS
+        self.sess_first = np.asarray(a.offsets[k0:k1])
+
+        # stop distance uses the last *completed* session's ATR
+        labels = daily.index.tz_convert("UTC").tz_localize(None).as_unit("ns").asi8 // _DAY_NS
+        pos = np.searchsorted(labels, self.sess_day) - 1
+        atr = daily["atr14"].to_numpy(dtype=float)
+        self.atr_prev = np.where(pos >= 0, atr[np.maximum(pos, 0)], np.nan)
+
+    def next_shock(self, after: int) -> int | None:
+        k = np.searchsorted(self.shocks, after, side="right")
+        return int(self.shocks[k]) if k < len(self.shocks) else None
+
+    def session(self, i: int) -> int:
+        return int(np.searchsorted(self.sess_first, i, side="right")) - 1
+
+    def find_exit(self, start: int, stop: float, limit: float, until: int) -> int:
+        """First row in ``[start, until)`` whose low/high reaches stop/limit, else ``until``."""
+        low, high = self.a.low, self.a.high
+        i = start
+        while i < until:
+            j = min(i + _SCAN, until)
+            hit = (low[i:j] <= stop) | (high[i:j] >= limit)
+            k = int(hit.argmax())
+            if hit[k]:
+                return i + k
+            i = j
+        return until
+
+
+def run(symbols: list[str], start, end,
+        cash: float = START_CASH,
+        risk_budget: float = RISK_BUDGET,
+        atr_mult: float = ATR_MULT,
+        hold_days: int = HOLD_DAYS,
+        shock_sigma: float = SHOCK_SIGMA,
+        slippage: float = SLIPPAGE_PERC,
+        window: int = INTRADAY_WINDOW,
+        lookback: int = INTRADAY_LOOKBACK,
+        regular_hours: bool = True) -> Ledger:
+    """Back-test ``symbols`` on minute bars between ``start`` and ``end`` (inclusive days).
+
+    Frictions match the daily engines: fills are slipped by ``slippage``
+    (within the minute's high/low), the same amount is charged again as an
+    explicit slippage cost, and FIFO capital-gains tax is paid on exit.
+    """
+    cash0, daily = cash, load_daily(symbols)
+    ensure_columns(list(daily))
+    syms = [_Symbol(s, daily[s], str(start)[:10], str(end)[:10], window, lookback,
+                    shock_sigma, regular_hours)
+            for s in daily]
+
+    tax, res = TaxLots(), Ledger()
+    heap:  list[tuple[int, int, int, int]] = []          # (ts, 0 = exit / 1 = entry, symbol, row)
+    open_: dict[int, tuple[int, float, float, int]] = {} # symbol → (size, price, risk, held row)
+    flows: list[tuple[int, float]] = []                  # (event ts, cash after it)
+    held:  list[list[int]] = []                          # [symbol, entry ts, exit ts, size]
+
+    def push_entry(k: int, after: int):
+        i = syms[k].next_shock(after)
+        if i is not None:
+            heapq.heappush(heap, (int(syms[k].a.timestamp[i]), 1, k, i))
+
+    for k in range(len(syms)):
+        push_entry(k, -1)
+
+    with metrics.stage("intraday.run", rows=sum(int(s.hi - s.lo) for s in syms)):
+        while heap:
+            t, is_entry, k, i = heapq.heappop(heap)
+            s, a = syms[k], syms[k].a
+            if not is_entry:
+                size, entry_px, risk, h = open_.pop(k)
+                o, low, high = float(a.open[i]), float(a.low[i]), float(a.high[i])
+                if low <= entry_px - risk:
+                    px = min(o, entry_px - risk)
+                elif high >= entry_px + risk:
+                    px = max(o, entry_px + risk)
+                else:                                    # hold limit reached
+                    px = o
+                price = max(px * (1 - slippage), low)
+                dt = pd.Timestamp(t)
+                gross = (price - entry_px) * size
+                t_amt = gross - tax.sell(s.name, size, price, dt)
+                slip = size * price * slippage
+                cash += size * price - t_amt - slip
+                res.close(s.name, dt, price, gross, t_amt, slip)
+                flows.append((t, cash))
+                held[h][2] = t
+                push_entry(k, i)
+                continue
+
+            # shock at row i → market buy at the next minute's open
+            e = i + 1
+            risk = s.atr_prev[s.session(i)] * atr_mult
+            shares = int(cash * risk_budget / risk) if risk > 0 else 0
+            if e >= s.hi or shares <= 0:
+                push_entry(k, i)
+                continue
+            price = min(float(a.open[e]) * (1 + slippage), float(a.high[e]))
+            cost = shares * price * (1 + slippage)      # what the fill takes from cash
+            if cash < cost:
+                push_entry(k, i)
+                continue
+            te = int(a.timestamp[e])
+            dt = pd.Timestamp(te)
+            cash -= cost
+            tax.buy(s.name, shares, price, dt)
+            res.open(s.name, dt, shares, price)
+            flows.append((te, cash))
+            open_[k] = (shares, price, risk, len(held))
+            held.append([k, te, -1, shares])
+
+            d = s.session(e) + hold_days
+            until = int(s.sess_first[d]) if d < len(s.sess_first) else int(s.hi)
+            j = s.find_exit(e + 1, price - risk, price + risk, until)
+            if j < s.hi:
+                heapq.heappush(heap, (int(a.timestamp[j]), 0, k, j))
+
+    last = _mark_sessions(res, syms, daily, start, end, cash0, flows, held)
+
+    # still open at the end of the window → realise at the last close
+    for k, (size, entry_px, _, _) in open_.items():
+        s = syms[k]
+        price = float(s.a.close[s.hi - 1])
+        dt = pd.Timestamp(int(s.a.timestamp[s.hi - 1]))
+        gross = (price - entry_px) * size
+        t_amt = gross - tax.sell(s.name, size, price, dt)
+        slip = size * price * slippage
+        cash += size * price - t_amt - slip
+        res.close(s.name, dt, price, gross, t_amt, slip)
+    if open_ and last is not None:
+        res.mark(last, cash)                             # after the liquidation's tax + slippage
+    return res
+
+
+def _mark_sessions(res: Ledger, syms: list[_Symbol], daily: dict[str, pd.DataFrame],
+                   start, end, cash0: float, flows: list, held: list):
+    """Mark equity at every session close from the cash events and held
+    intervals; returns the last session marked (None if there is none)."""
+    frames = {s.name: daily[s.name].loc[start:end, "close"] for s in syms}
+    if not frames:
+        return None
+    close = pd.DataFrame(frames).sort_index().ffill()
+    dates = close.index.tz_convert("UTC").tz_localize(None)
+    day = dates.as_unit("ns").asi8 // _DAY_NS
+    T = len(day)
+
+    def session_of(ts: list[int]) -> np.ndarray:
+        return local_ns(np.asarray(ts, dtype=np.int64)) // _DAY_NS
+
+    # share count held through each session close (entry day .. day before exit)
+    delta = np.zeros((T + 1, len(syms)))
+    if held:
+        k, t_in, t_out, size = map(np.asarray, zip(*held))
+        first = np.searchsorted(day, session_of(t_in))
+        last = np.where(t_out >= 0, np.searchsorted(day, session_of(np.maximum(t_out, 0))), T)
+        np.add.at(delta, (first, k), size)
+        np.add.at(delta, (last, k), -size)
+    shares = np.cumsum(delta, axis=0)[:T]
+
+    cash = np.full(T, cash0)
+    if flows:
+        ts, after = zip(*flows)
+        n = np.searchsorted(session_of(list(ts)), day, side="right")
+        cash = np.where(n > 0, np.asarray(after)[np.maximum(n - 1, 0)], cash0)
+
+    value = cash + (shares * np.nan_to_num(close.to_numpy())).sum(axis=1)
+    for dt, v in zip(dates, value):
+        res.mark(dt, v)
+    return dates[-1] if T else None
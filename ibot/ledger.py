@@ -0,0 +1,121 @@
+"""Array-backed trade / equity bookkeeping shared by the back-test engines.
+
+Round-trips and equity samples live in growable column arrays instead of
+lists of dicts and tuples, with a symbol → open-row index so closing a
+trade is O(1).  ``trades_frame()`` / ``equity_series()`` hand the filled
+prefix of those arrays to pandas without copying the columns.
+"""
+import numpy as np
+import pandas as pd
+
+_TRADE_COLUMNS = {
+    "symbol":      np.int32,           # code into Ledger.symbols
+    "entry_date":  "datetime64[ns]",
+    "exit_date":   "datetime64[ns]",   # NaT while open
+    "size":        np.int64,
+    "entry_price": np.float64,
+    "exit_price":  np.float64,
+    "gross":       np.float64,
+    "tax":         np.float64,
+    "slippage":    np.float64,
+    "net":         np.float64,
+}
+TRADE_COLUMNS = list(_TRADE_COLUMNS)
+
+
+class _Columns:
+    """Struct-of-arrays that doubles its capacity when full."""
+    __slots__ = ("cols", "n")
+
+    def __init__(self, dtypes: dict, capacity: int):
+        self.cols = {k: np.empty(max(capacity, 1), dtype=v) for k, v in dtypes.items()}
+        self.n = 0
+
+    def reserve(self) -> int:
+        """Index of a fresh row, growing the arrays if needed."""
+        i = self.n
+        if i == len(next(iter(self.cols.values()))):
+            self.cols = {k: np.resize(a, 2 * len(a)) for k, a in self.cols.items()}
+        self.n += 1
+        return i
+
+    def view(self, name: str) -> np.ndarray:
+        return self.cols[name][:self.n]
+
+
+class Ledger:
+    """Trades, equity samples and the open-trade index of one back-test run."""
+    __slots__ = ("symbols", "_codes", "_trades", "_equity", "_open")
+
+    def __init__(self, capacity: int = 1024):
+        self.symbols: list[str] = []
+        self._codes:  dict[str, int] = {}
+        self._trades = _Columns(_TRADE_COLUMNS, capacity // 8)
+        self._equity = _Columns({"date": "datetime64[ns]", "value": np.float64}, capacity)
+        self._open:   dict[str, int] = {}          # symbol → trade row
+
+    # ---------- equity ----------
+    def mark(self, dt, value: float):
+        i = self._equity.reserve()
+        self._equity.cols["date"][i] = dt
+        self._equity.cols["value"][i] = value
+
+    def equity_series(self) -> pd.Series:
+        """End-of-bar equity on a UTC index (values are a view, not a copy)."""
+        idx = pd.DatetimeIndex(self._equity.view("date"), tz="UTC")
+        return pd.Series(self._equity.view("value"), index=idx, copy=False)
+
+    # ---------- trades ----------
+    def _code(self, sym: str) -> int:
+        code = self._codes.get(sym)
+        if code is None:
+            code = self._codes[sym] = len(self.symbols)
+            self.symbols.append(sym)
+        return code
+
+    def is_open(self, sym: str) -> bool:
+        return sym in self._open
+
+    def open(self, sym: str, dt, size: int, price: float) -> int:
+        i = self._trades.reserve()
+        c = self._trades.cols
+        c["symbol"][i], c["entry_date"][i], c["size"][i] = self._code(sym), dt, size
+        c["entry_price"][i] = price
+        c["exit_date"][i] = np.datetime64("NaT")
+        for k in ("exit_price", "gross", "tax", "slippage", "net"):
+            c[k][i] = np.nan
+        self._open[sym] = i
+        return i
+
+    def resize(self, sym: str, size: int, price: float):
+        """Set ``sym``'s open trade to ``size`` shares at average ``price``
+        (another fill of the same entry)."""
+        i = self._open[sym]
+        c = self._trades.cols
+        c["size"][i], c["entry_price"][i] = size, price
+
+    def close(self, sym: str, dt, price: float, gross: float, tax: float,
+              slippage: float, size: int | None = None, entry_dt=None,
+              entry_price: float | None = None):
+        """Fill in the exit of ``sym``'s open trade.
+
+        With no open trade a complete row is written from ``size`` /
+        ``entry_dt`` / ``entry_price`` instead.
+        """
+        i = self._open.pop(sym, None)
+        if i is None:
+            i = self.open(sym, entry_dt, size, entry_price)
+            del self._open[sym]
+        c = self._trades.cols
+        c["exit_date"][i], c["exit_price"][i] = dt, price
+        c["gross"][i], c["tax"][i], c["slippage"][i] = gross, tax, slippage
+        c["net"][i] = gross - tax - slippage
+
+    def __len__(self) -> int:
+        return self._trades.n
+
+    def trades_frame(self) -> pd.DataFrame:
+        """One row per trade in ``TRADE_COLUMNS`` order; numeric columns are views."""
+        cols = {k: self._trades.view(k) for k in TRADE_COLUMNS}
+        cols["symbol"] = pd.Categorical.from_codes(cols["symbol"], self.symbols)
+        return pd.DataFrame(cols, copy=False)
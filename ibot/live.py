@@ -0,0 +1,517 @@
+"""Streaming live / paper engine for the shock-rebound rules.
+
+    feed ──Bar──▶ LiveEngine ──Order──▶ broker ──Fill──▶ LiveEngine
+
+An asyncio loop consumes a bar stream (``ReplayFeed`` offline,
+``AlpacaFeed`` live).  Every symbol keeps a ``RollingState`` whose
+``ret`` / ``sigma20`` / ``atr14`` follow the ``ibot.indicators``
+definitions but are updated in O(1) per bar – a 20-slot ring of returns
+with running sums and Wilder's recursion – and are seeded from the daily
+cache, so nothing is recomputed over a window.  Entries and exits are the
+``ShockReboundStrategy`` ones (ungated: no model); orders go to any
+broker with ``start`` / ``submit`` / ``sync`` / ``stop`` coroutines:
+``SimBroker`` fills at the symbol's next bar open slipped like
+backtrader's ``BackBroker``, ``AlpacaBroker`` places market orders on the
+(paper) account.  ``start`` returns the account's cash and holdings, which
+the engine adopts before the first bar.  Fills – possibly several per
+order – are booked through ``TaxLots`` with the same extra slippage charge
+as the back-tests, into a ``Ledger``; a trade closes once it is flat.
+
+Each bar's signal-to-order latency (bar received → order handed to the
+broker) and processing time are kept for ``latency_stats``.
+"""
+import asyncio
+import math
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from . import metrics
+from .config import (START_CASH, RISK_BUDGET, ATR_MULT, HOLD_DAYS, SHOCK_SIGMA,
+                     SLIPPAGE_PERC, ALPACA_API_KEY, ALPACA_API_SECRET, ALPACA_PAPER)
+from .indicators import ATR_PERIOD, SIGMA_PERIOD
+from .ledger import Ledger
+from .taxes import TaxLots
+
+
+class Bar(NamedTuple):
+    symbol: str
+    ts:     pd.Timestamp     # session (daily bars: the UTC date)
+    open:   float
+    high:   float
+    low:    float
+    close:  float
+    volume: float = 0.0
+
+
+class Order(NamedTuple):
+    symbol: str
+    qty:    int              # > 0 buy, < 0 sell
+    ts:     pd.Timestamp     # bar that triggered it
+
+
+class Fill(NamedTuple):
+    symbol: str
+    qty:    int              # signed like the order; 0 = nothing (more) filled
+    price:  float
+    ts:     pd.Timestamp
+    done:   bool = True      # last report for the order (False: partial fill)
+
+
+class Account(NamedTuple):
+    cash:      float
+    positions: dict[str, tuple[int, float]]    # symbol → (shares, average entry price)
+
+
+# ---------- indicators ----------
+class RollingState:
+    """``ret`` / ``sigma20`` / ``atr14`` of one symbol, O(1) per ``update``."""
+    __slots__ = ("n", "close", "ret", "sigma20", "atr14", "_buf", "_i", "_s1", "_s2", "_gaps",
+                 "_trs")
+
+    def __init__(self):
+        self.n = 0                                  # bars seen
+        self.close = self.ret = self.sigma20 = self.atr14 = math.nan
+        self._buf = [math.nan] * SIGMA_PERIOD       # last SIGMA_PERIOD returns
+        self._i, self._s1, self._s2, self._gaps = 0, 0.0, 0.0, SIGMA_PERIOD
+        self._trs = 0.0                             # sum of the first ATR_PERIOD TRs
+
+    @classmethod
+    def seed(cls, daily: pd.DataFrame) -> "RollingState":
+        """State after the bars of ``daily`` (cached ``close``/``ret``/``atr14``)."""
+        st = cls()
+        if len(daily) <= max(SIGMA_PERIOD, ATR_PERIOD):
+            for h, l, c in daily[["high", "low", "close"]].itertuples(index=False):
+                st.update(h, l, c)
+            return st
+        for r in daily["ret"].to_numpy(dtype="float64")[-SIGMA_PERIOD:]:
+            st._push(r)
+        last = daily.iloc[-1]
+        st.n, st.close = len(daily), float(last["close"])
+        st.ret, st.atr14 = float(last["ret"]), float(last["atr14"])
+        st.sigma20 = st._std()
+        return st
+
+    def _push(self, r: float):
+        old = self._buf[self._i]
+        if old != old:
+            self._gaps -= 1
+        else:
+            self._s1 -= old
+            self._s2 -= old * old
+        if r != r:
+            self._gaps += 1
+        else:
+            self._s1 += r
+            self._s2 += r * r
+        self._buf[self._i] = r
+        self._i = (self._i + 1) % SIGMA_PERIOD
+        if self._i == 0:                            # re-sum once per lap: no drift
+            ok = [x for x in self._buf if x == x]
+            self._s1, self._s2 = math.fsum(ok), math.fsum(x * x for x in ok)
+
+    def _std(self) -> float:
+        if self._gaps:
+            return math.nan
+        mean = self._s1 / SIGMA_PERIOD
+        return math.sqrt(max(self._s2 / SIGMA_PERIOD - mean * mean, 0.0))
+
+    def update(self, high: float, low: float, close: float):
+        prev = self.close
+        self.ret = close / prev - 1.0 if self.n else math.nan
+        self._push(self.ret)
+        self.sigma20 = self._std()
+
+        tr = high - low if not self.n else max(high, prev) - min(low, prev)
+        if self.n < ATR_PERIOD:                     # warm-up: SMA of the first TRs
+            self._trs += tr
+            if self.n == ATR_PERIOD - 1:
+                self.atr14 = self._trs / ATR_PERIOD
+        else:
+            self.atr14 += (tr - self.atr14) / ATR_PERIOD
+        self.n += 1
+        self.close = close
+
+
+class Position(NamedTuple):
+    size:  int               # shares still held
+    price: float             # average entry price
+    dt:    datetime
+    bar:   int               # RollingState.n of the fill bar
+    sold:  int = 0           # exit fills so far: shares, proceeds,
+    value: float = 0.0
+    gross: float = 0.0       # and the gross P&L, tax and slippage booked on them
+    tax:   float = 0.0
+    slip:  float = 0.0
+
+
+# ---------- engine ----------
+class LiveEngine:
+    """Applies the strategy to a bar stream and books the broker's fills."""
+
+    def __init__(self, broker, cash: float = START_CASH, risk_budget: float = RISK_BUDGET,
+                 atr_mult: float = ATR_MULT, hold_days: int = HOLD_DAYS,
+                 shock_sigma: float = SHOCK_SIGMA, slippage: float = SLIPPAGE_PERC):
+        self.broker, self.cash = broker, cash
+        self.risk_budget, self.atr_mult, self.hold_days = risk_budget, atr_mult, hold_days
+        self.shock_sigma, self.slippage = shock_sigma, slippage
+
+        self.state:   dict[str, RollingState] = {}
+        self.pos:     dict[str, Position] = {}
+        self.pending: set[str] = set()             # symbols with an order in flight
+        self.last:    dict[str, float] = {}        # last close, for marking
+        self.tax      = TaxLots()
+        self.ledger   = Ledger()
+        self.session  = None
+        self.order_ns: list[int] = []              # bar received → order submitted
+        self.bar_ns:   list[int] = []              # bar received → bar handled
+
+    def warm(self, history: dict[str, pd.DataFrame]):
+        """Seed every symbol's indicators from its cached daily bars."""
+        for sym, daily in history.items():
+            if len(daily):
+                self.state[sym] = RollingState.seed(daily)
+                self.last[sym] = float(daily["close"].iloc[-1])
+
+    def reconcile(self, account: Account):
+        """Start from the broker's cash and holdings instead of flat.
+
+        Adopted positions enter the ledger and the tax lots today at their
+        average entry price; their hold clock starts at the next bar.
+        """
+        self.cash = account.cash
+        dt = _naive(pd.Timestamp.now("UTC").normalize())
+        for sym, (size, price) in account.positions.items():
+            if size <= 0:
+                logger.warning("Ignoring short position of {} {}", size, sym)
+                continue
+            st = self.state.get(sym)
+            self.pos[sym] = Position(size, price, dt, st.n if st else 0)
+            self.last.setdefault(sym, price)
+            self.tax.buy(sym, size, price, dt)
+            self.ledger.open(sym, dt, size, price)
+        logger.info("Account: ${:,.2f} cash, {} positions", self.cash, len(self.pos))
+
+    def value(self) -> float:
+        return self.cash + sum(p.size * self.last[s] for s, p in self.pos.items())
+
+    async def run(self, feed, liquidate: bool = False) -> Ledger:
+        """Consume ``feed`` to its end; ``liquidate`` realises what is still
+        held at the last closes, as the back-tests do."""
+        account = await self.broker.start()
+        if account is not None:
+            self.reconcile(account)
+        try:
+            async for bar in feed:
+                await self.on_bar(bar)
+        finally:
+            await self.broker.stop()
+        if self.session is not None:
+            if liquidate:
+                self._liquidate()
+            self.ledger.mark(self.session, self.value())
+        metrics.record("live.on_bar", sum(self.bar_ns) / 1e9, rows=len(self.bar_ns))
+        return self.ledger
+
+    async def on_bar(self, bar: Bar):
+        t0 = time.perf_counter_ns()
+        dt = _naive(bar.ts)
+        if self.session is not None and dt != self.session:
+            self.ledger.mark(self.session, self.value())   # previous session closed
+        self.session = dt
+
+        for fill in await self.broker.sync(bar):
+            self.on_fill(fill)
+        st = self.state.get(bar.symbol)
+        if st is None:
+            st = self.state[bar.symbol] = RollingState()
+        st.update(bar.high, bar.low, bar.close)
+        self.last[bar.symbol] = bar.close
+
+        order = self.decide(bar.symbol, st, bar.ts)
+        if order is not None:
+            self.pending.add(order.symbol)
+            await self.broker.submit(order)
+            self.order_ns.append(time.perf_counter_ns() - t0)
+        self.bar_ns.append(time.perf_counter_ns() - t0)
+
+    def decide(self, sym: str, st: RollingState, ts) -> Order | None:
+        """The strategy's entry / exit rule for one symbol's closed bar."""
+        if sym in self.pending:
+            return None
+        risk = st.atr14 * self.atr_mult
+        pos = self.pos.get(sym)
+        if pos is None:
+            # same condition as features.label_shocks; NaN warm-up never fires
+            if st.ret <= -self.shock_sigma * st.sigma20 and risk > 0:
+                shares = int(self.cash * self.risk_budget / risk)
+                if shares > 0:
+                    return Order(sym, shares, ts)
+            return None
+        held = st.n - pos.bar
+        if (st.close <= pos.price - risk or st.close >= pos.price + risk
+                or held >= self.hold_days):
+            return Order(sym, -pos.size, ts)
+        return None
+
+    def on_fill(self, fill: Fill):
+        sym = fill.symbol
+        if fill.done:
+            self.pending.discard(sym)
+        if fill.qty == 0:
+            if fill.done:
+                logger.warning("Order for {} ended with nothing more filled", sym)
+            return
+        dt, px, size = _naive(fill.ts), fill.price, abs(fill.qty)
+        if fill.qty < 0:
+            self._sell(sym, size, px, dt)
+            return
+        self.tax.buy(sym, size, px, dt)
+        self.cash -= size * px + size * px * self.slippage
+        pos = self.pos.get(sym)
+        if pos is None:
+            st = self.state.get(sym)
+            self.pos[sym] = Position(size, px, dt, (st.n if st else 0) + 1)
+            self.ledger.open(sym, dt, size, px)
+        else:                                      # a further fill of the entry
+            total = pos.size + size
+            price = (pos.size * pos.price + size * px) / total
+            self.pos[sym] = pos._replace(size=total, price=price)
+            self.ledger.resize(sym, total, price)
+
+    def _sell(self, sym: str, size: int, px: float, dt):
+        """Book ``size`` shares of ``sym`` sold at ``px``; the trade is closed
+        in the ledger (at the average exit price) once the position is flat."""
+        pos = self.pos[sym]
+        gross = (px - pos.price) * size
+        tax = gross - self.tax.sell(sym, size, px, dt)
+        slip = size * px * self.slippage
+        self.cash += size * px - tax - slip
+        pos = pos._replace(size=pos.size - size, sold=pos.sold + size,
+                           value=pos.value + size * px, gross=pos.gross + gross,
+                           tax=pos.tax + tax, slip=pos.slip + slip)
+        if pos.size > 0:
+            self.pos[sym] = pos
+            return
+        del self.pos[sym]
+        self.ledger.close(sym, dt, pos.value / pos.sold, pos.gross, pos.tax, pos.slip)
+
+    def _liquidate(self):
+        for sym, pos in list(self.pos.items()):
+            self._sell(sym, pos.size, self.last[sym], self.session)
+
+    def latency_stats(self) -> dict:
+        """Signal-to-order and per-bar latency summary (µs)."""
+        out = {"Bars": len(self.bar_ns), "Orders": len(self.order_ns)}
+        for label, ns in (("Signal→order", self.order_ns), ("Bar", self.bar_ns)):
+            if ns:
+                us = np.asarray(ns) / 1e3
+                out.update({f"{label} p50 µs": f"{np.percentile(us, 50):.0f}",
+                            f"{label} p95 µs": f"{np.percentile(us, 95):.0f}",
+                            f"{label} max µs": f"{us.max():.0f}"})
+        return out
+
+
+def _naive(ts) -> datetime:
+    ts = pd.Timestamp(ts)
+    return (ts.tz_convert("UTC").tz_localize(None) if ts.tz is not None else ts).to_pydatetime()
+
+
+# ---------- offline feed / broker ----------
+class ReplayFeed:
+    """Daily bars replayed session by session, symbols in ``frames`` order,
+    ``interval`` seconds apart.  Acts as the market for a ``SimBroker``: each
+    session is opened on it (pending orders fill) before its bars stream."""
+
+    def __init__(self, frames: dict[str, pd.DataFrame], interval: float = 0.0,
+                 broker: "SimBroker | None" = None):
+        self.frames, self.interval, self.broker = frames, interval, broker
+
+    def __aiter__(self):
+        return self._bars()
+
+    async def _bars(self):
+        rows = pd.concat({s: df[["open", "high", "low", "close", "volume"]]
+                          for s, df in self.frames.items()}, names=["symbol", "ts"])
+        rows = rows.reset_index().sort_values("ts", kind="stable")
+        for _, session in rows.groupby("ts", sort=False):
+            bars = [Bar(*r) for r in session.itertuples(index=False)]
+            await asyncio.sleep(self.interval)      # also lets other tasks run
+            if self.broker is not None:
+                self.broker.open(bars)
+            for bar in bars:
+                yield bar
+
+
+class SimBroker:
+    """Fills orders at their symbol's next session open, slipped by
+    ``slippage`` but kept inside that bar's high/low (backtrader's
+    ``set_slippage_perc``), in submission order; buys the cash cannot
+    cover are rejected.  Cash also pays the extra slippage charge the
+    engine books on every fill, as ``broker.add_cash`` does in the
+    back-tests.  ``ReplayFeed`` drives ``open``."""
+
+    def __init__(self, cash: float = START_CASH, slippage: float = SLIPPAGE_PERC,
+                 latency: float = 0.0):
+        self.cash, self.slippage, self.latency = cash, slippage, latency
+        self.orders: dict[str, Order] = {}
+        self.fills:  list[Fill] = []
+
+    async def start(self) -> Account:
+        return Account(self.cash, {})
+
+    async def stop(self):
+        pass
+
+    async def submit(self, order: Order):
+        if self.latency:
+            await asyncio.sleep(self.latency)       # simulated round trip
+        self.orders[order.symbol] = order
+
+    def open(self, bars: list[Bar]):
+        opening = {b.symbol: b for b in bars}
+        for sym in [s for s in self.orders if s in opening]:
+            order, bar = self.orders.pop(sym), opening[sym]
+            if order.qty > 0:
+                px = min(bar.open * (1 + self.slippage), bar.high)
+                if order.qty * px > self.cash:
+                    self.fills.append(Fill(sym, 0, px, bar.ts))
+                    continue
+            else:
+                px = max(bar.open * (1 - self.slippage), bar.low)
+            self.cash -= order.qty * px + abs(order.qty) * px * self.slippage
+            self.fills.append(Fill(sym, order.qty, px, bar.ts))
+
+    async def sync(self, bar: Bar) -> list[Fill]:
+        fills, self.fills = self.fills, []
+        return fills
+
+
+# ---------- Alpaca ----------
+class AlpacaFeed:
+    """Daily bars from Alpaca's market-data stream (client built lazily).
+
+    The SDK's blocking ``run()`` owns its own event loop, so it runs in a
+    worker thread and hands bars over to this loop thread-safely."""
+
+    def __init__(self, symbols: list[str], feed: str | None = None):
+        self.symbols, self.feed = symbols, feed
+
+    def __aiter__(self):
+        return self._bars()
+
+    async def _bars(self):
+        from alpaca.data.live import StockDataStream
+
+        loop, queue = asyncio.get_running_loop(), asyncio.Queue()
+
+        async def on_bar(b):                         # runs on the stream's loop
+            loop.call_soon_threadsafe(queue.put_nowait, Bar(
+                b.symbol, pd.Timestamp(b.timestamp).normalize(),
+                b.open, b.high, b.low, b.close, b.volume))
+
+        kw = {"feed": self.feed} if self.feed else {}
+        stream = StockDataStream(ALPACA_API_KEY, ALPACA_API_SECRET, **kw)
+        stream.subscribe_daily_bars(on_bar, *self.symbols)
+        task = asyncio.create_task(asyncio.to_thread(stream.run))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            await asyncio.to_thread(stream.stop)
+            await task
+
+
+class AlpacaBroker:
+    """Market orders on the Alpaca account (paper unless ``ALPACA_PAPER`` is
+    off); fills arrive on the trade-update stream – run in a worker thread
+    like ``AlpacaFeed``'s – and are handed over on the next ``sync``.
+
+    ``start`` reads the account's cash and open positions; orders left open
+    by an earlier session are not tracked."""
+
+    def __init__(self, paper: bool = ALPACA_PAPER):
+        self.paper = paper
+        self.fills: list[Fill] = []
+        self._filled: dict[str, tuple[int, float]] = {}  # order id → (qty, notional) reported
+        self._client = self._stream = self._task = self._loop = None
+
+    async def start(self) -> Account:
+        from alpaca.trading.client import TradingClient
+        from alpaca.trading.stream import TradingStream
+
+        self._client = TradingClient(ALPACA_API_KEY, ALPACA_API_SECRET, paper=self.paper)
+        account, held = await asyncio.gather(asyncio.to_thread(self._client.get_account),
+                                             asyncio.to_thread(self._client.get_all_positions))
+        self._stream = TradingStream(ALPACA_API_KEY, ALPACA_API_SECRET, paper=self.paper)
+        self._stream.subscribe_trade_updates(self._on_update)
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(asyncio.to_thread(self._stream.run))
+        return Account(float(account.cash),
+                       {p.symbol: (int(float(p.qty)), float(p.avg_entry_price)) for p in held})
+
+    async def stop(self):
+        if self._stream is not None:
+            await asyncio.to_thread(self._stream.stop)
+            await self._task
+
+    async def _on_update(self, update):                # runs on the stream's loop
+        if update.event not in ("partial_fill", "fill", "rejected", "canceled", "expired"):
+            return
+        # filled_qty / filled_avg_price are cumulative over the order: report
+        # only what is new since its last update
+        o = update.order
+        qty = int(float(o.filled_qty or 0))
+        amount = qty * float(o.filled_avg_price or 0.0)
+        seen, seen_amount = self._filled.get(str(o.id), (0, 0.0))
+        done = update.event != "partial_fill"
+        if done:
+            self._filled.pop(str(o.id), None)
+        else:
+            self._filled[str(o.id)] = (qty, amount)
+        new = qty - seen
+        if new <= 0 and not done:
+            return                                     # repeated report
+        side = 1 if str(o.side).lower().endswith("buy") else -1
+        px = (amount - seen_amount) / new if new > 0 else 0.0
+        fill = Fill(o.symbol, side * max(new, 0), px, pd.Timestamp(update.timestamp), done)
+        self._loop.call_soon_threadsafe(self._add, fill)
+
+    def _add(self, fill: Fill):
+        self.fills.append(fill)
+
+    async def submit(self, order: Order):
+        from alpaca.trading.enums import OrderSide, TimeInForce
+        from alpaca.trading.requests import MarketOrderRequest
+
+        req = MarketOrderRequest(symbol=order.symbol, qty=abs(order.qty),
+                                 side=OrderSide.BUY if order.qty > 0 else OrderSide.SELL,
+                                 time_in_force=TimeInForce.DAY)
+        await asyncio.to_thread(self._client.submit_order, req)
+
+    async def sync(self, bar: Bar) -> list[Fill]:
+        fills, self.fills = self.fills, []
+        return fills
+
+
+# ---------- entry point ----------
+def replay(symbols: list[str], start, end, interval: float = 0.0,
+           latency: float = 0.0, **params) -> LiveEngine:
+    """Run the live engine offline over the cached daily bars of
+    ``[start, end]`` – the symbols ``window_feeds`` gives a back-test, SPY
+    included – with indicators seeded from the bars before ``start``."""
+    from .data import load_daily, window_feeds
+
+    feeds = dict(window_feeds(symbols, start, end))
+    daily = load_daily(list(feeds))
+    first = min(df.index[0] for df in feeds.values())
+    broker = SimBroker(params.get("cash", START_CASH), params.get("slippage", SLIPPAGE_PERC),
+                       latency)
+    engine = LiveEngine(broker, **params)
+    engine.warm({s: df[df.index < first] for s, df in daily.items()})
+    asyncio.run(engine.run(ReplayFeed(feeds, interval, broker), liquidate=True))
+    return engine
@@ -0,0 +1,210 @@
+"""Lightweight stage timing / resource instrumentation.
+
+    with metrics.stage("data.parquet_decode", symbol=sym) as m:
+        df = ...
+        m.rows = len(df)
+
+Every ``stage`` appends one ``Record`` (wall + CPU seconds, resident memory
+at entry and exit, how far the stage raised the process's peak RSS,
+optional row count and symbol) to a per-process list.  The peak is a
+process-lifetime high-water mark, so only its growth inside a stage is
+charged to that stage.  Worker
+processes ``drain()`` theirs and the parent ``merge()``s them.  ``summary()``
+aggregates per stage for the report; ``dump()`` writes everything as JSON.
+
+``profiled()`` optionally wraps a whole run in cProfile or a SIGPROF stack
+sampler (collapsed-stack output, flamegraph-ready).
+"""
+import cProfile
+import json
+import os
+import pstats
+import resource
+import signal
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+
+
+@dataclass(slots=True)
+class Record:
+    stage:        str
+    wall_s:       float = 0.0
+    cpu_s:        float = 0.0
+    rss_in_mb:    float | None = None   # resident set at entry (None: no /proc)
+    rss_out_mb:   float | None = None   # … and at exit
+    peak_grow_mb: float = 0.0           # rise of the process peak during the stage
+    proc_peak_mb: float = 0.0           # process peak RSS at exit
+    rows:         int | None = None
+    symbol:       str | None = None
+    pid:          int = 0
+
+
+_records: list[Record] = []
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def peak_rss_mb() -> float:
+    """Process-lifetime peak RSS (``ru_maxrss``)."""
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 2**20 if sys.platform == "darwin" else kb / 1024
+
+
+def rss_mb() -> float | None:
+    """Current RSS from ``/proc/self/statm``; None where there is no /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * _PAGE / 2**20
+
+
+@contextmanager
+def stage(name: str, symbol: str | None = None, rows: int | None = None):
+    """Time the block; the yielded ``Record`` may have ``rows`` set inside it."""
+    rec = Record(stage=name, symbol=symbol, rows=rows, pid=os.getpid(), rss_in_mb=rss_mb())
+    p0 = peak_rss_mb()
+    w0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield rec
+    finally:
+        rec.wall_s = time.perf_counter() - w0
+        rec.cpu_s = time.process_time() - c0
+        rec.rss_out_mb = rss_mb()
+        rec.proc_peak_mb = peak_rss_mb()
+        rec.peak_grow_mb = rec.proc_peak_mb - p0
+        _records.append(rec)
+
+
+def record(name: str, wall_s: float, cpu_s: float = 0.0, rows: int | None = None,
+           symbol: str | None = None):
+    """Add a stage measured elsewhere (e.g. accumulated over many calls)."""
+    _records.append(Record(stage=name, wall_s=wall_s, cpu_s=cpu_s, rows=rows,
+                           symbol=symbol, rss_out_mb=rss_mb(),
+                           proc_peak_mb=peak_rss_mb(), pid=os.getpid()))
+
+
+def drain() -> list[Record]:
+    """Hand this process's records over (worker side) and forget them."""
+    out = _records[:]
+    _records.clear()
+    return out
+
+
+def merge(records: list[Record]):
+    _records.extend(records)
+
+
+def reset():
+    _records.clear()
+
+
+def records() -> pd.DataFrame:
+    return pd.DataFrame([asdict(r) for r in _records],
+                        columns=[f for f in Record.__slots__])
+
+
+def summary() -> pd.DataFrame:
+    """One row per stage, in first-seen order: calls, totals and memory –
+    largest RSS at exit, net RSS change and peak growth summed over calls,
+    and the process peak seen by the stage."""
+    df = records()
+    if df.empty:
+        return df
+    df["rss_delta_mb"] = df["rss_out_mb"] - df["rss_in_mb"]
+    g = df.groupby("stage", sort=False)
+    out = pd.DataFrame({
+        "calls":        g.size(),
+        "symbols":      g["symbol"].nunique(),
+        "wall_s":       g["wall_s"].sum(),
+        "cpu_s":        g["cpu_s"].sum(),
+        "rows":         g["rows"].sum(min_count=1).astype("Int64"),
+        "rss_mb":       g["rss_out_mb"].max(),
+        "rss_delta_mb": g["rss_delta_mb"].sum(min_count=1),
+        "peak_grow_mb": g["peak_grow_mb"].sum(),
+        "proc_peak_mb": g["proc_peak_mb"].max(),
+    })
+    return out.reset_index()
+
+
+def dump(path: Path, **meta):
+    """Write summary + every record (per symbol) as a JSON sidecar."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stages = summary().astype(object)
+    doc = {"meta": meta,
+           "summary": stages.where(stages.notna(), None).to_dict(orient="records"),
+           "records": [asdict(r) for r in _records]}
+    path.write_text(json.dumps(doc, indent=2, default=str))
+    return path
+
+
+# ---------- whole-run profilers ----------
+class _Sampler:
+    """SIGPROF stack sampler; writes ``frame;frame;frame count`` lines."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def dump(self, path: Path):
+        with open(path, "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+@contextmanager
+def profiled(mode: str | None, path: Path):
+    """Run the block under ``cprofile`` (→ ``path.prof``) or ``sample``
+    (→ ``path.folded``); ``None`` is a no-op."""
+    if mode is None:
+        yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "cprofile":
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            out = path.with_suffix(".prof")
+            prof.dump_stats(out)
+            pstats.Stats(prof).sort_stats("cumulative").print_stats(15)
+            logger.info("cProfile stats saved ➜ {}", out)
+    elif mode == "sample":
+        sampler = _Sampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            out = path.with_suffix(".folded")
+            sampler.dump(out)
+            logger.info("{} stack samples saved ➜ {}", sum(sampler.stacks.values()), out)
+    else:
+        raise ValueError(f"unknown profile mode {mode!r}")
@@ -1,100 +1,229 @@
 # ibot/model.py
 
 """Train / load the LightGBM rebound-prediction model."""
+import hashlib
+import json
+import os
 from pathlib import Path
 import lightgbm as lgb
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import TimeSeriesSplit
 from loguru import logger
-from .config import HOLD_DAYS, SHOCK_SIGMA, DATA_PROCESSED, PROJECT_ROOT
-from .data import load_daily
-from .features import label_shocks
-
-MODEL_DIR = PROJECT_ROOT / "models"
-MODEL_DIR.mkdir(exist_ok=True)
+from . import metrics
+from .config import HOLD_DAYS, SHOCK_SIGMA, DATA_PROCESSED, WORK_ROOT
+from .data import DAILY_VERSION, has_minute, source_stat
+from .indicators import shock
+from .panel import LABEL_VERSION, FeaturePanel, build_panel, training_matrix
+from .shards import SHARD_DIR, ShardSequence, build_shards, labels
+
+MODEL_DIR = WORK_ROOT / "models"
 MODEL_PATH = MODEL_DIR / "shock_rebound.lgb"
 
 FEATURES = [
-    "ret", "sigma20", "atr14",
-    # cross-sectional (z-score) relatives can be appended later
+    "ret", "sigma20", "atr14", "atr_pct", "ret_sig",
+    # cross-sectional relatives (see ibot.panel.PANEL_FEATURES)
+    "ret_z", "ret_rank", "ret_mkt",
 ]
 
+# minimum rows needed for rolling windows + hold
+MIN_ROWS = max(20, 14) + HOLD_DAYS + 1
+
 def build_dataset(symbols: list[str], date_from: str, date_to: str) -> pd.DataFrame:
-    """Return a concatenated DataFrame (multi-symbol) of shock rows only."""
-    dfs = []
-    # compute minimum rows needed for rolling windows + hold
-    min_rows = max(20, 14) + HOLD_DAYS + 1
-
-    for sym, df in load_daily(symbols).items():
-        df = df.loc[date_from:date_to]
-        if df.empty:
-            logger.warning("No data for {} in {}–{}", sym, date_from, date_to)
-            continue
-
-        if len(df) < min_rows:
-            logger.warning(
-                "Not enough data for {}: {} rows (< {})",
-                sym, len(df), min_rows
-            )
-            continue
-
-        try:
-            df_labeled = label_shocks(df, SHOCK_SIGMA)
-        except Exception as e:
-            logger.error("Failed to label shocks for {}: {}", sym, e)
-            continue
-
-        shocks = df_labeled[df_labeled["is_shock"] == 1].copy()
-        if shocks.empty:
-            logger.debug("No shocks found for {}", sym)
-            continue
-
-        shocks["symbol"] = sym
-        dfs.append(shocks)
-
-    if not dfs:
+    """Return the date-ordered shock rows (all symbols) with FEATURES + target_r.
+
+    In-memory; ``load_or_build_dataset`` streams the same rows through
+    ``ibot.shards`` instead.
+    """
+    min_rows = MIN_ROWS
+
+    with metrics.stage("model.build_dataset") as m:
+        panel = build_panel(symbols, date_from, date_to)
+        if not panel.symbols:
+            raise ValueError("No shock data found across all symbols; nothing to train on")
+        dataset = training_matrix(panel, FEATURES, SHOCK_SIGMA, min_rows=min_rows)
+        m.rows = len(dataset)
+    if dataset.empty:
         raise ValueError("No shock data found across all symbols; nothing to train on")
 
-    dataset = pd.concat(dfs)
-    logger.info("Built dataset with {} shock rows across {} symbols", len(dataset), len(dfs))
+    logger.info("Built dataset with {} shock rows across {} symbols",
+                len(dataset), dataset["symbol"].nunique())
     return dataset
 
-def train(symbols: list[str], date_from: str, date_to: str):
-    data = build_dataset(symbols, date_from, date_to)
-    X = data[FEATURES]
-    y = data["target_r"]
-
-    tscv = TimeSeriesSplit(n_splits=5)
-    lgb_params = dict(
-        objective="regression",
-        metric="l2",
-        n_estimators=500,
-        learning_rate=0.03,
-        num_leaves=63,
-        subsample=0.8,
-        colsample_bytree=0.8,
-    )
-    model = lgb.LGBMRegressor(**lgb_params)
-
-    # Manual CV loop so we can log each fold
-    rmses = []
-    for k, (tr, va) in enumerate(tscv.split(X)):
-        model.fit(X.iloc[tr], y.iloc[tr])
-        p = model.predict(X.iloc[va])
-        rmse = ((p - y.iloc[va]) ** 2).mean() ** 0.5
-        logger.info("Fold {} RMSE={:.5f}", k + 1, rmse)
+# ---------------------------------------------------------------- training
+DATASET_DIR = DATA_PROCESSED / "lgb"
+
+LGB_PARAMS = dict(
+    objective="regression",
+    metric="l2",
+    learning_rate=0.03,
+    num_leaves=63,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    verbosity=-1,
+)
+# binning is baked into the saved Dataset, so these are part of its key;
+# no feature pre-filter, so tuned min_data_in_leaf values can reuse it
+DATASET_PARAMS = dict(max_bin=255, min_data_in_bin=3, feature_pre_filter=False, verbosity=-1)
+MAX_ROUNDS  = 2000
+EARLY_STOP  = 50
+N_SPLITS    = 5
+PARAMS_PATH = MODEL_DIR / "lgb_params.json"     # best trial of ``ibot tune``
+
+def lgb_params() -> dict:
+    """``LGB_PARAMS`` overlaid with the tuned ones in ``PARAMS_PATH``, if any."""
+    if not PARAMS_PATH.exists():
+        return dict(LGB_PARAMS)
+    return {**LGB_PARAMS, **json.loads(PARAMS_PATH.read_text())["params"]}
+
+def dataset_key(symbols: list[str], date_from: str, date_to: str) -> str:
+    """Hash of everything the binned training Dataset depends on.
+
+    Raw-file size / mtime stand in for the data itself, so an unchanged
+    universe can skip ``build_dataset`` entirely.
+    """
+    stats = {s: (source_stat(s) if has_minute(s) else None)
+             for s in sorted(set(symbols))}
+    blob = json.dumps(dict(
+        symbols=stats, date_from=str(date_from), date_to=str(date_to),
+        features=FEATURES, sigma=SHOCK_SIGMA, hold=HOLD_DAYS,
+        daily=DAILY_VERSION, labels=LABEL_VERSION, params=DATASET_PARAMS,
+    ), sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+def dataset_path(key: str) -> Path:
+    return DATASET_DIR / f"{key}.bin"
+
+def load_or_build_dataset(symbols: list[str], date_from: str, date_to: str,
+                          threads: int | None = None) -> lgb.Dataset:
+    """Constructed ``lgb.Dataset`` (date-ordered rows), cached as a binary file.
+
+    Rows come from the Parquet shards of ``ibot.shards.build_shards``, fed
+    one shard at a time, so the raw feature matrix is never held whole.
+    ``threads`` also caps the shard builder's worker processes.
+    """
+    threads = threads or os.cpu_count() or 1
+    params = {**DATASET_PARAMS, "num_threads": threads}
+    key = dataset_key(symbols, date_from, date_to)
+    path = dataset_path(key)
+    if path.exists():
+        logger.info("Loading binned dataset {}", path.name)
+        return lgb.Dataset(str(path), params=params).construct()
+
+    with metrics.stage("model.build_dataset") as m:
+        parts = build_shards(symbols, date_from, date_to, FEATURES, SHARD_DIR / key,
+                             SHOCK_SIGMA, min_rows=MIN_ROWS, workers=threads)
+        label = labels(parts)
+        m.rows = len(label)
+    ds = lgb.Dataset([ShardSequence(p, FEATURES) for p in parts], label=label,
+                     feature_name=FEATURES, params=params).construct()
+    ShardSequence._cached = None
+    DATASET_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    ds.save_binary(str(tmp))
+    os.replace(tmp, path)
+    logger.info("Saved binned dataset ➜ {}", path.name)
+    return ds
+
+def model_key(symbols: list[str], date_from: str, date_to: str) -> str:
+    """Hash of a trained model's inputs: the dataset key plus the training params."""
+    blob = json.dumps(dict(dataset=dataset_key(symbols, date_from, date_to),
+                           params=lgb_params(), rounds=MAX_ROUNDS,
+                           early_stop=EARLY_STOP, splits=N_SPLITS), sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+def key_path(model: Path) -> Path:
+    """Sidecar holding the ``model_key`` a model file was trained from."""
+    return model.with_suffix(".key")
+
+def trained_model(symbols: list[str], date_from: str, date_to: str) -> Path | None:
+    """A model file trained on exactly these inputs, if one is on disk."""
+    key = model_key(symbols, date_from, date_to)
+    for path in (MODEL_DIR / f"shock_rebound_{key}.lgb", MODEL_PATH):
+        side = key_path(path)
+        if path.exists() and side.exists() and side.read_text().strip() == key:
+            return path
+    return None
+
+def cross_validate(full: lgb.Dataset, params: dict, on_fold=None) -> tuple[list[float], list[int]]:
+    """Validation RMSE and early-stopped tree count per ``TimeSeriesSplit`` fold.
+
+    Folds are row subsets of the one binned Dataset.  ``on_fold(rmses,
+    rounds)`` is called after each fold (``ibot.tune`` reports through it).
+    """
+    rounds, rmses = [], []
+    for k, (tr, va) in enumerate(TimeSeriesSplit(n_splits=N_SPLITS).split(np.arange(full.num_data()))):
+        with metrics.stage("model.cv_fold", rows=len(tr)):
+            booster = lgb.train(params, full.subset(tr), num_boost_round=MAX_ROUNDS,
+                                valid_sets=[full.subset(va)], valid_names=["val"],
+                                callbacks=[lgb.early_stopping(EARLY_STOP, verbose=False)])
+        rmse = booster.best_score["val"]["l2"] ** 0.5
+        logger.info("Fold {} RMSE={:.5f} trees={}", k + 1, rmse, booster.best_iteration)
         rmses.append(rmse)
-
-    logger.info("CV avg RMSE {:.5f}", sum(rmses) / len(rmses))
-
-    model.fit(X, y)        # final fit on all data
-    model.booster_.save_model(str(MODEL_PATH))
-    logger.success("Model saved ➜ {}", MODEL_PATH)
+        rounds.append(booster.best_iteration)
+        if on_fold is not None:
+            on_fold(rmses, rounds)
+    return rmses, rounds
+
+def train(symbols: list[str], date_from: str, date_to: str,
+          threads: int | None = None, path: Path = MODEL_PATH) -> lgb.Booster:
+    threads = threads or os.cpu_count() or 1
+    full = load_or_build_dataset(symbols, date_from, date_to, threads)
+    n = full.num_data()
+    params = {**lgb_params(), "num_threads": threads}
+
+    # early stopping on each validation fold picks the tree count for the final fit
+    rmses, rounds = cross_validate(full, params)
+    n_estimators = max(1, int(np.median(rounds)))
+    logger.info("CV avg RMSE {:.5f}; final fit with {} trees", sum(rmses) / len(rmses), n_estimators)
+
+    with metrics.stage("model.final_fit", rows=n):
+        model = lgb.train(params, full, num_boost_round=n_estimators)   # final fit on all data
+    path.parent.mkdir(parents=True, exist_ok=True)
+    model.save_model(str(path))
+    key_path(path).write_text(model_key(symbols, date_from, date_to))
+    logger.success("Model saved ➜ {}", path)
     return model
 
 def load_or_train(symbols: list[str], date_from: str, date_to: str):
-    if MODEL_PATH.exists():
-        logger.info("Loading cached model {}", MODEL_PATH)
-        return lgb.Booster(model_file=str(MODEL_PATH))
-    logger.info("Cached model not found—training anew")
-    return train(symbols, date_from, date_to)
+    """Reuse a model only if it was trained on these inputs, else train one.
+
+    Fresh models go to ``MODEL_DIR/shock_rebound_<key>.lgb``; ``MODEL_PATH``
+    (what ``ibot train`` writes and ``ibot scan`` reads) is reused when its
+    ``.key`` sidecar matches.
+    """
+    path = trained_model(symbols, date_from, date_to)
+    if path is not None:
+        logger.info("Loading cached model {}", path)
+        with metrics.stage("model.load"):
+            return lgb.Booster(model_file=str(path))
+    key = model_key(symbols, date_from, date_to)
+    logger.info("No model trained on these inputs (key {})—training anew", key)
+    return train(symbols, date_from, date_to, path=MODEL_DIR / f"shock_rebound_{key}.lgb")
+
+# ---------------------------------------------------------------- inference
+def as_booster(model) -> lgb.Booster:
+    """Accept either a ``Booster`` or a fitted ``LGBMRegressor``."""
+    return getattr(model, "booster_", model)
+
+def score_panel(model, panel: FeaturePanel, sigma=SHOCK_SIGMA) -> np.ndarray:
+    """Predicted ``target_r`` for every shock cell of ``panel`` (NaN elsewhere).
+
+    All candidates over the whole window are scored in one ``predict`` call;
+    columns follow the booster's own feature names, so older models trained
+    on a subset of ``FEATURES`` keep working.
+    """
+    booster = as_booster(model)
+    names = booster.feature_name()
+    missing = [f for f in names if f not in panel.arrays]
+    if missing:
+        raise ValueError(f"Model expects features not on the panel: {missing}")
+
+    out = np.full(panel["close"].shape, np.nan)
+    t, j = np.nonzero(shock(panel["ret"], panel["sigma20"], sigma))
+    with metrics.stage("model.score_panel", rows=len(t)):
+        if len(t):
+            X = np.column_stack([panel[f][t, j] for f in names])
+            out[t, j] = booster.predict(X)
+    logger.info("Pre-scored {} shock candidates", len(t))
+    return out
@@ -0,0 +1,165 @@
+"""Dates × symbols feature panel for model training.
+
+Lays every symbol's cached daily bars out as aligned 2-D arrays so that
+per-symbol and cross-sectional features are plain NumPy operations over
+the whole universe at once, and the training matrix is a single boolean
+gather instead of a per-symbol ``label_shocks`` + ``concat`` loop.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from . import metrics
+from .config import HOLD_DAYS, SHOCK_SIGMA
+from .data import load_daily
+from .indicators import own_bars, shock
+
+MARKET = "SPY"
+_COLS  = ("close", "ret", "sigma20", "atr14")
+LABEL_VERSION = 2          # bump when target_r semantics change
+
+# name → description; every name is a (dates × symbols) array on the panel
+PANEL_FEATURES = {
+    "ret":      "close-to-close return",
+    "sigma20":  "20-day std-dev of ret",
+    "atr14":    "14-day Wilder ATR",
+    "atr_pct":  "atr14 / close",
+    "ret_sig":  "ret in units of sigma20 (shock depth)",
+    "ret_z":    "cross-sectional z-score of ret on the day",
+    "ret_rank": "cross-sectional percentile rank of ret on the day",
+    "ret_mkt":  "ret minus the market (SPY, else equal-weight) return",
+}
+# need every symbol on a date; the rest only need the symbol's own columns
+CROSS_FEATURES = ("ret_z", "ret_rank", "ret_mkt")
+
+
+@dataclass
+class FeaturePanel:
+    dates:   pd.DatetimeIndex
+    symbols: list[str]
+    arrays:  dict[str, np.ndarray]        # name → (T, N) float64
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    def frame(self, symbol: str, columns=None) -> pd.DataFrame:
+        """One symbol's columns as a date-indexed frame."""
+        j = self.symbols.index(symbol)
+        cols = columns or list(self.arrays)
+        return pd.DataFrame({c: self.arrays[c][:, j] for c in cols}, index=self.dates)
+
+
+def _layout(frames: dict[str, pd.DataFrame], cols,
+            dates: np.ndarray | None = None) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Scatter per-symbol columns into (T, N) arrays on ``dates`` (int64 ns;
+    default: the union of the frames' dates)."""
+    idx = {s: df.index.as_unit("ns").asi8 for s, df in frames.items()}
+    if dates is None:
+        dates = np.unique(np.concatenate(list(idx.values()))) if idx else np.empty(0, "int64")
+    out = {c: np.full((len(dates), len(frames)), np.nan) for c in cols}
+    for j, (s, df) in enumerate(frames.items()):
+        rows = np.searchsorted(dates, idx[s])
+        for c in cols:
+            out[c][rows, j] = df[c].to_numpy(dtype="float64")
+    return dates, out
+
+
+def _row_rank(x: np.ndarray) -> np.ndarray:
+    """Percentile rank in (0, 1] along axis 1, NaN-aware."""
+    nan = np.isnan(x)
+    order = np.argsort(np.where(nan, np.inf, x), axis=1, kind="stable")
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(x.shape[1])[None, :], axis=1)
+    n = (~nan).sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(nan, np.nan, (rank + 1) / n)
+
+
+def add_features(arr: dict[str, np.ndarray], market_ret: np.ndarray | None) -> None:
+    """Derive the per-symbol and cross-sectional ``PANEL_FEATURES`` in place."""
+    add_symbol_features(arr)
+    add_cross_features(arr, market_ret)
+
+
+def add_symbol_features(arr: dict[str, np.ndarray]) -> None:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        arr["atr_pct"] = arr["atr14"] / arr["close"]
+        arr["ret_sig"] = arr["ret"] / arr["sigma20"]
+
+
+def add_cross_features(arr: dict[str, np.ndarray], market_ret: np.ndarray | None) -> None:
+    """``CROSS_FEATURES`` from ``arr["ret"]``; rows (dates) are independent."""
+    ret = arr["ret"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = (~np.isnan(ret)).sum(axis=1, keepdims=True)
+        mean = np.nansum(ret, axis=1, keepdims=True) / n
+        std = np.sqrt(np.nansum((ret - mean) ** 2, axis=1, keepdims=True) / n)
+        z = np.where(std > 0, (ret - mean) / std, 0.0)
+        arr["ret_z"] = np.where(np.isnan(ret), np.nan, z)
+        arr["ret_rank"] = _row_rank(ret)
+        mkt = mean if market_ret is None else market_ret[:, None]
+        arr["ret_mkt"] = ret - mkt
+
+
+def build_panel(symbols: list[str], date_from: str, date_to: str,
+                market: str = MARKET) -> FeaturePanel:
+    """Feature panel for ``symbols`` over ``[date_from, date_to]``.
+
+    Indicators come from the daily cache (full-history, no warm-up inside
+    the window); the market series is loaded alongside but is only a column
+    of the panel if it is also in ``symbols``.
+    """
+    daily = load_daily(list(dict.fromkeys([*symbols, market])))
+    with metrics.stage("panel.build") as m:
+        frames = {s: df.loc[date_from:date_to] for s, df in daily.items()}
+        mkt = frames.pop(market, None) if market not in symbols else frames.get(market)
+        frames = {s: df for s, df in frames.items() if not df.empty}
+
+        dates, arr = _layout(frames, _COLS)
+        m.rows = len(dates) * len(frames)                 # date × symbol cells
+        market_ret = None
+        if mkt is not None and not mkt.empty:
+            market_ret = (mkt["ret"].reindex(pd.DatetimeIndex(dates, tz="UTC"))
+                                    .to_numpy(dtype="float64"))
+        add_features(arr, market_ret)
+    return FeaturePanel(dates=pd.DatetimeIndex(dates, tz="UTC"),
+                        symbols=list(frames), arrays=arr)
+
+
+def _forward(close: np.ndarray, horizon: int) -> np.ndarray:
+    out = np.full(close.shape, np.nan)
+    if len(close) > horizon:
+        out[:-horizon] = close[horizon:] / close[:-horizon] - 1.0
+    return out
+
+
+def forward_return(close: np.ndarray, horizon: int = HOLD_DAYS) -> np.ndarray:
+    """Close ``horizon`` of the symbol's own bars ahead / close − 1, along
+    axis 0 (NaN past the symbol's last bar and where it has none)."""
+    return own_bars(lambda c: _forward(c, horizon), close)
+
+
+def training_matrix(panel: FeaturePanel, features: list[str],
+                    sigma: float = SHOCK_SIGMA, min_rows: int = 0) -> pd.DataFrame:
+    """Shock rows only, ordered by date then symbol, with ``target_r``.
+
+    Rows whose forward return runs past the window end are dropped; so are
+    symbols with fewer than ``min_rows`` bars in the window.
+    """
+    target = forward_return(panel["close"])
+    mask = shock(panel["ret"], panel["sigma20"], sigma) & ~np.isnan(target)
+
+    if min_rows:
+        rows = (~np.isnan(panel["close"])).sum(axis=0)
+        for j in np.flatnonzero(rows < min_rows):
+            logger.warning("Not enough data for {}: {} rows (< {})",
+                           panel.symbols[j], rows[j], min_rows)
+        mask &= (rows >= min_rows)[None, :]
+
+    t, j = np.nonzero(mask)                       # row-major → date-sorted
+    data = {f: panel[f][t, j] for f in features}
+    data["target_r"] = target[t, j]
+    data["symbol"] = np.asarray(panel.symbols, dtype=object)[j]
+    return pd.DataFrame(data, index=panel.dates[t])
@@ -1,41 +1,115 @@
+import json
+import subprocess
+import sys
 from pathlib import Path
 from datetime import datetime
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from loguru import logger
-from .config import PROJECT_ROOT
+from . import metrics
+from .config import WORK_ROOT
 
-REPORT_DIR = PROJECT_ROOT / "reports"
+REPORT_DIR = WORK_ROOT / "reports"
 IMG_DIR    = REPORT_DIR / "img"
-IMG_DIR.mkdir(parents=True, exist_ok=True)
+
+TOP_TRADES  = 50       # trades listed in the markdown; the rest are in Parquet
+PLOT_POINTS = 2000     # equity samples kept per curve when plotting
+
+
+def cagr(series: pd.Series):
+    """Compound annual growth of an equity curve (first sample per day)."""
+    s = series.sort_index()
+    s = s.loc[~s.index.normalize().duplicated(keep="first")]
+    yrs = (s.index[-1] - s.index[0]).days / 365.25
+    return None if yrs <= 0 else (s.iloc[-1]/s.iloc[0])**(1/yrs) - 1
+
+
+def max_drawdown(series: pd.Series) -> float:
+    return (series / series.cummax() - 1).min()
+
+
+def downsample(series: pd.Series, max_points: int = PLOT_POINTS) -> pd.Series:
+    """Keep each bucket's min and max (in time order) so spikes and
+    drawdowns survive; short series are returned as-is."""
+    n = len(series)
+    if n <= max_points:
+        return series
+    size = -(-n // (max_points // 2))                  # ceil
+    v = series.to_numpy(dtype="float64")
+    pad = np.full(-(-n // size) * size, np.nan)
+    pad[:n] = v
+    buckets = pad.reshape(-1, size)
+    start = np.arange(len(buckets)) * size
+    with np.errstate(invalid="ignore"):
+        lo = start + np.nanargmin(buckets, axis=1)
+        hi = start + np.nanargmax(buckets, axis=1)
+    keep = np.unique(np.concatenate([lo, hi, [0, n - 1]]))
+    return series.iloc[keep]
 
 
 def write(equity_curve: pd.Series,
           spy_curve: pd.Series,
           trades: pd.DataFrame,
-          params: dict):
+          params: dict,
+          top_n: int = TOP_TRADES,
+          background: bool = False) -> Path:
+    """Save the run's data and render its report.
+
+    Equity (bot + SPY) and the full trade log go to Parquet next to the
+    markdown, which only carries the summary, the ``top_n`` largest trades
+    and the stage metrics.  With ``background`` the plot + markdown are
+    rendered by a detached ``python -m ibot.reporting`` process instead.
+    """
     ts = datetime.utcnow().strftime("%Y-%m-%d_%H%M%S")
+    base = REPORT_DIR / ts
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    # engines may mark a date twice (the final mark after stop() realises
+    # open positions, a feed's stale date); the last mark is the value
+    equity_curve = equity_curve.groupby(level=0).last()
+    with metrics.stage("report.save", rows=len(trades)):
+        pd.DataFrame({"bot": equity_curve, "spy": spy_curve}).to_parquet(_path(base, ".equity.parquet"))
+        trades.to_parquet(_path(base, ".trades.parquet"))
+
+    if background:
+        metrics.dump(_path(base, ".metrics.json"), report=f"{ts}.md", top_n=top_n, **params)
+        subprocess.Popen([sys.executable, "-m", "ibot.reporting", str(base)],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+        logger.success("Report rendering in background ➜ {}.md", base)
+    else:
+        render(base, params, metrics.summary(), top_n)
+        metrics.dump(_path(base, ".metrics.json"), report=f"{ts}.md", top_n=top_n, **params)
+    return base.with_suffix(".md")
+
+
+def _path(base: Path, suffix: str) -> Path:
+    return base.with_name(base.name + suffix)
+
+
+def render(base: Path, params: dict, stages: pd.DataFrame, top_n: int = TOP_TRADES):
+    """Plot + markdown for a run saved by ``write`` under ``base``."""
+    import matplotlib.pyplot as plt
+
+    eq = pd.read_parquet(_path(base, ".equity.parquet"))
+    trades = pd.read_parquet(_path(base, ".trades.parquet"))
+    equity_curve, spy_curve = eq["bot"].dropna(), eq["spy"].dropna()
+    ts = base.name
     img_path = IMG_DIR / f"equity_{ts}.png"
+    IMG_DIR.mkdir(parents=True, exist_ok=True)
 
     # ---------- plot ----------
-    plt.figure()
-    equity_curve.plot(label="Bot")
-    spy_curve.plot(label="SPY TR")
-    plt.legend(); plt.tight_layout()
-    plt.savefig(img_path); plt.close()
-
-    # ---------- helper ----------
-    def cagr(series):
-        s = series.sort_index()
-        s = s.loc[~s.index.normalize().duplicated(keep="first")]
-        yrs = (s.index[-1] - s.index[0]).days / 365.25
-        return None if yrs <= 0 else (s.iloc[-1]/s.iloc[0])**(1/yrs) - 1
+    with metrics.stage("report.plot", rows=len(equity_curve)):
+        plt.figure()
+        downsample(equity_curve).plot(label="Bot")
+        downsample(spy_curve).plot(label="SPY TR")
+        plt.legend(); plt.tight_layout()
+        plt.savefig(img_path); plt.close()
 
     bot_cagr = cagr(equity_curve)
     spy_cagr = cagr(spy_curve)
 
     # ---------- dollar aggregates ----------
-    totals = (trades[["gross","tax","slippage","net"]]
+    totals = (trades.reindex(columns=["gross","tax","slippage","net"])
               .sum()
               .rename({"gross":"Gross P&L",
                        "tax":"Taxes",
@@ -52,29 +126,54 @@ def write(equity_curve: pd.Series,
         "End Equity":       f"${end_eq:,.2f}",
         "Total Return $":   f"${ret_abs:,.2f}",
         "Total Return %":   f"{ret_pct:.2%}",
-        "Bot CAGR (less tax & fees)":         f"{cagr(equity_curve):.2%}" if cagr(equity_curve) is not None else "N/A",
-        "SPY CAGR (less 15% tax)":         f"{cagr(spy_curve):.2%}" if cagr(spy_curve)     is not None else "N/A",
+        "Bot CAGR (less tax & fees)":         f"{bot_cagr:.2%}" if bot_cagr is not None else "N/A",
+        "SPY CAGR (less 15% tax)":         f"{spy_cagr:.2%}" if spy_cagr     is not None else "N/A",
         "Total Gross P&L $":f"${totals['Gross P&L']:,.0f}",
         "Total Taxes $":    f"${totals['Taxes']:,.0f}",
         "Total Slippage $": f"${totals['Slippage']:,.0f}",
         "Total Net P&L $":  f"${totals['Net P&L']:,.0f}",
-        "Max DD":           f"{(equity_curve/ equity_curve.cummax() - 1).min():.2%}",
+        "Max DD":           f"{max_drawdown(equity_curve):.2%}",
         "Trades":           len(trades),
         **params
     }
 
-    md_path = REPORT_DIR / f"{ts}.md"
-    with open(md_path, "w") as f:
+    md_path = base.with_suffix(".md")
+    with metrics.stage("report.write", rows=min(len(trades), top_n)), open(md_path, "w") as f:
         f.write(f"# Back-test report {ts}\n\n")
         f.write(f"![equity](img/{img_path.name})\n\n")
         f.write("## Summary\n")
         for k, v in summary.items():
             f.write(f"- **{k}**: {v}\n")
         f.write("\n---\n")
-        f.write("## Trades\n\n")
         if trades.empty:
+            f.write("## Trades\n\n")
             f.write("_No trades executed_\n")
         else:
-            f.write(trades.to_markdown(index=False))
+            top = trades.loc[trades["net"].abs().sort_values(ascending=False).index[:top_n]]
+            f.write(f"## Top {len(top)} of {len(trades)} trades by |net P&L|\n\n")
+            f.write(f"Full log: `{_path(base, '.trades.parquet').name}`\n\n")
+            f.write(top.sort_values("entry_date").to_markdown(index=False))
+
+        # ---------- metrics (stage timings of this run) ----------
+        if not stages.empty:
+            f.write("\n\n---\n## Metrics\n\n")
+            f.write(stages.to_markdown(index=False, floatfmt=".3f"))
+            f.write("\n")
 
     logger.success("Report saved ➜ {}", md_path)
+
+
+def _render_saved(base: Path):
+    """Background entry point: everything comes from the saved sidecars."""
+    doc = json.loads(_path(base, ".metrics.json").read_text())
+    meta = doc["meta"]
+    meta.pop("report", None)
+    top_n = meta.pop("top_n", TOP_TRADES)
+    stages = pd.DataFrame(doc["summary"])
+    if "rows" in stages:
+        stages["rows"] = stages["rows"].astype("Int64")
+    render(base, meta, stages, top_n)
+
+
+if __name__ == "__main__":
+    _render_saved(Path(sys.argv[1]))
@@ -0,0 +1,110 @@
+"""Memoised back-test results.
+
+A run is keyed on everything its output depends on: every symbol's daily
+cache key (cache version, shock σ, raw-data size/mtime), the window, the
+engine and strategy params, the frictions in ``ibot.config`` /
+``ibot.taxes`` and – when the model gates or sizes entries – the model
+file's hash.  Each entry is a zstd Parquet equity curve and trade log plus
+a JSON sidecar under ``DATA_PROCESSED/results``.  A hit touches the sidecar;
+``store`` then evicts least-recently-used entries until the whole cache
+fits in ``MAX_BYTES``.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+
+from . import config, metrics, taxes
+from .config import DATA_PROCESSED
+from .data import _cache_key, has_minute
+
+RESULTS_DIR     = DATA_PROCESSED / "results"
+RESULTS_VERSION = 1          # bump when a cached result changes meaning
+MAX_BYTES       = 256 * 2**20
+
+_SUFFIXES = (".json", ".equity.parquet", ".trades.parquet")
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def frictions() -> dict:
+    """Account, sizing, cost and tax settings every engine reads."""
+    return dict(cash=config.START_CASH, risk=config.RISK_BUDGET, atr=config.ATR_MULT,
+                sigma=config.SHOCK_SIGMA, hold=config.HOLD_DAYS,
+                slippage=config.SLIPPAGE_PERC, intraday=(config.INTRADAY_WINDOW,
+                                                         config.INTRADAY_LOOKBACK),
+                tax=(taxes.ST_CG_RATE, taxes.LT_CG_RATE, taxes.LT_HOLD_DAYS))
+
+
+def run_key(symbols: list[str], start, end, params: dict,
+            model_hash: str | None = None) -> str:
+    """Hash of one back-test's inputs (``symbols`` should include SPY)."""
+    data = {s: (_cache_key(s) if has_minute(s) else None) for s in sorted(set(symbols))}
+    blob = json.dumps(dict(version=RESULTS_VERSION, data=data, start=str(start),
+                           end=str(end), params=params, model=model_hash,
+                           frictions=frictions()), sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def _path(key: str, suffix: str) -> Path:
+    return RESULTS_DIR / f"{key}{suffix}"
+
+
+def load(key: str) -> tuple[pd.Series, pd.DataFrame, dict] | None:
+    """``(equity, trades, stats)`` of a cached run, or ``None``."""
+    meta = _path(key, ".json")
+    if not meta.exists():
+        return None
+    with metrics.stage("results.load") as m:
+        equity = pd.read_parquet(_path(key, ".equity.parquet"))["equity"]
+        trades = pd.read_parquet(_path(key, ".trades.parquet"))
+        stats = json.loads(meta.read_text())["stats"]
+        m.rows = len(trades)
+    os.utime(meta)                                   # LRU: last use = sidecar mtime
+    logger.info("Result cache hit {}", key)
+    return equity, trades, stats
+
+
+def store(key: str, equity: pd.Series, trades: pd.DataFrame, stats: dict,
+          max_bytes: int = MAX_BYTES, **meta):
+    """Save a run's results, then trim the cache to ``max_bytes``."""
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    with metrics.stage("results.store", rows=len(trades)):
+        equity.to_frame("equity").to_parquet(_path(key, ".equity.parquet"), compression="zstd")
+        trades.to_parquet(_path(key, ".trades.parquet"), compression="zstd")
+        tmp = _path(key, ".json.tmp")                # sidecar last: it marks the entry done
+        tmp.write_text(json.dumps(dict(stats=stats, **meta), default=str))
+        os.replace(tmp, _path(key, ".json"))
+    evict(max_bytes)
+
+
+def entries() -> pd.DataFrame:
+    """One row per cached run: key, total bytes, last use."""
+    rows = []
+    for meta in RESULTS_DIR.glob("*.json"):
+        key = meta.name[:-len(".json")]
+        size = sum(p.stat().st_size for p in map(lambda s: _path(key, s), _SUFFIXES) if p.exists())
+        rows.append((key, size, meta.stat().st_mtime_ns))
+    return pd.DataFrame(rows, columns=["key", "bytes", "used_ns"])
+
+
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    """Delete least-recently-used entries until the cache fits; returns how many."""
+    df = entries().sort_values("used_ns", ascending=False, ignore_index=True)
+    drop = df[df["bytes"].cumsum() > max_bytes]
+    for key in drop["key"]:
+        for suffix in _SUFFIXES:
+            _path(key, suffix).unlink(missing_ok=True)
+    if len(drop):
+        logger.info("Result cache: evicted {} entries ({:.1f} MB)",
+                    len(drop), drop["bytes"].sum() / 2**20)
+    return len(drop)
@@ -0,0 +1,83 @@
+"""One back-test over a window of daily feeds, on any engine.
+
+Shared by ``backtest.py`` and the walk-forward workers so both wire the
+model features, precomputed scores and broker settings the same way.
+"""
+from dataclasses import dataclass, field
+
+import backtrader as bt
+import pandas as pd
+
+from . import metrics
+from .config import START_CASH, SLIPPAGE_PERC
+from .model import score_panel
+from .panel import build_panel
+from .strategy import ShockReboundStrategy, IndicatorData, FeatureData
+from .intraday import run as run_intraday
+from .vector import run as run_vectorized
+
+
+@dataclass
+class Result:
+    equity: pd.Series                         # end-of-bar portfolio value, UTC index
+    trades: pd.DataFrame                      # one row per round-trip
+    stats:  dict = field(default_factory=dict)
+
+
+def model_feeds(feeds: list[tuple[str, pd.DataFrame]], model, start, end,
+                precompute: bool) -> list[tuple[str, pd.DataFrame]]:
+    """Join the panel features (and optionally ``pred``) onto every feed."""
+    panel = build_panel([name for name, _ in feeds], start, end)
+    extra = [f for f in panel.arrays if f not in feeds[0][1].columns]
+    if precompute:
+        panel.arrays["pred"] = score_panel(model, panel)
+        extra.append("pred")
+    return [(name, daily.join(panel.frame(name, extra))) for name, daily in feeds]
+
+
+def run(feeds: list[tuple[str, pd.DataFrame]], model=None, start=None, end=None,
+        engine: str = "cerebro", min_pred: float | None = None,
+        size_by_pred: bool = False, precompute: bool = False,
+        intraday: dict | None = None) -> Result:
+    """Back-test ``feeds`` (SPY last, as from ``window_feeds``).
+
+    ``engine="intraday"`` replays the same symbols on their minute bars;
+    ``intraday`` holds its extra parameters (``window``, ``lookback``).
+    """
+    use_model = min_pred is not None or size_by_pred
+    if engine == "intraday":
+        if use_model:
+            raise ValueError("model gating is only available on the daily engines")
+        with metrics.stage("intraday.total"):
+            ledger = run_intraday([name for name, _ in feeds], start, end, **(intraday or {}))
+        return Result(equity=ledger.equity_series(), trades=ledger.trades_frame())
+
+    # the vectorized engine only reads precomputed scores
+    precompute = use_model and (precompute or engine == "vectorized")
+    if use_model:
+        feeds = model_feeds(feeds, model, start, end, precompute)
+    gate = dict(min_pred=min_pred, size_by_pred=size_by_pred)
+
+    bars = sum(len(daily) for _, daily in feeds)
+    if engine == "vectorized":
+        with metrics.stage("vector.run", rows=bars):
+            strat = run_vectorized(dict(feeds), **gate)
+    else:
+        with metrics.stage("cerebro.setup", rows=bars):
+            cerebro = bt.Cerebro()
+            cerebro.broker.setcash(START_CASH)
+            cerebro.broker.set_slippage_perc(perc=SLIPPAGE_PERC)
+            cerebro.addstrategy(ShockReboundStrategy, model=model,
+                                precomputed=precompute, **gate)
+            Feed = FeatureData if use_model else IndicatorData
+            for name, daily in feeds:
+                cerebro.adddata(Feed(dataname=daily), name=name)
+        with metrics.stage("cerebro.run", rows=bars):
+            strat = cerebro.run()[0]
+
+    ledger = getattr(strat, "ledger", strat)
+    return Result(
+        equity=ledger.equity_series(),
+        trades=ledger.trades_frame(),
+        stats=strat.scoring_stats() if hasattr(strat, "scoring_stats") else {},
+    )
@@ -0,0 +1,79 @@
+"""Last-bar shock scan: which symbols shocked and what the model expects.
+
+The latest session comes from ``data.latest_bars`` – one row per symbol
+kept in step with the daily cache – so a scan never touches minute files
+or full histories: the shock rule and the ``PANEL_FEATURES`` are computed
+over the universe's last bars as 1 × N arrays and the candidates scored
+in one ``predict`` call.  A past ``asof`` session falls back to the
+daily-cache panel.  Suggested size risks ``RISK_BUDGET`` of ``cash`` over
+a stop ``ATR_MULT`` × ``atr14`` away, as the strategy does.
+"""
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from . import metrics
+from .config import START_CASH, RISK_BUDGET, ATR_MULT, SHOCK_SIGMA
+from .data import latest_bars
+from .indicators import shock
+from .model import as_booster
+from .panel import MARKET, _COLS, add_cross_features, add_symbol_features, build_panel
+
+COLUMNS = ["symbol", "date", "close", "ret", "sigma20", "atr14", "pred", "shares"]
+
+
+def _latest(symbols: list[str], refresh: bool):
+    """Scan date, symbols on it and their feature row, from the latest bars."""
+    bars = latest_bars([*symbols, MARKET], refresh)
+    if bars.empty:
+        return None, [], {}
+    date = bars["date"].max()
+    on = bars["date"] == date
+    names = [s for s in symbols if s in bars.index and on[s]]
+    arr = {c: bars.loc[names, c].to_numpy(dtype="float64")[None, :] for c in _COLS}
+    market_ret = None
+    if MARKET in bars.index:
+        market_ret = np.array([bars.at[MARKET, "ret"] if on[MARKET] else np.nan])
+    add_symbol_features(arr)
+    add_cross_features(arr, market_ret)
+    return date, names, {k: v[0] for k, v in arr.items()}
+
+
+def _panel(symbols: list[str], asof):
+    """Same, for the last session on or before ``asof``, from the panel."""
+    panel = build_panel(symbols, None, asof)
+    if not len(panel.dates):
+        return None, [], {}
+    t = len(panel.dates) - 1
+    have = ~np.isnan(panel["close"][t])
+    names = [s for s, ok in zip(panel.symbols, have) if ok]
+    return panel.dates[t], names, {k: v[t, have] for k, v in panel.arrays.items()}
+
+
+def scan(symbols: list[str], model, asof=None, cash: float = START_CASH,
+         sigma: float = SHOCK_SIGMA, refresh: bool = False) -> pd.DataFrame:
+    """Shock candidates on ``asof`` (default: the latest cached session),
+    best predicted rebound first.  ``refresh`` updates the daily caches first."""
+    with metrics.stage("scan.features") as m:
+        date, names, row = _latest(symbols, refresh) if asof is None else _panel(symbols, asof)
+        m.rows = len(names)
+    if date is None:
+        return pd.DataFrame(columns=COLUMNS)
+    hit = np.flatnonzero(shock(row["ret"], row["sigma20"], sigma))
+
+    with metrics.stage("scan.score", rows=len(hit)):
+        booster = as_booster(model)
+        X = np.column_stack([row[f][hit] for f in booster.feature_name()])
+        pred = booster.predict(X) if len(hit) else np.empty(0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = np.trunc(cash * RISK_BUDGET / (row["atr14"][hit] * ATR_MULT))
+    out = pd.DataFrame({
+        "symbol":  [names[j] for j in hit],
+        "date":    date,
+        **{k: row[k][hit] for k in ("close", "ret", "sigma20", "atr14")},
+        "pred":    pred,
+        "shares":  np.nan_to_num(shares).astype(np.int64),
+    }, columns=COLUMNS)
+    logger.info("{} of {} symbols shocked on {:%Y-%m-%d}", len(out), len(names), date)
+    return out.sort_values("pred", ascending=False, ignore_index=True)
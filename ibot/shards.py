@@ -0,0 +1,207 @@
+"""Out-of-core training set: shock rows written as date-ordered Parquet shards.
+
+``build_panel`` + ``training_matrix`` hold the whole universe's daily bars
+and feature arrays at once; this builds the same rows in bounded memory so
+training can scale to the full tradable universe:
+
+1. symbols are split into chunks of ``CHUNK`` and a process pool reads each
+   chunk's date index, giving the window's union of dates;
+2. the pool lays each chunk out on those dates, derives the per-symbol
+   features and ``target_r``, writes the chunk's shock rows to a Parquet
+   file and its ``ret`` columns into a disk-backed (dates × symbols) matrix;
+3. the parent walks that matrix ``DATE_BLOCK`` dates at a time, adds the
+   ``CROSS_FEATURES`` (which need every symbol on a date), sorts by date
+   then symbol and writes one final shard per block.
+
+Concatenating the final shards in name order gives exactly the rows of
+``training_matrix`` over the full panel.  ``ShardSequence`` feeds them to
+``lgb.Dataset`` one shard at a time.
+"""
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from . import metrics
+from .config import DATA_PROCESSED, SHOCK_SIGMA
+from .data import ensure_daily, read_daily
+from .panel import (CROSS_FEATURES, MARKET, _COLS, FeaturePanel, _layout,
+                    add_cross_features, add_symbol_features, training_matrix)
+
+SHARD_DIR  = DATA_PROCESSED / "shards"
+CHUNK      = 256           # symbols per worker task
+DATE_BLOCK = 256           # dates per final shard (≈ one year of sessions)
+_DONE      = "_meta.json"  # written last: marks a complete shard set
+
+
+# ---------- workers ----------
+def _chunk_dates(symbols: list[str], date_from, date_to):
+    """Symbols with bars in the window, the union of their dates, and metrics."""
+    keep, idx = [], []
+    for s in symbols:
+        d = read_daily(s, columns=["close"]).loc[date_from:date_to].index
+        if len(d):
+            keep.append(s)
+            idx.append(d.as_unit("ns").asi8)
+    return keep, (np.unique(np.concatenate(idx)) if idx else np.empty(0, "int64")), metrics.drain()
+
+
+def _chunk_rows(symbols: list[str], offset: int, dates: np.ndarray, date_from, date_to,
+                features: list[str], sigma: float, min_rows: int,
+                ret_path: Path, out: Path):
+    """Shock rows of one chunk (``t`` / ``j`` = global date row / symbol column)."""
+    with metrics.stage("shards.chunk", rows=0) as m:
+        frames = {s: read_daily(s, columns=list(_COLS)).loc[date_from:date_to] for s in symbols}
+        _, arr = _layout(frames, _COLS, dates)
+        add_symbol_features(arr)
+
+        ret = np.load(ret_path, mmap_mode="r+")
+        ret[:, offset:offset + len(symbols)] = arr["ret"]
+        ret.flush()
+        del ret
+
+        panel = FeaturePanel(dates=pd.DatetimeIndex(dates, tz="UTC"), symbols=symbols, arrays=arr)
+        local = [f for f in dict.fromkeys(["ret", *features]) if f not in CROSS_FEATURES]
+        rows = training_matrix(panel, local, sigma, min_rows=min_rows)
+        rows["t"] = np.searchsorted(dates, rows.index.as_unit("ns").asi8).astype("int32")
+        rows["j"] = (offset + pd.Index(symbols).get_indexer(rows["symbol"])).astype("int32")
+        pq.write_table(pa.Table.from_pandas(rows.rename_axis("date").reset_index(),
+                                            preserve_index=False),
+                       out, row_group_size=16_384)
+        m.rows = len(rows)
+    return len(rows), metrics.drain()
+
+
+# ---------- build ----------
+def build_shards(symbols: list[str], date_from, date_to, features: list[str], out: Path,
+                 sigma: float = SHOCK_SIGMA, min_rows: int = 0, market: str = MARKET,
+                 chunk: int = CHUNK, workers: int | None = None) -> list[Path]:
+    """Write the window's shock rows to ``out/part-*.parquet``; returns the shards.
+
+    An existing complete shard set in ``out`` is reused as is – key the
+    folder on the inputs (``ibot.model.dataset_key``).
+    """
+    if (out / _DONE).exists():
+        return shard_paths(out)
+    shutil.rmtree(out, ignore_errors=True)
+    work = out / "_work"
+    work.mkdir(parents=True)
+
+    present = ensure_daily(list(dict.fromkeys([*symbols, market])), workers)
+    names = [s for s in present if s != market or market in symbols]
+    chunks = [names[i:i + chunk] for i in range(0, len(names), chunk)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1. which symbols have bars in the window, and on which dates
+        names, dates = [], []
+        for keep, d, recs in pool.map(_chunk_dates, chunks, *_same(len(chunks), date_from, date_to)):
+            names += keep
+            dates.append(d)
+            metrics.merge(recs)
+        dates = np.unique(np.concatenate(dates)) if dates else np.empty(0, "int64")
+        if not names:
+            raise ValueError("No shock data found across all symbols; nothing to train on")
+
+        # 2. per-symbol features + shock rows per chunk; ret into a shared matrix
+        ret_path = work / "ret.npy"
+        ret = np.lib.format.open_memmap(ret_path, mode="w+", dtype="float64",
+                                        shape=(len(dates), len(names)), fortran_order=True)
+        ret[:] = np.nan
+        ret.flush()
+        del ret
+        chunks = [names[i:i + chunk] for i in range(0, len(names), chunk)]
+        parts = [work / f"chunk-{k:05d}.parquet" for k in range(len(chunks))]
+        n = len(chunks)
+        done = pool.map(_chunk_rows, chunks, range(0, len(names), chunk),
+                        *_same(n, dates, date_from, date_to, features, sigma, min_rows, ret_path),
+                        parts)
+        total = 0
+        for rows, recs in done:
+            total += rows
+            metrics.merge(recs)
+    if not total:
+        raise ValueError("No shock data found across all symbols; nothing to train on")
+
+    # 3. cross-sectional features, date-block by date-block
+    market_ret = None
+    mkt = read_daily(market, columns=["ret"])["ret"].loc[date_from:date_to] if market in present else []
+    if len(mkt):
+        market_ret = mkt.reindex(pd.DatetimeIndex(dates, tz="UTC")).to_numpy(dtype="float64")
+    ret = np.load(ret_path, mmap_mode="r")
+    rows = ds.dataset([str(p) for p in parts], format="parquet")
+    shards = []
+    with metrics.stage("shards.merge", rows=total):
+        for lo in range(0, len(dates), DATE_BLOCK):
+            hi = min(lo + DATE_BLOCK, len(dates))
+            block = rows.to_table(filter=(pc.field("t") >= lo) & (pc.field("t") < hi))
+            if block.num_rows == 0:
+                continue
+            t = block.column("t").to_numpy() - lo
+            j = block.column("j").to_numpy()
+            arr = {"ret": np.asarray(ret[lo:hi])}
+            add_cross_features(arr, None if market_ret is None else market_ret[lo:hi])
+            for f in CROSS_FEATURES:
+                block = block.append_column(f, pa.array(arr[f][t, j]))
+            order = np.lexsort((j, t))
+            block = block.take(pa.array(order)).select(["date", "symbol", *features, "target_r"])
+            path = out / f"part-{len(shards):05d}.parquet"
+            pq.write_table(block, path)
+            shards.append(path)
+    del ret
+    shutil.rmtree(work)
+    (out / _DONE).write_text(json.dumps(dict(rows=total, symbols=len(names), dates=len(dates),
+                                             shards=len(shards))))
+    logger.info("Wrote {} shock rows across {} symbols to {} shards in {}",
+                total, len(names), len(shards), out)
+    return shards
+
+
+def shard_paths(out: Path) -> list[Path]:
+    return sorted(out.glob("part-*.parquet"))
+
+
+def _same(n: int, *args):
+    """Repeat each argument ``n`` times, for ``pool.map``."""
+    return [[a] * n for a in args]
+
+
+# ---------- LightGBM input ----------
+class ShardSequence(lgb.Sequence):
+    """One shard's feature rows for ``lgb.Dataset([...])``.
+
+    LightGBM reads sequences in order (the bin sample too), so only the
+    most recently touched shard's matrix is kept in memory.
+    """
+    batch_size = 4096
+    _cached: tuple[Path, np.ndarray] | None = None
+
+    def __init__(self, path: Path, features: list[str]):
+        self.path, self.features = path, features
+        self.rows = pq.ParquetFile(path).metadata.num_rows
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, idx):
+        cached = ShardSequence._cached
+        if cached is None or cached[0] != self.path:
+            table = pq.read_table(self.path, columns=self.features)
+            X = np.column_stack([table.column(f).to_numpy() for f in self.features])
+            cached = ShardSequence._cached = (self.path, X)
+        return cached[1][idx]
+
+
+def labels(paths: list[Path], column: str = "target_r") -> np.ndarray:
+    return np.concatenate([pq.read_table(p, columns=[column]).column(column).to_numpy()
+                           for p in paths])
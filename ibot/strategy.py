@@ -1,48 +1,129 @@
 # ibot/strategy.py
+import time
+
 import backtrader as bt
+import numpy as np
 from loguru import logger
-from .config import RISK_BUDGET, ATR_MULT, HOLD_DAYS, SLIPPAGE_PERC
+from . import metrics
+from .config import RISK_BUDGET, ATR_MULT, HOLD_DAYS, SHOCK_SIGMA, SLIPPAGE_PERC
+from .indicators import COLUMNS
+from .ledger import Ledger
+from .model import as_booster
+from .panel import PANEL_FEATURES
 from .taxes import TaxLots
 
 
+class IndicatorData(bt.feeds.PandasData):
+    """PandasData carrying the precomputed ``ibot.indicators`` columns.
+
+    The daily cache already holds ``ret``/``sigma20``/``atr14``/``is_shock``
+    over each symbol's full history, so the strategy reads them as lines
+    instead of building (and warming up) backtrader indicators per run.
+    """
+    lines = COLUMNS
+    params = tuple((name, -1) for name in COLUMNS)   # -1: match by column name
+
+
+class FeatureData(IndicatorData):
+    """IndicatorData plus the remaining ``ibot.panel`` features and an
+    optional precomputed ``pred`` column, for model-gated runs."""
+    lines = tuple(f for f in PANEL_FEATURES if f not in COLUMNS) + ("pred",)
+    params = tuple((name, -1) for name in lines)
+
+
 class ShockReboundStrategy(bt.Strategy):
     params = dict(model=None,
                   risk_budget=RISK_BUDGET,
                   atr_mult=ATR_MULT,
-                  hold_days=HOLD_DAYS)
+                  shock_sigma=SHOCK_SIGMA,
+                  hold_days=HOLD_DAYS,
+                  min_pred=None,         # enter only if predicted target_r ≥ this
+                  size_by_pred=False,    # scale risk budget by pred / pred_cap
+                  pred_cap=0.10,
+                  precomputed=False)     # read the feed's ``pred`` line instead of scoring
 
     # ------------------------------------------------------------------ init
     def __init__(self):
         self.tax        = TaxLots()
-        self.value_hist = []         # [(datetime, equity)]
-        self.trade_log  = []         # one dict per round-trip
-
-        self.inds = {}
-        for d in self.datas:
-            atr   = bt.ind.ATR(d, period=14)
-            ret   = bt.ind.PercentChange(d.close, period=1)
-            sigma = bt.ind.StdDev(ret, period=20)
-            shock = ret < (-self.p.atr_mult) * sigma
-            self.inds[d] = dict(atr=atr, shock=shock)
-            d.shock = shock
+        self.ledger     = Ledger()   # trades + end-of-bar equity
+        self.next_ns    = [0, 0]     # wall / CPU spent in next(), for metrics
+
+        # ---- batched model scoring (only when the model gates or sizes) ----
+        self.score_ns = []           # per-bar predict latency, bars with candidates
+        self.booster  = None
+        uses_model = self.p.min_pred is not None or self.p.size_by_pred
+        if self.p.model is not None and uses_model and not self.p.precomputed:
+            self.booster = as_booster(self.p.model)
+            names = self.booster.feature_name()
+            missing = [f for f in names if not hasattr(self.datas[0].lines, f)]
+            if missing:
+                raise ValueError(f"Feeds lack model features {missing}; use FeatureData")
+            self.feat_lines = [[getattr(d.lines, f) for f in names] for d in self.datas]
+            self.xbuf = np.empty((len(self.datas), len(names)))
+        self.uses_model = uses_model and (self.booster is not None or self.p.precomputed)
+
+    def _predict(self, cands: list[int]) -> dict[int, float]:
+        """Score every shocked feed of this bar in one ``predict`` call."""
+        if not cands:
+            return {}
+        if self.p.precomputed:
+            return {i: self.datas[i].pred[0] for i in cands}
+        t0 = time.perf_counter_ns()
+        buf = self.xbuf[:len(cands)]
+        for k, i in enumerate(cands):
+            buf[k] = [ln[0] for ln in self.feat_lines[i]]
+        preds = self.booster.predict(buf)
+        self.score_ns.append(time.perf_counter_ns() - t0)
+        return dict(zip(cands, preds))
+
+    def scoring_stats(self) -> dict:
+        """Per-bar scoring latency summary (µs) for the report."""
+        if not self.score_ns:
+            return {}
+        us = np.asarray(self.score_ns) / 1e3
+        return {"Scored bars": len(us),
+                "Scoring p50 µs": f"{np.percentile(us, 50):.0f}",
+                "Scoring p95 µs": f"{np.percentile(us, 95):.0f}",
+                "Scoring max µs": f"{us.max():.0f}"}
 
     # ----------------------------------------------------------- bookkeeping
-    def start(self):
-        self.value_hist.append((self.datas[0].datetime.datetime(0),
-                                self.broker.getvalue()))
-
     def next(self):
-        self.value_hist.append((self.datas[0].datetime.datetime(0),
-                                self.broker.getvalue()))
-
-        for d in self.datas:
+        w0, c0 = time.perf_counter_ns(), time.process_time_ns()
+        self._next()
+        self.next_ns[0] += time.perf_counter_ns() - w0
+        self.next_ns[1] += time.process_time_ns() - c0
+
+    def _next(self):
+        # a feed with no bar this session still shows its last one: leave it be
+        now  = max(d.datetime[0] for d in self.datas)
+        live = [d.datetime[0] == now for d in self.datas]
+        self.ledger.mark(bt.num2date(now), self.broker.getvalue())
+
+        # same condition as features.label_shocks; NaN warm-up never fires
+        cands = [i for i, d in enumerate(self.datas)
+                 if live[i] and not self.getposition(d)
+                 and d.ret[0] <= -self.p.shock_sigma * d.sigma20[0]]
+        preds = self._predict(cands) if self.uses_model else dict.fromkeys(cands)
+
+        for i, d in enumerate(self.datas):
+            if not live[i]:
+                continue
             pos   = self.getposition(d)
-            atr14 = self.inds[d]["atr"][0]
+            atr14 = d.atr14[0]
 
             # ------------- entry -------------
-            if not pos and d.shock[0]:
+            if not pos and i in preds:
                 risk = atr14 * self.p.atr_mult
-                shares = int(self.broker.getcash() * self.p.risk_budget / risk)
+                if not risk > 0:                       # ATR still warming up
+                    continue
+                budget = self.p.risk_budget
+                pred = preds[i]
+                if pred is not None:
+                    if self.p.min_pred is not None and not pred >= self.p.min_pred:
+                        continue
+                    if self.p.size_by_pred:
+                        budget *= min(1.0, max(pred, 0.0) / self.p.pred_cap)
+                shares = int(self.broker.getcash() * budget / risk)
                 if shares > 0:
                     self.buy(data=d, size=shares)
 
@@ -56,7 +137,9 @@ class ShockReboundStrategy(bt.Strategy):
 
     # -------------------------------------------------------- force close all
     def stop(self):
-        dt = self.datas[0].datetime.datetime(0)
+        metrics.record("strategy.next", self.next_ns[0] / 1e9, self.next_ns[1] / 1e9,
+                       rows=len(self))
+        dt = bt.num2date(max(d.datetime[0] for d in self.datas))
 
         for d in self.datas:
             pos = self.getposition(d)
@@ -77,25 +160,12 @@ class ShockReboundStrategy(bt.Strategy):
             slip = size * price * SLIPPAGE_PERC
             self.broker.add_cash(-tax - slip)
 
-            # ---------- update existing open trade row ----------
-            for rec in reversed(self.trade_log):
-                if rec["symbol"] == d._name and rec.get("exit_date") is None:
-                    rec.update(exit_date=dt, exit_price=price,
-                               gross=gross, tax=tax,
-                               slippage=slip, net=gross - tax - slip)
-                    break
-            else:
-                # (should not happen) – create a row if none exists
-                self.trade_log.append(dict(
-                    symbol=d._name, entry_date=d.entry_dt,
-                    exit_date=dt, size=size,
-                    entry_price=d.entry_price, exit_price=price,
-                    gross=gross, tax=tax, slippage=slip,
-                    net=gross - tax - slip
-                ))
+            # update the open trade row (or create one if, oddly, none exists)
+            self.ledger.close(d._name, dt, price, gross, tax, slip,
+                              size=size, entry_dt=d.entry_dt, entry_price=d.entry_price)
 
         # record equity after everything is realised
-        self.value_hist.append((dt, self.broker.getvalue()))
+        self.ledger.mark(dt, self.broker.getvalue())
 
     # -------------------------------------------------------------- order fill
     def notify_order(self, order):
@@ -112,13 +182,7 @@ class ShockReboundStrategy(bt.Strategy):
             self.broker.add_cash(-size * px * SLIPPAGE_PERC)
 
             d.entry_price, d.entry_dt, d.entry_bar = px, dt, len(d)
-            self.trade_log.append({
-                "symbol":      sym,
-                "entry_date":  dt,
-                "exit_date":   None,
-                "size":        size,
-                "entry_price": px
-            })
+            self.ledger.open(sym, dt, size, px)
 
         # ---------------------- SELL ---------------------
         elif order.status == order.Completed and order.issell():
@@ -128,9 +192,5 @@ class ShockReboundStrategy(bt.Strategy):
             slip  = size * px * SLIPPAGE_PERC
             self.broker.add_cash(-tax - slip)
 
-            for rec in reversed(self.trade_log):
-                if rec["symbol"] == sym and rec.get("exit_date") is None:
-                    rec.update(exit_date=dt, exit_price=px,
-                               gross=gross, tax=tax,
-                               slippage=slip, net=gross - tax - slip)
-                    break
+            if self.ledger.is_open(sym):
+                self.ledger.close(sym, dt, px, gross, tax, slip)
@@ -0,0 +1,132 @@
+"""Parallel parameter sweep over the vectorised shock-rebound engine.
+
+The daily panel and its indicators are built once, then shared read-only
+with the workers – through POSIX shared memory for the local process pool
+or through the object store when running on Ray – so each trial only pays
+for the back-test loop itself.
+"""
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .reporting import cagr, max_drawdown
+from .vector import Panel, indicators, run_panel
+
+PARAMS = ("shock_sigma", "atr_mult", "hold_days", "risk_budget")
+_ARRAYS = ("open", "high", "low", "close", "ret", "sigma", "atr")
+
+
+def grid(space: dict[str, list], n_random: int | None = None, seed: int = 0) -> list[dict]:
+    """Full cartesian grid, or ``n_random`` distinct points drawn from it."""
+    keys = list(space)
+    combos = [dict(zip(keys, vals)) for vals in itertools.product(*space.values())]
+    if n_random is not None and n_random < len(combos):
+        combos = random.Random(seed).sample(combos, n_random)
+    return combos
+
+
+def evaluate(p: Panel, ind, params: dict) -> dict:
+    """Run one trial and reduce it to the ranking metrics."""
+    res = run_panel(p, ind, **params)
+    eq = res.equity_series()
+    trades = res.trades_frame()
+    return {
+        **params,
+        "cagr":       cagr(eq),
+        "max_dd":     max_drawdown(eq),
+        "end_equity": eq.iloc[-1],
+        "net_pnl":    trades["net"].sum(),
+        "trades":     len(trades),
+    }
+
+
+# ------------------------------------------------------------ shared memory
+class SharedPanel:
+    """Panel + indicator arrays packed into one ``SharedMemory`` block."""
+
+    def __init__(self, p: Panel, ind):
+        arrays = dict(zip(_ARRAYS, (p.open, p.high, p.low, p.close, *ind)))
+        size = sum(a.nbytes for a in arrays.values())
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        layout, off = [], 0
+        for name, a in arrays.items():
+            np.ndarray(a.shape, a.dtype, buffer=self.shm.buf, offset=off)[:] = a
+            layout.append((name, a.dtype.str, a.shape, off))
+            off += a.nbytes
+        self.spec = (self.shm.name, layout, p.symbols, p.dates)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    @staticmethod
+    def attach(spec):
+        name, layout, symbols, dates = spec
+        shm = shared_memory.SharedMemory(name=name)
+        arrays = {}
+        for key, dtype, shape, off in layout:
+            a = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=off)
+            a.flags.writeable = False
+            arrays[key] = a
+        p = Panel(symbols=symbols, dates=dates,
+                  **{k: arrays[k] for k in ("open", "high", "low", "close")})
+        return shm, p, (arrays["ret"], arrays["sigma"], arrays["atr"])
+
+
+_worker = {}
+
+def _init_worker(spec):
+    _worker["shm"], _worker["panel"], _worker["ind"] = SharedPanel.attach(spec)
+
+def _run_trial(params: dict) -> dict:
+    return evaluate(_worker["panel"], _worker["ind"], params)
+
+
+def _sweep_processes(p: Panel, ind, trials: list[dict], workers: int) -> list[dict]:
+    shared = SharedPanel(p, ind)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec,)) as pool:
+            return list(pool.map(_run_trial, trials, chunksize=max(1, len(trials) // (4 * workers))))
+    finally:
+        shared.close()
+
+
+def _sweep_ray(p: Panel, ind, trials: list[dict], workers: int) -> list[dict]:
+    import ray   # optional – only needed for --backend ray
+
+    ray.init(num_cpus=workers, ignore_reinit_error=True, include_dashboard=False)
+    p_ref, ind_ref = ray.put(p), ray.put(ind)    # numpy buffers are zero-copy in the store
+
+    @ray.remote
+    def trial(p, ind, params):
+        return evaluate(p, ind, params)
+
+    return ray.get([trial.remote(p_ref, ind_ref, t) for t in trials])
+
+
+def sweep(frames: dict[str, pd.DataFrame], trials: list[dict],
+          workers: int | None = None, backend: str = "process") -> pd.DataFrame:
+    """Evaluate ``trials`` over ``frames`` in parallel; return them ranked by CAGR."""
+    p = Panel.from_frames(frames)
+    ind = indicators(p)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(trials)))
+    logger.info("Sweeping {} trials over {} symbols × {} days ({} × {})",
+                len(trials), len(p.symbols), len(p.dates), workers, backend)
+
+    if backend == "ray":
+        rows = _sweep_ray(p, ind, trials, workers)
+    elif workers == 1:
+        rows = [evaluate(p, ind, t) for t in trials]
+    else:
+        rows = _sweep_processes(p, ind, trials, workers)
+
+    table = pd.DataFrame(rows)
+    return (table.sort_values("cagr", ascending=False, na_position="last")
+                 .reset_index(drop=True))
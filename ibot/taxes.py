@@ -7,33 +7,38 @@ ST_CG_RATE = 0.24
 LT_CG_RATE = 0.15
 LT_HOLD_DAYS = 365
 
+class Lot:
+    __slots__ = ("shares", "cost", "date")
+
+    def __init__(self, shares: int, cost: float, date: datetime):
+        self.shares, self.cost, self.date = shares, cost, date
+
 class TaxLots:
     """Maintains FIFO lots per symbol and computes after-tax P&L on exit."""
+    __slots__ = ("lots",)
 
     def __init__(self):
-        self.lots = {}   # symbol → deque([(shares, cost, entry_date)])
+        self.lots = {}   # symbol → deque([Lot])
 
     def buy(self, sym: str, shares: int, price: float, date: datetime):
-        self.lots.setdefault(sym, deque()).append([shares, price, date])
+        self.lots.setdefault(sym, deque()).append(Lot(shares, price, date))
 
     def sell(self, sym: str, shares: int, price: float, date: datetime) -> float:
         gain_net = 0.0
-        q = self.lots.get(sym, deque())
+        q = self.lots.get(sym, ())
         while shares > 0 and q:
-            lot_shares, cost, entry_date = q[0]
-            take = min(shares, lot_shares)
-            gross = (price - cost) * take
-            held_days = (date - entry_date).days
+            lot = q[0]
+            take = min(shares, lot.shares)
+            gross = (price - lot.cost) * take
+            held_days = (date - lot.date).days
             tax_rate = LT_CG_RATE if held_days >= LT_HOLD_DAYS else ST_CG_RATE
             tax = max(gross, 0) * tax_rate    # only gains are taxed
             gain_net += gross - tax
 
-            lot_shares -= take
+            lot.shares -= take
             shares -= take
-            if lot_shares == 0:
+            if lot.shares == 0:
                 q.popleft()
-            else:
-                q[0][0] = lot_shares
         if shares > 0:
             logger.warning("Selling more than we own? {} shares left", shares)
         return gain_net
@@ -0,0 +1,119 @@
+"""LightGBM hyper-parameter search with Ray Tune.
+
+    python -m ibot tune --from 2014-01-02 --to 2021-12-31 --samples 64
+
+The binned training Dataset is built (or loaded) once through
+``load_or_build_dataset`` and every trial reads that same ``.bin`` file,
+so no trial re-bins the data.  Each trial runs ``model.cross_validate`` –
+the ``TimeSeriesSplit`` folds ``train()`` uses – and reports the running
+mean validation RMSE after every fold; an ASHA scheduler stops trials
+that trail their rung after the early folds.  ``threads`` is one budget
+split between ``concurrent`` trials, each LightGBM fit getting
+``threads // concurrent``, so parallel trials never oversubscribe the
+cores.  The best trial that finished every fold is written to
+``model.PARAMS_PATH``, which ``train()`` overlays on ``LGB_PARAMS``.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .config import DATA_PROCESSED
+from .model import (DATASET_PARAMS, LGB_PARAMS, N_SPLITS, PARAMS_PATH, cross_validate,
+                    dataset_key, dataset_path, load_or_build_dataset)
+
+TUNE_DIR = DATA_PROCESSED / "tune"
+
+
+def space() -> dict:
+    """Search space (Ray Tune samplers) over the training-only LightGBM params."""
+    from ray import tune
+
+    return {
+        "learning_rate":    tune.loguniform(0.005, 0.2),
+        "num_leaves":       tune.lograndint(8, 256),
+        "min_data_in_leaf": tune.lograndint(5, 200),
+        "colsample_bytree": tune.uniform(0.5, 1.0),
+        "subsample":        tune.uniform(0.5, 1.0),
+        "subsample_freq":   tune.choice([0, 1]),
+        "lambda_l2":        tune.loguniform(1e-3, 10.0),
+    }
+
+
+def _trial(config: dict, data: str, threads: int):
+    """One Ray Tune trial: CV over the shared binned Dataset."""
+    import lightgbm as lgb
+    from ray import tune
+
+    full = lgb.Dataset(data, params={**DATASET_PARAMS, "num_threads": threads}).construct()
+    params = {**LGB_PARAMS, **config, "num_threads": threads}
+
+    def report(rmses, rounds):
+        tune.report({"rmse": float(np.mean(rmses)), "folds": len(rmses),
+                     "trees": int(np.median(rounds))})
+
+    cross_validate(full, params, on_fold=report)
+
+
+def tune(symbols: list[str], date_from: str, date_to: str, samples: int = 32,
+         threads: int | None = None, concurrent: int | None = None,
+         seed: int = 0) -> pd.DataFrame:
+    """Search ``samples`` configurations; save the best, return all trials (best first)."""
+    import ray
+    from ray import tune as rt
+    from ray.tune.schedulers import ASHAScheduler
+    from ray.tune.search import BasicVariantGenerator
+
+    threads = threads or os.cpu_count() or 1
+    concurrent = max(1, min(concurrent or threads, threads, samples))
+    per_trial = threads // concurrent
+    key = dataset_key(symbols, date_from, date_to)
+    load_or_build_dataset(symbols, date_from, date_to, threads)     # built once, shared below
+    logger.info("Tuning {} samples: {} concurrent trials × {} threads", samples, concurrent, per_trial)
+
+    ray.init(num_cpus=threads, include_dashboard=False, ignore_reinit_error=True,
+             log_to_driver=False)
+    try:
+        trainable = rt.with_resources(
+            rt.with_parameters(_trial, data=str(dataset_path(key)), threads=per_trial),
+            {"cpu": per_trial})
+        tuner = rt.Tuner(
+            trainable,
+            param_space=space(),
+            tune_config=rt.TuneConfig(
+                metric="rmse", mode="min", num_samples=samples,
+                scheduler=ASHAScheduler(max_t=N_SPLITS, grace_period=1, reduction_factor=2),
+                search_alg=BasicVariantGenerator(random_state=seed, max_concurrent=concurrent)),
+            run_config=ray.tune.RunConfig(name=f"lgb_{key}", storage_path=str(TUNE_DIR.resolve()),
+                                          verbose=0),
+        )
+        results = tuner.fit()
+    finally:
+        ray.shutdown()
+
+    table = results.get_dataframe()
+    table = table.rename(columns=lambda c: c.removeprefix("config/"))
+    cols = ["rmse", "folds", "trees", *space()]
+    table = (table[cols].sort_values(["folds", "rmse"], ascending=[False, True])
+                        .reset_index(drop=True))
+    done = table[table["folds"] == N_SPLITS]
+    if done.empty:
+        raise RuntimeError("No trial finished every fold")
+    best = done.iloc[0]
+    params = {k: _plain(done[k].iloc[0]) for k in space()}     # column dtypes, not the row's
+
+    PARAMS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    PARAMS_PATH.write_text(json.dumps(dict(
+        params=params, rmse=float(best["rmse"]), trees=int(best["trees"]),
+        dataset=key, date_from=str(date_from), date_to=str(date_to), samples=samples,
+    ), indent=2))
+    logger.success("Best CV RMSE {:.5f} ({} of {} trials finished) ➜ {}",
+                   best["rmse"], len(done), len(table), PARAMS_PATH)
+    return table
+
+
+def _plain(v):
+    """NumPy scalar → JSON-friendly Python value."""
+    return v.item() if hasattr(v, "item") else v
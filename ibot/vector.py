@@ -0,0 +1,214 @@
+"""Vectorised NumPy back-test engine for the shock-rebound rules.
+
+Runs the same entry/exit logic as ``ShockReboundStrategy`` over a
+symbols × dates array panel instead of one backtrader ``next()`` per bar.
+Signals are computed for every symbol at once; only the (rare) order fills
+are handled one by one.  Broker timing mirrors backtrader's ``BackBroker``
+as configured in ``backtest.py``:
+
+* market orders fill at the next bar's open, slipped by ``SLIPPAGE_PERC``
+  but never outside that bar's high/low;
+* orders are margin-checked in submission order against the cash at the
+  creation bar's close, then again at the real fill price;
+* ``broker.add_cash`` adjustments (tax, extra slippage) only land at the end
+  of the following bar, and ``getvalue()`` is the cached end-of-bar value.
+
+A symbol with no bar on a date (NaN in the union-of-dates panel) is left
+alone that day: its accepted orders stay pending until its next bar, it is
+marked at its last close, and the strategy neither enters nor exits it –
+the hold clock counts the symbol's own bars, like ``len(data)``.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import indicators as ind_
+from .config import (START_CASH, RISK_BUDGET, ATR_MULT, HOLD_DAYS, SHOCK_SIGMA,
+                     SLIPPAGE_PERC)
+from .ledger import Ledger
+from .taxes import TaxLots
+
+_OHLC = ("open", "high", "low", "close")
+
+
+@dataclass
+class Panel:
+    """Dates × symbols arrays aligned on the union of dates.
+
+    ``ret``/``sigma20``/``atr14`` are filled when every frame carries the
+    cached indicator columns, otherwise ``indicators()`` computes them.
+    """
+    symbols: list[str]
+    dates:   list[datetime]
+    open:    np.ndarray
+    high:    np.ndarray
+    low:     np.ndarray
+    close:   np.ndarray
+    ret:     np.ndarray | None = None
+    sigma20: np.ndarray | None = None
+    atr14:   np.ndarray | None = None
+    pred:    np.ndarray | None = None      # precomputed model score (see score_panel)
+
+    @classmethod
+    def from_frames(cls, frames: dict[str, pd.DataFrame]) -> "Panel":
+        symbols = list(frames)
+        fields = list(_OHLC)
+        if all({"ret", "sigma20", "atr14"} <= set(df.columns) for df in frames.values()):
+            fields += ["ret", "sigma20", "atr14"]
+        if all("pred" in df.columns for df in frames.values()):
+            fields.append("pred")
+        wide = {k: pd.DataFrame({s: frames[s][k] for s in symbols}) for k in fields}
+        idx = wide["close"].index
+        dates = (idx.tz_convert("UTC").tz_localize(None) if idx.tz is not None else idx)
+        return cls(symbols=symbols,
+                   dates=list(dates.to_pydatetime()),
+                   **{k: v.to_numpy(dtype="float64") for k, v in wide.items()})
+
+
+def indicators(p: Panel) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``ret``, ``sigma20`` and ``atr14`` panels (``ibot.indicators`` definitions)."""
+    if p.ret is not None:
+        return p.ret, p.sigma20, p.atr14
+    cols = ind_.compute(p.high, p.low, p.close)
+    return cols["ret"], cols["sigma20"], cols["atr14"]
+
+
+def run(frames: dict[str, pd.DataFrame], **params) -> Ledger:
+    """Back-test ``frames`` (symbol → daily OHLCV, in feed order)."""
+    return run_panel(Panel.from_frames(frames), **params)
+
+
+def run_panel(p: Panel,
+              ind: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None,
+              cash: float = START_CASH,
+              risk_budget: float = RISK_BUDGET,
+              atr_mult: float = ATR_MULT,
+              hold_days: int = HOLD_DAYS,
+              shock_sigma: float = SHOCK_SIGMA,
+              slippage: float = SLIPPAGE_PERC,
+              min_pred: float | None = None,
+              size_by_pred: bool = False,
+              pred_cap: float = 0.10) -> Ledger:
+    """Back-test a prebuilt panel.
+
+    ``ind`` lets callers pass ``indicators(p)`` computed once (they do not
+    depend on any parameter).  ``min_pred``/``size_by_pred`` gate and size
+    entries on ``p.pred`` exactly like the strategy's params of that name.
+    """
+    if (min_pred is not None or size_by_pred) and p.pred is None:
+        raise ValueError("Model gating needs a 'pred' column on every frame")
+    ret, sigma, atr = ind if ind is not None else indicators(p)
+    T, N = p.close.shape
+    syms, dates = p.symbols, p.dates
+    mark = pd.DataFrame(p.close).ffill().to_numpy()       # last known close
+    live = ~np.isnan(p.close)                            # symbol printed a bar
+    nbar = np.cumsum(live, axis=0)                       # own bars so far (len(data))
+
+    shock = ind_.shock(ret, sigma, shock_sigma)
+
+    tax = TaxLots()
+    res = Ledger(capacity=T + 1)
+
+    pos         = np.zeros(N, dtype=np.int64)
+    entry_price = np.zeros(N)
+    entry_bar   = np.zeros(N, dtype=np.int64)
+    pending_add = 0.0                                    # queued broker.add_cash
+
+    # open orders: +size buy / -size sell, per symbol; ``accepted`` ones
+    # passed the margin check and wait for the symbol's next bar
+    order_size  = np.zeros(N, dtype=np.int64)
+    order_price = np.zeros(N)                            # close at creation
+    order_bar   = np.zeros(N, dtype=np.int64)            # creation bar, for fill order
+    accepted    = np.zeros(N, dtype=bool)
+    value = cash
+
+    for t in range(T):
+        queued, pending_add = pending_add, 0.0            # from last bar's notifications
+
+        # ---------------- broker: margin check + fills at the open ----------
+        new = np.flatnonzero((order_size != 0) & ~accepted)
+        if len(new):
+            # pseudo-execution at the creation close, cash never restored
+            check = cash - np.cumsum(order_size[new] * order_price[new])
+            order_size[new[check < 0.0]] = 0
+            accepted[new[check >= 0.0]] = True
+        fills = np.flatnonzero(accepted & ~np.isnan(p.open[t]))
+        if len(fills):
+            fills = fills[np.argsort(order_bar[fills], kind="stable")]   # submission order
+            done = fills
+
+            o, hi, lo = p.open[t, fills], p.high[t, fills], p.low[t, fills]
+            buy = order_size[fills] > 0
+            px = np.where(buy, np.minimum(o * (1 + slippage), hi),
+                               np.maximum(o * (1 - slippage), lo))
+            flow = -order_size[fills] * px
+            if len(flow) and cash + np.cumsum(np.minimum(flow, 0.0)).min() < 0.0:
+                # some buy may fail at its real price – settle one by one
+                ok = np.zeros(len(fills), dtype=bool)
+                for k, f in enumerate(flow):
+                    if cash + f >= 0.0:
+                        cash += f
+                        ok[k] = True
+                fills, px, buy = fills[ok], px[ok], buy[ok]
+            else:
+                cash += flow.sum()
+
+            dt = dates[t]
+            for i, price, is_buy in zip(fills, px, buy):
+                sym, size = syms[i], int(abs(order_size[i]))
+                if is_buy:
+                    tax.buy(sym, size, price, dt)
+                    pending_add -= size * price * slippage
+                    pos[i], entry_price[i], entry_bar[i] = size, price, t
+                    res.open(sym, dt, size, price)
+                else:
+                    gross = (price - entry_price[i]) * size
+                    t_amt = gross - tax.sell(sym, size, price, dt)
+                    slip = size * price * slippage
+                    pending_add -= t_amt + slip
+                    pos[i] = 0
+                    res.close(sym, dt, price, gross, t_amt, slip)
+            order_size[done], accepted[done] = 0, False
+
+        # ---------------- broker: end-of-bar value ----------------
+        cash += queued
+        value = cash + float(pos @ np.nan_to_num(mark[t]))
+
+        # ---------------- strategy.next() ----------------
+        res.mark(dates[t], value)
+        c, a, on = p.close[t], atr[t], live[t]
+        risk = a * atr_mult
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            enter = (pos == 0) & shock[t] & (risk > 0)
+            budget = risk_budget
+            if min_pred is not None:
+                enter &= p.pred[t] >= min_pred
+            if size_by_pred:
+                budget = risk_budget * np.minimum(1.0, np.maximum(p.pred[t], 0.0) / pred_cap)
+            shares = np.where(enter, np.trunc(cash * budget / risk), 0)
+            held = nbar[t] - nbar[entry_bar, np.arange(N)]
+            leave = on & (pos > 0) & ((c <= entry_price - risk) | (c >= entry_price + risk)
+                                      | (held >= hold_days))
+
+        shares = np.nan_to_num(shares).astype(np.int64)
+        size = np.where(shares > 0, shares, 0) - np.where(leave, pos, 0)
+        new = np.flatnonzero(size)
+        order_size[new], order_price[new], order_bar[new] = size[new], c[new], t
+
+    # ---------------- Strategy.stop(): realise open positions ----------------
+    if T:
+        dt = dates[-1]
+        for i in np.flatnonzero(pos):
+            price = mark[-1, i]
+            if price != price:
+                continue
+            sym, size = syms[i], int(pos[i])
+            gross = (price - entry_price[i]) * size
+            t_amt = gross - tax.sell(sym, size, price, dt)
+            slip = size * price * slippage
+            res.close(sym, dt, price, gross, t_amt, slip)
+        res.mark(dt, value)
+    return res
@@ -0,0 +1,168 @@
+"""Walk-forward train / test: retrain the model per window, test out of sample.
+
+The test range ``[start, end]`` is tiled into consecutive ``test_months``
+windows; each is preceded by a ``train_years`` training window that ends
+the day before it.  Windows run in separate worker processes and every
+window's model, equity curve and trades are cached under
+``DATA_PROCESSED/walkforward/<key>`` where the key covers the raw data
+fingerprint, the window and all parameters – so extending the range only
+computes the new windows.  The data fingerprint covers only the daily
+rows inside each window, so appending new bars leaves earlier windows'
+keys (and cached results) alone.  Windows whose params neither gate nor
+size entries on the model (no ``min_pred`` / ``size_by_pred``) train
+nothing.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+
+import pandas as pd
+from loguru import logger
+
+from .config import (DATA_PROCESSED, START_CASH, RISK_BUDGET, ATR_MULT, HOLD_DAYS,
+                     SHOCK_SIGMA, SLIPPAGE_PERC)
+from .data import daily_path, ensure_columns, ensure_daily, read_daily, window_feeds
+from .model import train, lgb_params, MAX_ROUNDS, EARLY_STOP, N_SPLITS
+from .reporting import cagr
+from .runner import run as run_backtest
+
+WF_DIR     = DATA_PROCESSED / "walkforward"
+WF_VERSION = 1                 # bump when window results change meaning
+
+
+@dataclass(frozen=True)
+class Window:
+    train_from: str
+    train_to:   str
+    test_from:  str
+    test_to:    str
+
+
+def windows(start, end, train_years: int = 3, test_months: int = 6) -> list[Window]:
+    """Consecutive test windows over ``[start, end]``, each with its train window."""
+    day = pd.Timedelta(days=1)
+    t0, end = pd.Timestamp(start), pd.Timestamp(end)
+    out = []
+    while t0 <= end:
+        t1 = min(t0 + pd.DateOffset(months=test_months) - day, end)
+        out.append(Window(train_from=(t0 - pd.DateOffset(years=train_years)).date().isoformat(),
+                          train_to=(t0 - day).date().isoformat(),
+                          test_from=t0.date().isoformat(),
+                          test_to=t1.date().isoformat()))
+        t0 = t1 + day
+    return out
+
+
+def data_key(symbols: list[str], date_from, date_to) -> str:
+    """Hash of the cached daily rows (bars + indicators) in ``[date_from, date_to]``."""
+    h = hashlib.sha1()
+    for s in sorted(set(symbols)):
+        if not daily_path(s).exists():
+            continue
+        rows = read_daily(s).loc[date_from:date_to]
+        h.update(s.encode())
+        h.update(pd.util.hash_pandas_object(rows).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def uses_model(params: dict) -> bool:
+    """Whether the model gates or sizes entries under ``params``."""
+    return params.get("min_pred") is not None or bool(params.get("size_by_pred"))
+
+
+def window_key(symbols: list[str], w: Window, params: dict) -> str:
+    blob = json.dumps(dict(
+        version=WF_VERSION,
+        data=data_key([*symbols, "SPY"], w.train_from, w.test_to),
+        window=asdict(w),
+        params=params,
+        strategy=dict(cash=START_CASH, risk=RISK_BUDGET, atr=ATR_MULT, hold=HOLD_DAYS,
+                      sigma=SHOCK_SIGMA, slippage=SLIPPAGE_PERC),
+        model=(dict(lgb_params(), rounds=MAX_ROUNDS, stop=EARLY_STOP, splits=N_SPLITS)
+               if uses_model(params) else None),
+    ), sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def run_window(symbols: list[str], w: Window, params: dict, threads: int = 1):
+    """Train on ``w``'s train range if the model is used and back-test its
+    test range (cached).
+
+    Returns ``(equity, trades, cached)`` or ``None`` when the test range has
+    no bars or the train range has no shock rows to learn from.
+    """
+    out = WF_DIR / window_key(symbols, w, params)
+    eq_path, tr_path = out / "equity.parquet", out / "trades.parquet"
+    if eq_path.exists():
+        return pd.read_parquet(eq_path)["equity"], pd.read_parquet(tr_path), True
+
+    feeds = window_feeds(symbols, w.test_from, w.test_to)
+    if len(feeds) < 2 or feeds[-1][1].empty:
+        logger.warning("Window {}: no bars to test on", w.test_from)
+        return None
+
+    out.mkdir(parents=True, exist_ok=True)
+    model = None
+    if uses_model(params):
+        try:
+            model = train(symbols, w.train_from, w.train_to, threads=threads,
+                          path=out / "model.lgb")
+        except ValueError as e:
+            logger.warning("Window {}: {}", w.test_from, e)
+            return None
+
+    res = run_backtest(feeds, model, w.test_from, w.test_to, **params)
+
+    res.trades.to_parquet(tr_path)
+    tmp = eq_path.with_suffix(".tmp")            # equity last: it marks the window done
+    res.equity.to_frame("equity").to_parquet(tmp)
+    os.replace(tmp, eq_path)
+    return res.equity, res.trades, False
+
+
+def stitch(parts: list[tuple[Window, pd.Series, pd.DataFrame]]):
+    """Chain the per-window curves (each starts at ``START_CASH``) into one.
+
+    Trades keep their per-window dollar amounts and gain a ``window`` column.
+    """
+    curves, level = [], START_CASH
+    for _, eq, _ in parts:
+        seg = eq / START_CASH * level
+        curves.append(seg)
+        level = seg.iloc[-1]
+    trades = [tr.assign(window=w.test_from) for w, _, tr in parts]
+    return (pd.concat(curves) if curves else pd.Series(dtype=float),
+            pd.concat(trades, ignore_index=True) if trades else pd.DataFrame())
+
+
+def walk_forward(symbols: list[str], start, end, params: dict,
+                 train_years: int = 3, test_months: int = 6,
+                 workers: int | None = None):
+    """Run every window (concurrently) and return ``(equity, trades, summary)``."""
+    wins = windows(start, end, train_years, test_months)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(wins)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # fill the caches once, before the workers; inside a window the shard
+    # builder's pool is then the only one, capped at ``threads`` processes
+    present = ensure_daily([*symbols, "SPY"])
+    if params.get("engine") == "intraday":
+        ensure_columns(present)
+    logger.info("Walk-forward: {} windows of {}m after {}y training ({} workers)",
+                len(wins), test_months, train_years, workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_window, symbols, w, params, threads) for w in wins]
+        results = [f.result() for f in futures]
+
+    parts, rows = [], []
+    for w, r in zip(wins, results):
+        if r is None:
+            continue
+        eq, trades, cached = r
+        parts.append((w, eq, trades))
+        rows.append(dict(**asdict(w), cagr=cagr(eq), end_equity=eq.iloc[-1],
+                         trades=len(trades), cached=cached))
+    equity, trades = stitch(parts)
+    return equity, trades, pd.DataFrame(rows)
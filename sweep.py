@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+"""CLI to sweep ShockReboundStrategy parameters in parallel (same as ``ibot sweep``)."""
+import sys
+from ibot.cli import main as ibot
+
+def main(argv):
+    return ibot(["sweep", *argv])
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""Shared fixtures: a scratch ``IBOT_HOME`` and a synthetic gapped universe.
+
+``IBOT_HOME`` is set before any ``ibot`` module is imported, so every cache
+the tests build lands in a temporary directory instead of the repo.
+"""
+import os
+import shutil
+import tempfile
+
+HOME = tempfile.mkdtemp(prefix="ibot-test-")
+os.environ["IBOT_HOME"] = HOME
+
+import numpy as np                                       # noqa: E402
+import pandas as pd                                      # noqa: E402
+import pyarrow as pa                                     # noqa: E402
+import pyarrow.parquet as pq                             # noqa: E402
+import pytest                                            # noqa: E402
+
+START, END = "2022-01-03", "2023-12-29"
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(HOME, ignore_errors=True)
+
+
+def drop_sessions(src, dst, seed: int = 3, share: float = 0.1):
+    """Copy a minute file without ``share`` of its sessions and without the
+    session after every shock, so orders on it have to wait across gaps."""
+    from ibot.bars import EXCHANGE_TZ, resample_frame
+    from ibot.config import SHOCK_SIGMA
+    from ibot.indicators import compute, shock
+
+    df = pq.read_table(src).to_pandas().set_index("timestamp")
+    daily = resample_frame(df, "1D")
+    ind = compute(*(daily[k].to_numpy()[:, None] for k in ("high", "low", "close")))
+    after = np.flatnonzero(shock(ind["ret"], ind["sigma20"], SHOCK_SIGMA)[:, 0]) + 1
+    rng = np.random.default_rng(seed)
+    drop = np.union1d(after[after < len(daily)],
+                      rng.choice(len(daily), int(len(daily) * share), replace=False))
+    session = df.index.tz_convert(EXCHANGE_TZ).normalize().tz_localize(None)
+    keep = ~session.isin(pd.DatetimeIndex(daily.index[drop].date))
+    pq.write_table(pa.Table.from_pandas(df[keep].reset_index(), preserve_index=False), dst)
+
+
+@pytest.fixture(scope="session")
+def gapped() -> list[str]:
+    """SPY plus three symbols, ``GAP`` missing ~10% of its sessions."""
+    from bench.synth import generate
+    from ibot.config import DATA_RAW
+
+    generate(DATA_RAW, 4, 3, seed=1, end=END)
+    drop_sessions(DATA_RAW / "S003.parquet", DATA_RAW / "GAP.parquet")
+    (DATA_RAW / "S003.parquet").unlink()
+    return ["GAP", "S001", "S002"]
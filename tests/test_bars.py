@@ -0,0 +1,58 @@
+"""Parity of the single-pass bar kernel with the pandas resampler it replaced."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ibot.bars import EXCHANGE_TZ, resample_frame
+
+AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+# extended-hours minutes (04:00–20:00 New York) around both 2023 DST switches
+DAYS = ["2023-03-09", "2023-03-10", "2023-03-13", "2023-03-14",
+        "2023-11-02", "2023-11-03", "2023-11-06", "2023-11-07"]
+
+
+@pytest.fixture(scope="module")
+def minutes() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    local = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(f"{d} 04:00", f"{d} 19:59", freq="1min") for d in DAYS]))
+    idx = local.tz_localize(EXCHANGE_TZ).tz_convert("UTC").rename("timestamp")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, len(idx))))
+    open_ = np.r_[close[0], close[:-1]]
+    df = pd.DataFrame({
+        "open":   open_,
+        "high":   np.maximum(open_, close) * 1.0005,
+        "low":    np.minimum(open_, close) * 0.9995,
+        "close":  close,
+        "volume": rng.integers(1, 10_000, len(idx)).astype("int64"),
+    }, index=idx)
+    df.iloc[rng.choice(len(df), 50, replace=False), [0, 3]] = np.nan   # dropped minutes
+    return df
+
+
+def reference(df: pd.DataFrame, freq: str, regular_hours: bool) -> pd.DataFrame:
+    """The old ``resample().agg()`` path, on the exchange clock."""
+    df = df.dropna(subset=["open", "close"]).tz_convert(EXCHANGE_TZ)
+    if regular_hours:
+        df = df.between_time("09:30", "15:59")
+    out = df.resample(freq).agg(AGG).dropna(subset=["open"])
+    if freq == "1D":                          # session date, labelled at 00:00 UTC
+        out.index = pd.DatetimeIndex(out.index.date).tz_localize("UTC")
+    else:
+        out.index = out.index.tz_convert("UTC")
+    return out
+
+
+@pytest.mark.parametrize("regular_hours", [False, True])
+@pytest.mark.parametrize("freq", ["1D", "5min", "30min", "1h"])
+def test_matches_pandas_resample(minutes, freq, regular_hours):
+    got = resample_frame(minutes, freq, regular_hours=regular_hours)
+    want = reference(minutes, freq, regular_hours)
+    pd.testing.assert_frame_equal(got, want, check_names=False, check_freq=False,
+                                  check_index_type=False)
+
+
+def test_daily_bars_follow_session_dates(minutes):
+    got = resample_frame(minutes, "1D", regular_hours=True)
+    assert [d.strftime("%Y-%m-%d") for d in got.index] == DAYS
@@ -0,0 +1,37 @@
+"""Indicators on a dates x symbols panel with missing rows."""
+import numpy as np
+
+from ibot.indicators import compute, wilder_atr
+
+
+def ohlc(days: int = 120, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    wick = np.abs(rng.normal(0, 0.01, (2, days)))
+    return close * (1 + wick[0]), close * (1 - wick[1]), close
+
+
+def test_gapped_column_runs_over_its_own_bars():
+    full = np.stack(ohlc(), axis=-1)                  # days x (high, low, close)
+    own = np.ones(len(full), dtype=bool)
+    own[:7] = False                                   # listed late
+    own[[30, 31, 55, 90]] = False                     # skipped sessions
+    panel = np.stack([full, full], axis=-1)           # days x field x symbol
+    panel[~own, :, 0] = np.nan
+
+    cols = compute(*(panel[:, k] for k in range(3)))
+    alone = compute(*(full[own, k] for k in range(3)))
+    for name, v in cols.items():
+        missing = v[~own, 0]
+        assert not missing.any() if name == "is_shock" else np.isnan(missing).all()
+        assert np.allclose(v[own, 0], alone[name], equal_nan=True), name
+        assert np.allclose(v[:, 1], compute(*full.T)[name], equal_nan=True), name
+    assert np.isfinite(cols["atr14"][own, 0][14:]).all()
+
+
+def test_wilder_atr_1d_skips_missing_rows():
+    high, low, close = ohlc()
+    gap = close.copy()
+    gap[40] = np.nan
+    atr = wilder_atr(high, low, gap)
+    assert np.isnan(atr[40]) and np.isfinite(atr[41:]).all()
@@ -0,0 +1,16 @@
+"""Minute-bar engine bookkeeping."""
+import pytest
+
+from conftest import END, START
+
+
+def test_positions_open_at_the_end_are_paid_for(gapped):
+    from ibot.config import SLIPPAGE_PERC, START_CASH
+    from ibot.intraday import run
+
+    res = run([*gapped, "SPY"], START, END)
+    trades, equity = res.trades_frame(), res.equity_series()
+    assert (trades["exit_date"].dt.date == equity.index[-1].date()).any()   # some realised at stop
+
+    entry_slip = (trades["size"] * trades["entry_price"] * SLIPPAGE_PERC).sum()
+    assert equity.iloc[-1] == pytest.approx(START_CASH + trades["net"].sum() - entry_slip)
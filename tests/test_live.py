@@ -0,0 +1,89 @@
+"""Live engine against the simulated broker."""
+import asyncio
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from ibot.live import Account, AlpacaBroker, Bar, Fill, LiveEngine, Order, SimBroker
+
+D1, D2, D3 = (pd.Timestamp(d) for d in ("2023-01-03", "2023-01-04", "2023-01-05"))
+
+
+def test_sim_broker_cash_follows_engine_cash():
+    broker = SimBroker(cash=10_000.0, slippage=0.01)
+    engine = LiveEngine(broker, cash=10_000.0, slippage=0.01)
+
+    async def trade():
+        for order, bar in [(Order("AAA", 100, D1), Bar("AAA", D2, 50.0, 60.0, 40.0, 55.0)),
+                           (Order("AAA", -100, D2), Bar("AAA", D3, 60.0, 70.0, 50.0, 65.0))]:
+            engine.pending.add(order.symbol)
+            await broker.submit(order)
+            broker.open([bar])
+            for fill in await broker.sync(bar):
+                engine.on_fill(fill)
+
+    asyncio.run(trade())
+    tax = engine.ledger.trades_frame()["tax"].sum()
+    assert tax > 0
+    assert broker.cash == pytest.approx(engine.cash + tax)      # only taxes stay with the engine
+
+
+def test_partial_fills_make_one_trade():
+    engine = LiveEngine(SimBroker(), cash=10_000.0, slippage=0.0)
+    engine.pending.add("AAA")
+    engine.on_fill(Fill("AAA", 60, 10.0, D1, done=False))
+    assert "AAA" in engine.pending                         # order still working
+    engine.on_fill(Fill("AAA", 40, 11.0, D1))
+    assert engine.pos["AAA"].size == 100 and engine.pos["AAA"].price == pytest.approx(10.4)
+
+    engine.on_fill(Fill("AAA", -30, 12.0, D2, done=False))
+    assert engine.pos["AAA"].size == 70
+    assert len(engine.ledger.trades_frame()["exit_date"].dropna()) == 0
+    engine.on_fill(Fill("AAA", -70, 13.0, D3))
+
+    assert "AAA" not in engine.pos
+    (trade,) = engine.ledger.trades_frame().to_dict(orient="records")
+    assert trade["size"] == 100 and trade["entry_price"] == pytest.approx(10.4)
+    assert trade["exit_price"] == pytest.approx(12.7)
+    assert trade["gross"] == pytest.approx(230.0)
+    assert engine.cash == pytest.approx(10_000.0 + trade["net"])
+
+
+class AccountBroker(SimBroker):
+    async def start(self):
+        return Account(5_000.0, {"AAA": (10, 20.0), "BBB": (-5, 30.0)})
+
+
+def test_run_starts_from_the_broker_account():
+    engine = LiveEngine(AccountBroker())
+
+    async def bars():
+        yield Bar("AAA", D1, 21.0, 22.0, 20.0, 21.5)
+
+    asyncio.run(engine.run(bars()))
+    assert engine.cash == 5_000.0
+    assert list(engine.pos) == ["AAA"] and engine.pos["AAA"].size == 10
+    assert engine.value() == pytest.approx(5_000.0 + 10 * 21.5)
+
+
+def test_alpaca_updates_become_incremental_fills():
+    broker = AlpacaBroker()
+
+    def update(event, qty, avg, order="o1"):
+        o = SimpleNamespace(id=order, symbol="AAA", side="OrderSide.BUY",
+                            filled_qty=str(qty), filled_avg_price=str(avg))
+        return SimpleNamespace(event=event, order=o, timestamp=D1)
+
+    async def stream():
+        broker._loop = asyncio.get_running_loop()
+        for u in [update("new", 0, 0), update("partial_fill", 40, 10.0),
+                  update("partial_fill", 40, 10.0), update("fill", 100, 10.6),
+                  update("canceled", 0, 0, order="o2")]:
+            await broker._on_update(u)
+        await asyncio.sleep(0)
+        return await broker.sync(None)
+
+    fills = asyncio.run(stream())
+    assert [(f.qty, f.done) for f in fills] == [(40, False), (60, True), (0, True)]
+    assert fills[1].price == pytest.approx(11.0)
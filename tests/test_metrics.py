@@ -0,0 +1,22 @@
+"""Per-stage memory figures."""
+import numpy as np
+import pytest
+
+from ibot import metrics
+
+
+@pytest.mark.skipif(metrics.rss_mb() is None, reason="needs /proc")
+def test_a_light_stage_is_not_charged_an_earlier_peak():
+    metrics.reset()
+    with metrics.stage("heavy"):
+        keep = np.ones(80 * 2**20 // 8)                  # 80 MB, touched
+    with metrics.stage("light"):
+        pass
+    heavy, light = metrics.records().to_dict(orient="records")
+    metrics.reset()
+
+    assert heavy["rss_out_mb"] - heavy["rss_in_mb"] > 60
+    assert abs(light["rss_out_mb"] - light["rss_in_mb"]) < 5
+    assert light["peak_grow_mb"] < 5
+    assert light["proc_peak_mb"] >= heavy["proc_peak_mb"]     # still the process peak
+    del keep
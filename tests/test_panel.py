@@ -0,0 +1,21 @@
+"""Training labels on a dates x symbols panel with missing rows."""
+import numpy as np
+import pandas as pd
+
+from ibot.panel import forward_return
+
+
+def test_forward_return_counts_the_symbols_own_bars():
+    rng = np.random.default_rng(0)
+    close = pd.Series(50 * np.exp(np.cumsum(rng.normal(0, 0.02, 80))))
+    own = np.ones(len(close), dtype=bool)
+    own[[10, 11, 40, 77]] = False
+    panel = np.column_stack([close.where(own), close])
+
+    fwd = forward_return(panel, horizon=5)
+
+    mine = close[own]                                 # label_shocks on the symbol's own frame
+    assert np.allclose(fwd[own, 0], mine.shift(-5) / mine - 1.0, equal_nan=True)
+    assert np.isnan(fwd[~own, 0]).all()
+    assert np.isnan(fwd[own, 0][-5:]).all() and np.isfinite(fwd[own, 0][:-5]).all()
+    assert np.allclose(fwd[:, 1], close.shift(-5) / close - 1.0, equal_nan=True)
@@ -0,0 +1,29 @@
+"""Report writing."""
+from datetime import datetime
+
+import pandas as pd
+
+from ibot.ledger import Ledger
+from ibot.reporting import write
+
+
+def test_equity_with_repeated_dates():
+    # a stale datas[0] repeats its date, and stop() marks the last one again
+    d1, d2, d3 = datetime(2023, 1, 3), datetime(2023, 1, 4), datetime(2023, 1, 5)
+    led = Ledger()
+    led.open("AAA", d1, 10, 100.0)
+    for dt, value in [(d1, 10_000.0), (d2, 10_100.0), (d2, 10_050.0), (d3, 10_200.0)]:
+        led.mark(dt, value)
+    led.close("AAA", d3, 115.0, 150.0, 36.0, 1.0)
+    led.mark(d3, 10_150.0)
+    equity = led.equity_series()
+    assert not equity.index.is_unique
+    spy = pd.Series([10_000.0, 10_010.0, 10_020.0], index=equity.index.unique())
+
+    md = write(equity, spy, led.trades_frame(), params={"start": "2023-01-03"})
+
+    saved = pd.read_parquet(md.with_name(md.stem + ".equity.parquet"))
+    assert saved.index.is_unique
+    assert saved["bot"].tolist() == [10_000.0, 10_050.0, 10_150.0]
+    assert saved["spy"].tolist() == spy.tolist()
+    assert "**End Equity**: $10,150.00" in md.read_text()
@@ -0,0 +1,25 @@
+"""``ibot`` CLI start-up budget (see ``bench/startup.py``)."""
+import os
+
+import pytest
+
+from bench.startup import BUDGET, COMMANDS, HEAVY, MODULES, REPEAT, imported, timed
+
+
+@pytest.fixture
+def env(tmp_path):
+    return {**os.environ, "IBOT_HOME": str(tmp_path)}
+
+
+@pytest.mark.parametrize("cmd", [[], *([c] for c in COMMANDS)], ids=lambda c: c[0] if c else "ibot")
+def test_help_is_fast_and_light(cmd, env):
+    argv = ["-m", "ibot", *cmd, "--help"]
+    heavy = imported(timed(["-X", "importtime", *argv], env)[1]) & set(HEAVY)
+    assert not heavy, f"{' '.join(argv)} imported {sorted(heavy)}"
+    best = min(timed(argv, env)[0] for _ in range(REPEAT))
+    assert best <= BUDGET, f"{' '.join(argv)} took {best:.3f}s (budget {BUDGET}s)"
+
+
+def test_import_creates_nothing(env, tmp_path):
+    timed(["-c", "; ".join(f"import {m}" for m in MODULES)], env)
+    assert not list(tmp_path.rglob("*"))
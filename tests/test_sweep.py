@@ -0,0 +1,19 @@
+"""Parameter sweep over a universe with missing sessions."""
+import numpy as np
+
+from conftest import END, START
+
+
+def test_sweep_on_gapped_universe(gapped):
+    from ibot.data import window_feeds
+    from ibot.sweep import grid, sweep
+
+    trials = grid(dict(shock_sigma=[2.0, 2.5], atr_mult=[1.5, 2.0],
+                       hold_days=[10, 30], risk_budget=[0.05]))
+    table = sweep(dict(window_feeds(gapped, START, END)), trials, workers=2)
+
+    assert len(table) == len(trials)
+    assert np.isfinite(table["end_equity"]).all()
+    assert np.isfinite(table["net_pnl"]).all()
+    assert table["cagr"].notna().all()
+    assert (table["trades"] > 0).all()
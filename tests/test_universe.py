@@ -0,0 +1,59 @@
+"""Universe refresh against a fake Alpaca data client."""
+import datetime as dt
+import importlib.util
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from ibot.config import DATA_PROCESSED, PROJECT_ROOT
+
+
+@pytest.fixture(scope="module")
+def universe():
+    path = PROJECT_ROOT / "universe" / "refresh_universe.py"
+    spec = importlib.util.spec_from_file_location("refresh_universe", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeData:
+    """Daily bars for every requested symbol; ``volume`` set per call."""
+
+    def __init__(self):
+        self.volume, self.calls = 1_000.0, []
+
+    def get_stock_bars(self, req):
+        self.calls.append((req.start, req.end))
+        days = pd.date_range(req.start, req.end, freq="B", tz="UTC")
+        idx = pd.MultiIndex.from_product([req.symbol_or_symbols, days],
+                                         names=["symbol", "timestamp"])
+        return SimpleNamespace(df=pd.DataFrame({"close": 10.0, "volume": self.volume}, index=idx))
+
+
+def test_cache_lives_under_data_processed(universe):
+    assert universe.CACHE_PATH.parent == DATA_PROCESSED
+
+
+def test_partial_last_bar_is_refetched(universe, tmp_path):
+    cache, out = tmp_path / "bars.parquet", tmp_path / "top.csv"
+    today = dt.date(2024, 3, 15)
+    client = FakeData()
+    kw = dict(data_client=client, symbols=["AAA", "BBB"], today=today,
+              cache_path=cache, out_path=out, workers=1)
+
+    client.volume = 10.0                              # mid-session: today's bar is partial
+    universe.refresh(**kw)
+    client.volume = 1_000.0
+    universe.refresh(**kw)
+
+    assert client.calls[-1] == (today, today)         # only the last cached day again
+    bars = pd.read_parquet(cache)
+    last = bars[bars["timestamp"] == pd.Timestamp(today, tz="UTC")]
+    assert len(last) == 2 and (last["volume"] == 1_000.0).all()
+    assert not bars.duplicated(["symbol", "timestamp"]).any()
+
+
+def test_output_is_anchored_to_the_repo(universe):
+    assert universe.OUT_PATH == PROJECT_ROOT / "universe" / "top200.csv"
@@ -0,0 +1,47 @@
+"""Walk-forward window keys."""
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pandas as pd
+
+from ibot.walkforward import Window, window_key
+
+OLD = Window("2022-01-03", "2022-12-31", "2023-01-01", "2023-03-31")
+NEW = Window("2022-04-01", "2023-03-31", "2023-04-01", "2023-09-30")
+CUT = pd.Timestamp("2023-06-01", tz="UTC")
+
+
+def test_appending_bars_keeps_earlier_window_keys(gapped):
+    from ibot.config import DATA_RAW
+    from ibot.data import ensure_daily
+
+    full = pq.read_table(DATA_RAW / "S001.parquet")
+    path = DATA_RAW / "WF1.parquet"
+    pq.write_table(full.filter(pc.less(full["timestamp"], CUT)), path)
+    ensure_daily(["WF1", "SPY"])
+    before = {w: window_key(["WF1"], w, {}) for w in (OLD, NEW)}
+
+    pq.write_table(full, path)                       # new minutes appended to the same file
+    assert ensure_daily(["WF1"]) == ["WF1"]
+    assert window_key(["WF1"], OLD, {}) == before[OLD]
+    assert window_key(["WF1"], NEW, {}) != before[NEW]
+
+
+def test_second_run_is_served_from_the_window_cache(gapped, monkeypatch):
+    import ibot.walkforward as wf
+
+    def no_training(*a, **k):
+        raise AssertionError("trained a model nobody reads")
+
+    monkeypatch.setattr(wf, "train", no_training)    # workers fork with the patch
+    args = (gapped, "2023-01-01", "2023-12-29", dict(engine="vectorized"))
+    kw = dict(train_years=1, test_months=6, workers=2)
+    equity, trades, first = wf.walk_forward(*args, **kw)
+    assert len(first) == 2 and not first["cached"].any()
+
+    def no_backtest(*a, **k):
+        raise AssertionError("re-ran a cached window")
+
+    monkeypatch.setattr(wf, "run_backtest", no_backtest)
+    equity2, trades2, second = wf.walk_forward(*args, **kw)
+    assert second["cached"].all()
+    assert equity2.equals(equity) and len(trades2) == len(trades)
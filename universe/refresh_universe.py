@@ -1,73 +1,167 @@
 # universe/refresh_universe.py
-"""Download latest top‑200 by 30‑day dollar volume via Alpaca data API."""
+"""Download latest top‑200 by 30‑day dollar volume via Alpaca data API.
+
+Daily bars are kept in a local Parquet cache under ``DATA_PROCESSED``, so
+a refresh only asks Alpaca for the days each symbol is missing – plus its
+last cached day, which may have been a partial session.  Batches of 200
+symbols are fetched concurrently (bounded by ``workers``) with
+exponential-backoff retries.  Clients are built lazily and can be injected – anything with
+``get_stock_bars(request).df`` / ``get_all_assets(request)`` works, e.g. a
+fake data server in tests.
+"""
 
 import datetime as dt
 import os
-import pandas as pd
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from dotenv import load_dotenv
+from types import SimpleNamespace
 
-from alpaca.data import StockHistoricalDataClient, TimeFrame
-from alpaca.data.requests import StockBarsRequest
-from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import GetAssetsRequest
+import pandas as pd
 
-# Load .env API keys
-load_dotenv()
-API_KEY = os.getenv("ALPACA_API_KEY")
-API_SECRET = os.getenv("ALPACA_SECRET_KEY")
+# Run as a plain script too, where ``ibot`` is not importable: resolve the
+# repo root and IBOT_HOME the same way ibot.config does.
+ROOT       = Path(__file__).resolve().parents[1]
+WORK_ROOT  = Path(os.getenv("IBOT_HOME", ROOT))
+OUT_PATH   = ROOT / "universe" / "top200.csv"
+CACHE_PATH = WORK_ROOT / "data" / "processed" / "universe_bars.parquet"
 
-# Alpaca clients
-client = StockHistoricalDataClient(API_KEY, API_SECRET)
-trading_client = TradingClient(API_KEY, API_SECRET, paper=True)
+BATCH     = 200
+WORKERS   = 8
+RETRIES   = 4
+BACKOFF   = 1.0       # seconds, doubled per retry (plus jitter)
+KEEP_DAYS = 90        # calendar days of history kept in the cache
 
-OUT_PATH = Path("universe/top200.csv")
+def make_clients():
+    """Alpaca data + trading clients from .env / environment keys."""
+    from dotenv import load_dotenv
+    from alpaca.data import StockHistoricalDataClient
+    from alpaca.trading.client import TradingClient
 
-def refresh():
-    end = dt.date.today()
-    start = end - dt.timedelta(days=30)
+    load_dotenv()
+    key, secret = os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY")
+    return StockHistoricalDataClient(key, secret), TradingClient(key, secret, paper=True)
+
+def tradable_symbols(trading_client) -> list[str]:
+    from alpaca.trading.requests import GetAssetsRequest
 
-    # Step 1: Get all tradable U.S. assets
     assets = trading_client.get_all_assets(GetAssetsRequest(status="active"))
-    symbols = [a.symbol for a in assets if a.tradable and a.exchange in ("NYSE", "NASDAQ")]
+    return [a.symbol for a in assets if a.tradable and a.exchange in ("NYSE", "NASDAQ")]
 
-    print(f"Found {len(symbols)} tradable tickers...")
+def _bars_request(batch: list[str], start: dt.date, end: dt.date):
+    try:
+        from alpaca.data import TimeFrame
+        from alpaca.data.requests import StockBarsRequest
+    except ImportError:          # injected fake clients only need the fields
+        return SimpleNamespace(symbol_or_symbols=batch, timeframe="1Day", start=start, end=end)
+    return StockBarsRequest(symbol_or_symbols=batch, timeframe=TimeFrame.Day,
+                            start=start, end=end)
+
+# ---------- local bar cache ----------
+def load_cache(path: Path = CACHE_PATH) -> pd.DataFrame:
+    if path.exists():
+        return pd.read_parquet(path)
+    return pd.DataFrame({"symbol": pd.Series(dtype=str),
+                         "timestamp": pd.Series(dtype="datetime64[ns, UTC]"),
+                         "close": pd.Series(dtype=float),
+                         "volume": pd.Series(dtype=float)})
+
+def save_cache(bars: pd.DataFrame, path: Path = CACHE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    bars.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def missing_ranges(cache: pd.DataFrame, symbols: list[str], start: dt.date,
+                   end: dt.date) -> dict[dt.date, list[str]]:
+    """Group symbols by the first day they still need.
 
-    # Step 2: Get 30-day bars in batches of 200
-    all_records = []
+    A cached symbol is refetched from its last cached day: that bar may
+    have been taken mid-session, and the fresh one replaces it.
+    """
+    last = cache.groupby("symbol")["timestamp"].max() if not cache.empty else pd.Series(dtype=object)
+    need: dict[dt.date, list[str]] = {}
+    for sym in symbols:
+        ts = last.get(sym)
+        first = start if ts is None else max(start, ts.date())
+        if first <= end:
+            need.setdefault(first, []).append(sym)
+    return need
 
-    for i in range(0, len(symbols), 200):
-        batch = symbols[i:i + 200]
+# ---------- fetching ----------
+def fetch_batch(client, batch: list[str], start: dt.date, end: dt.date,
+                retries: int = RETRIES, backoff: float = BACKOFF) -> pd.DataFrame | None:
+    """One ``get_stock_bars`` call with retries; ``None`` if every attempt failed."""
+    for attempt in range(retries + 1):
         try:
-            bars = client.get_stock_bars(
-                StockBarsRequest(
-                    symbol_or_symbols=batch,
-                    timeframe=TimeFrame.Day,
-                    start=start,
-                    end=end
-                )
-            )
-            df = bars.df
+            df = client.get_stock_bars(_bars_request(batch, start, end)).df
             if df.empty:
-                continue
+                return None
+            return df.reset_index()[["symbol", "timestamp", "close", "volume"]]
+        except Exception as e:
+            if attempt == retries:
+                print(f"Failed on batch {batch[0]}…{batch[-1]} after {retries + 1} tries: {e}")
+                return None
+            wait = backoff * 2 ** attempt * (1 + random.random())
+            print(f"Batch {batch[0]}…{batch[-1]} failed ({e}); retrying in {wait:.1f}s")
+            time.sleep(wait)
 
-            # Step 3: Compute average dollar volume
-            grouped = df.groupby("symbol").agg({"close": "mean", "volume": "mean"})
-            grouped["dollar_volume"] = grouped["close"] * grouped["volume"]
-            all_records.append(grouped[["dollar_volume"]])
+def fetch_missing(client, need: dict[dt.date, list[str]], end: dt.date,
+                  workers: int = WORKERS, **retry) -> list[pd.DataFrame]:
+    jobs = [(syms[i:i + BATCH], first)
+            for first, syms in need.items() for i in range(0, len(syms), BATCH)]
+    if not jobs:
+        return []
+    print(f"Fetching {sum(len(b) for b, _ in jobs)} symbols in {len(jobs)} batches "
+          f"({min(workers, len(jobs))} concurrent)...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = pool.map(lambda job: fetch_batch(client, job[0], job[1], end, **retry), jobs)
+        return [f for f in frames if f is not None]
 
-        except Exception as e:
-            print(f"Failed on batch {i}–{i+200}: {e}")
+# ---------- ranking ----------
+def rank(bars: pd.DataFrame, start: dt.date, top: int = 200) -> pd.DataFrame:
+    """Average close × average volume since ``start``, highest first."""
+    recent = bars[bars["timestamp"] >= pd.Timestamp(start, tz="UTC")]
+    grouped = recent.groupby("symbol").agg({"close": "mean", "volume": "mean"})
+    grouped["dollar_volume"] = grouped["close"] * grouped["volume"]
+    return (grouped[["dollar_volume"]].sort_values("dollar_volume", ascending=False)
+                                      .head(top).reset_index())
+
+def refresh(data_client=None, trading_client=None, symbols: list[str] | None = None,
+            today: dt.date | None = None, days: int = 30, workers: int = WORKERS,
+            out_path: Path = OUT_PATH, cache_path: Path = CACHE_PATH, **retry):
+    end = today or dt.date.today()
+    start = end - dt.timedelta(days=days)
+    if data_client is None or (symbols is None and trading_client is None):
+        default_data, default_trading = make_clients()
+        data_client = data_client or default_data
+        trading_client = trading_client or default_trading
+
+    # Step 1: Get all tradable U.S. assets
+    if symbols is None:
+        symbols = tradable_symbols(trading_client)
+    print(f"Found {len(symbols)} tradable tickers...")
 
-    # Step 4: Combine & rank top 200
-    if not all_records:
+    # Step 2: Fetch only the days the cache is missing, concurrently
+    cache = load_cache(cache_path)
+    new = fetch_missing(data_client, missing_ranges(cache, symbols, start, end), end,
+                        workers=workers, **retry)
+    if new:
+        cache = pd.concat([cache, *new], ignore_index=True)
+        cache["timestamp"] = pd.to_datetime(cache["timestamp"], utc=True)
+        cache = (cache.drop_duplicates(["symbol", "timestamp"], keep="last")
+                      .sort_values(["symbol", "timestamp"], ignore_index=True))
+    cache = cache[cache["timestamp"] >= pd.Timestamp(end - dt.timedelta(days=KEEP_DAYS), tz="UTC")]
+    save_cache(cache, cache_path)
+
+    # Step 3/4: Rank on cached history & keep the top 200
+    if cache.empty:
         print("No data returned – exiting.")
         return
-
-    full = pd.concat(all_records)
-    top200 = full.sort_values("dollar_volume", ascending=False).head(200)
-    top200.reset_index().to_csv(OUT_PATH, index=False)
-    print(f"Saved top 200 to {OUT_PATH}")
+    top200 = rank(cache[cache["symbol"].isin(symbols)], start)
+    top200.to_csv(out_path, index=False)
+    print(f"Saved top 200 to {out_path}")
 
 if __name__ == "__main__":
     refresh()